@@ -5,51 +5,47 @@ Routes API pour les analytics et webhooks
 import hmac
 import json
 import logging
-import re
 import traceback
-from datetime import date, timedelta
+from datetime import UTC, date, datetime, timedelta
 from typing import Literal
 
 from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
-from sqlalchemy import and_, desc, func
+from sqlalchemy import and_, desc
 from sqlalchemy.orm import Session
 
 from app.api.schemas import (
     ActiveSessionItem,
     DeviceBreakdownItem,
+    HourOfDayItem,
     MediaPlaybackAnalyticsItem,
+    ServerMetricHistoryPoint,
+    ServerMetricHistoryResponse,
     ServerPerformanceResponse,
     UsageAnalyticsResponse,
 )
 from app.core.config import settings
+from app.core.metrics import WEBHOOK_EVENTS
 from app.core.security import verify_api_key
 from app.db import get_db
-from app.models.enums import MediaType
-from app.models.models import DailyAnalytic, LibraryItem, MediaStatistic, PlaybackSession, ServerMetric
+from app.models.models import DailyAnalytic, MediaStatistic
 from app.services.analytics_service import AnalyticsService
+from app.services.metrics_history import metrics_history
+from app.services.metrics_sampler import metrics_sampler
+from app.services.playback_webhook import parse_playback_event
+from app.services.rollup_service import rollup_service
+from app.services.webhook_queue import webhook_queue
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/analytics", tags=["Analytics"])
 
-# Pattern Jellyfin ID (hex 32 chars)
-_JELLYFIN_ID_PATTERN = re.compile(r"^[a-fA-F0-9]{1,64}$")
-
-
-def _truncate(value: str | None, max_length: int = 255) -> str | None:
-    """Tronque une chaîne à une longueur maximale"""
-    if value is None:
-        return None
-    return value[:max_length]
-
-
 # ============================================
 # WEBHOOK ENDPOINT (PUBLIC)
 # ============================================
 
 
-@router.post("/webhook/playback", status_code=status.HTTP_200_OK)
-async def receive_playback_webhook(request: Request, db: Session = Depends(get_db)):
+@router.post("/webhook/playback", status_code=status.HTTP_202_ACCEPTED)
+async def receive_playback_webhook(request: Request):
     """
     Endpoint pour recevoir les webhooks de lecture depuis Jellyfin
 
@@ -58,6 +54,10 @@ async def receive_playback_webhook(request: Request, db: Session = Depends(get_d
     - Stop : Fin de lecture
     - Pause : Mise en pause
     - Resume : Reprise de lecture
+
+    Le payload est validé puis déposé dans la file d'ingestion (202) : les écritures sont
+    appliquées par micro-lots, une transaction par lot. File pleine : 429, journal inaccessible :
+    503 (rien n'est mis en file) ; Jellyfin réessaiera.
     """
     try:
         # Vérifier le secret webhook si configuré
@@ -75,174 +75,45 @@ async def receive_playback_webhook(request: Request, db: Session = Depends(get_d
         # Récupérer le payload
         payload = json.loads(body)
 
-        # Extraire les données principales
-        event_type_raw = payload.get("Event")
-        item = payload.get("Item", {})
-        user = payload.get("User", {})
-        session_info = payload.get("Session", {})
-        play_state = session_info.get("PlayState", {})
-
-        # Mapping des événements
-        event_mapping = {
-            "Play": "playback.start",
-            "Stop": "playback.stop",
-            "Pause": "playback.pause",
-            "Resume": "playback.unpause",
-        }
-
-        event_type = event_mapping.get(event_type_raw)
-
-        if not event_type:
-            logger.warning(f"⚠️  Type d'événement non supporté : {event_type_raw}")
-            return {"status": "ignored", "event": event_type_raw}
-
-        logger.info(f"📥 Webhook reçu : {event_type} - {item.get('Name', 'Unknown')}")
-
-        # Extraction et validation des IDs
-        media_id = item.get("Id")
-        user_id = user.get("Id")
-
-        if not media_id or not user_id:
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Item.Id et User.Id sont requis")
-
-        if not _JELLYFIN_ID_PATTERN.match(str(media_id)) or not _JELLYFIN_ID_PATTERN.match(str(user_id)):
-            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Format d'ID invalide")
-
-        # Traitement selon le type d'événement
-        if event_type == "playback.start":
-            # Déterminer le type de média
-            item_type = item.get("Type", "Movie")
-            media_type = "tv" if item_type == "Episode" else "movie"
-
-            # Info épisode si série
-            episode_info = None
-            if item_type == "Episode":
-                season = item.get("ParentIndexNumber", 0)
-                episode = item.get("IndexNumber", 0)
-                episode_info = f"S{season:02d}E{episode:02d}"
-
-            # Extraire la qualité vidéo depuis les MediaStreams
-            media_streams = item.get("MediaStreams", [])
-            video_stream = next((s for s in media_streams if s.get("Type") == "Video"), {})
-            video_height = video_stream.get("Height", 0)
-
-            # Mapper la qualité (vérifier HDR pour 2160p)
-            video_range = video_stream.get("VideoRange", "")
-            if video_height >= 2160:
-                video_quality = "FOUR_K_HDR" if video_range and video_range.upper() == "HDR" else "FOUR_K"
-            else:
-                quality_map = {1080: "FULL_HD", 720: "HD", 480: "SD"}
-                video_quality = quality_map.get(video_height, "UNKNOWN")
-
-            # Codec vidéo source
-            video_codec_source = video_stream.get("Codec", "unknown")
-
-            # Déterminer si c'est du transcodage
-            play_method = play_state.get("PlayMethod", "DirectPlay")
-            is_transcoding = play_method == "Transcode"
-            is_direct_playing = play_method == "DirectPlay"
-
-            # Codec cible si transcodage
-            video_codec_target = None
-            if is_transcoding:
-                video_codec_target = "h264"  # Par défaut pour le transcodage
-
-            # Durée en secondes
-            run_time_ticks = item.get("RunTimeTicks", 0)
-            duration_seconds = run_time_ticks // 10000000 if run_time_ticks else None
-
-            # Déterminer le type d'appareil
-            device_name = session_info.get("DeviceName", "Unknown")
-            client_name = session_info.get("Client", "Unknown")
-
-            # URL du poster : Utiliser l'URL publique de Jellyfin
-            poster_url = None
-            jellyfin_url = getattr(settings, "JELLYFIN_PUBLIC_URL", None)
-            if item.get("ImageTags", {}).get("Primary") and jellyfin_url:
-                poster_url = f"{jellyfin_url}/Items/{media_id}/Images/Primary"
-
-            session_data = {
-                "media_id": media_id,
-                "media_title": _truncate(item.get("Name", "Unknown")),
-                "media_type": media_type,
-                "media_year": item.get("ProductionYear"),
-                "episode_info": _truncate(episode_info, 20),
-                "poster_url": _truncate(poster_url, 500),
-                "user_id": user_id,
-                "user_name": _truncate(user.get("Name", "Unknown")),
-                "device_name": _truncate(device_name),
-                "client_name": _truncate(client_name),
-                "video_quality": video_quality,
-                "is_transcoding": is_transcoding,
-                "is_direct_playing": is_direct_playing,
-                "transcoding_progress": 0,
-                "transcoding_speed": None,
-                "video_codec_source": _truncate(video_codec_source, 50),
-                "video_codec_target": _truncate(video_codec_target, 50),
-                "duration_seconds": duration_seconds,
-            }
-
-            # Recherche du LibraryItem correspondant
-            library_item = None
-            if media_type == "movie":
-                library_item = (
-                    db.query(LibraryItem)
-                    .filter(
-                        LibraryItem.title == item.get("Name"),
-                        LibraryItem.media_type == MediaType.MOVIE,
-                        LibraryItem.year == item.get("ProductionYear"),
-                    )
-                    .first()
-                )
-            elif media_type == "tv":
-                series_name = item.get("SeriesName")
-                if series_name:
-                    library_item = (
-                        db.query(LibraryItem)
-                        .filter(LibraryItem.title == series_name, LibraryItem.media_type == MediaType.TV)
-                        .first()
-                    )
-
-            if library_item:
-                session_data["library_item_id"] = library_item.id
-
-            playback_session = AnalyticsService.start_session(db, session_data)
-            logger.info(f"✅ Session créée : {playback_session.id} - {playback_session.media_title}")
-            return {"status": "success", "session_id": playback_session.id, "event": event_type}
-
-        elif event_type == "playback.stop":
-            # Position de lecture en secondes
-            playback_position_ticks = play_state.get("PositionTicks", 0)
-            watched_seconds = playback_position_ticks // 10000000 if playback_position_ticks else 0
-
-            playback_session = AnalyticsService.stop_session(db, media_id, user_id, watched_seconds)
-
-            if playback_session:
-                logger.info(
-                    f"✅ Session arrêtée : {playback_session.id} - {playback_session.media_title} ({watched_seconds}s)"
-                )
-                return {"status": "success", "session_id": playback_session.id, "event": event_type}
-            else:
-                logger.warning(f"⚠️  Aucune session active trouvée pour media_id={media_id}, user_id={user_id}")
-                return {"status": "no_active_session", "event": event_type}
-
-        elif event_type == "playback.pause":
-            playback_session = AnalyticsService.pause_session(db, media_id, user_id)
-            if playback_session:
-                logger.info(f"⏸️  Session mise en pause : {playback_session.id}")
-                return {"status": "success", "session_id": playback_session.id, "event": event_type}
-            return {"status": "no_active_session", "event": event_type}
-
-        elif event_type == "playback.unpause":
-            playback_session = AnalyticsService.resume_session(db, media_id, user_id)
-            if playback_session:
-                logger.info(f"▶️  Session reprise : {playback_session.id}")
-                return {"status": "success", "session_id": playback_session.id, "event": event_type}
-            return {"status": "no_active_session", "event": event_type}
-
-        else:
-            logger.warning(f"⚠️  Événement non supporté : {event_type}")
-            return {"status": "ignored", "event": event_type}
+        try:
+            event = parse_playback_event(payload)
+        except ValueError as e:
+            WEBHOOK_EVENTS.inc(event="unknown", result="invalid")
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e)) from e
+
+        if event is None:
+            logger.warning(f"⚠️  Type d'événement non supporté : {payload.get('Event')}")
+            # Type non supporté : label fixe, pour ne pas créer une série par valeur reçue
+            WEBHOOK_EVENTS.inc(event="unsupported", result="ignored")
+            return {"status": "ignored", "event": payload.get("Event")}
+
+        logger.info(f"📥 Webhook reçu : {event['event']} - {event['title'] or 'Unknown'}")
+
+        event["received_at"] = datetime.now(UTC).isoformat()
+
+        try:
+            accepted = webhook_queue.submit(event)
+        except OSError as e:
+            # Journal inaccessible : l'événement n'est ni journalisé ni mis en file, Jellyfin réessaiera
+            logger.error(f"❌ Écriture du journal webhooks impossible, événement refusé : {e}")
+            WEBHOOK_EVENTS.inc(event=event["event"], result="rejected")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Journal d'ingestion indisponible, réessayer plus tard",
+                headers={"Retry-After": "5"},
+            ) from e
+
+        if not accepted:
+            logger.warning(f"⚠️  File webhooks pleine, événement refusé : {event['event']}")
+            WEBHOOK_EVENTS.inc(event=event["event"], result="rejected")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="File d'ingestion pleine, réessayer plus tard",
+                headers={"Retry-After": "1"},
+            )
+
+        WEBHOOK_EVENTS.inc(event=event["event"], result="accepted")
+        return {"status": "accepted", "event": event["event"]}
 
     except HTTPException:
         raise
@@ -414,21 +285,11 @@ async def get_device_breakdown(
         end_date = date.today()
         start_date = end_date - timedelta(days=period_days)
 
-        # Requête pour compter les sessions par device_type
-        device_stats = (
-            db.query(PlaybackSession.device_type, func.count(PlaybackSession.id).label("session_count"))
-            .filter(
-                and_(
-                    func.date(PlaybackSession.start_time) >= start_date,
-                    func.date(PlaybackSession.start_time) <= end_date,
-                )
-            )
-            .group_by(PlaybackSession.device_type)
-            .all()
-        )
+        # Sessions par device_type, lues dans les rollups les plus grossiers qui couvrent la période
+        device_stats = rollup_service.totals_by(db, "device_type", start_date, end_date)
 
         # Calculer le total pour les pourcentages
-        total_sessions = sum([stat.session_count for stat in device_stats])
+        total_sessions = sum(plays for plays, _ in device_stats.values())
 
         if total_sessions == 0:
             return []
@@ -436,11 +297,11 @@ async def get_device_breakdown(
         # Formater les résultats
         return [
             DeviceBreakdownItem(
-                device_type=stat.device_type,
-                session_count=stat.session_count,
-                percentage=round((stat.session_count / total_sessions) * 100, 1),
+                device_type=device_type,
+                session_count=plays,
+                percentage=round((plays / total_sessions) * 100, 1),
             )
-            for stat in device_stats
+            for device_type, (plays, _) in device_stats.items()
         ]
 
     except Exception as e:
@@ -450,19 +311,52 @@ async def get_device_breakdown(
         ) from e
 
 
+@router.get("/hours", response_model=list[HourOfDayItem])
+async def get_hour_of_day_breakdown(
+    period_days: int = Query(30, ge=1, le=365, description="Période en jours"),
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """
+    📊 Activité par heure de la journée (UTC)
+
+    Retourne les lectures et heures regardées par heure (0-23) sur une période
+    """
+    try:
+        end_date = date.today()
+        start_date = end_date - timedelta(days=period_days)
+
+        hour_stats = rollup_service.totals_by_hour(db, start_date, end_date)
+
+        return [
+            HourOfDayItem(
+                hour=hour,
+                plays=hour_stats.get(hour, (0, 0))[0],
+                hours_watched=round(hour_stats.get(hour, (0, 0))[1] / 3600, 2),
+            )
+            for hour in range(24)
+        ]
+
+    except Exception as e:
+        logger.error(f"❌ Erreur lors de la récupération de l'activité par heure : {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erreur interne du serveur"
+        ) from e
+
+
 @router.get("/server-metrics", response_model=ServerPerformanceResponse | None)
 async def get_server_metrics(db: Session = Depends(get_db), api_key: str = Depends(verify_api_key)):
     """
     📊 VUE 3 : Server Performance - Métriques serveur en temps réel
 
-    Retourne les dernières métriques du serveur + sessions actives
+    Retourne les dernières métriques du serveur + sessions actives. Le dernier relevé est lu
+    dans le buffer de l'échantillonneur (aucun avant la première capture après le démarrage).
     """
     try:
-        # Récupérer la dernière métrique serveur
-        latest_metric = db.query(ServerMetric).order_by(desc(ServerMetric.recorded_at)).first()
+        latest_metric = metrics_sampler.latest()
 
         if not latest_metric:
-            # Si aucune métrique, retourner des valeurs par défaut
+            # Pas encore de relevé depuis le démarrage
             return None
 
         # Récupérer les sessions actives
@@ -493,6 +387,8 @@ async def get_server_metrics(db: Session = Depends(get_db), api_key: str = Depen
             storage_status=latest_metric.storage_status or "success",
             bandwidth_mbps=latest_metric.bandwidth_mbps or 0.0,
             bandwidth_status=latest_metric.bandwidth_status or "error",
+            disk_read_mbps=getattr(latest_metric, "disk_read_mbps", None),
+            disk_write_mbps=getattr(latest_metric, "disk_write_mbps", None),
             active_sessions=active_session_items,
             active_transcoding_count=latest_metric.active_transcoding_count,
         )
@@ -502,3 +398,41 @@ async def get_server_metrics(db: Session = Depends(get_db), api_key: str = Depen
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erreur interne du serveur"
         ) from e
+
+
+@router.get("/server-metrics/history", response_model=ServerMetricHistoryResponse)
+async def get_server_metrics_history(
+    metric: Literal[
+        "cpu_usage_percent",
+        "memory_usage_gb",
+        "bandwidth_mbps",
+        "disk_read_mbps",
+        "disk_write_mbps",
+        "active_sessions_count",
+        "active_transcoding_count",
+    ] = Query("cpu_usage_percent", description="Série à tracer"),
+    hours: int = Query(24, ge=1, le=24 * 365, description="Fenêtre en heures"),
+    points: int = Query(120, ge=10, le=1000, description="Nombre maximum de points"),
+    db: Session = Depends(get_db),
+    api_key: str = Depends(verify_api_key),
+):
+    """
+    📊 Historique d'une métrique serveur pour graphique
+
+    Retourne au plus `points` points (min/avg/max par intervalle), lus dans le buffer brut, les
+    minutes ou les heures selon la fenêtre : jamais les relevés bruts de server_metrics.
+    """
+    try:
+        resolution, history = metrics_history.history(db, metric, hours, points)
+
+        return ServerMetricHistoryResponse(
+            metric=metric,
+            resolution=resolution,
+            points=[ServerMetricHistoryPoint(**point) for point in history],
+        )
+
+    except Exception as e:
+        logger.error(f"❌ Erreur lors de la récupération de l'historique des métriques : {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Erreur interne du serveur"
+        ) from e
@@ -3,7 +3,7 @@ from sqlalchemy.orm import Session
 
 from app.db import get_db
 from app.models import JellyseerrRequest, RequestStatus, ServiceConfiguration, ServiceType
-from app.services import JellyseerrConnector
+from app.services.connector_registry import connector_registry
 
 router = APIRouter(prefix="/jellyseerr", tags=["Jellyseerr"])
 
@@ -26,7 +26,7 @@ async def approve_request(request_id: str, db: Session = Depends(get_db)):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Requête non trouvée")
 
     # Appeler l'API Jellyseerr avec l'ID externe
-    connector = JellyseerrConnector(base_url=service.url, api_key=service.api_key)
+    connector = connector_registry.get(service)
 
     try:
         await connector.approve_request(request.jellyseerr_id)
@@ -40,8 +40,6 @@ async def approve_request(request_id: str, db: Session = Depends(get_db)):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erreur lors de l'approbation: {str(e)}"
         ) from e
-    finally:
-        await connector.close()
 
 
 @router.post("/requests/{request_id}/decline")
@@ -59,7 +57,7 @@ async def decline_request(request_id: str, db: Session = Depends(get_db)):
     if not request:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Requête non trouvée")
 
-    connector = JellyseerrConnector(base_url=service.url, api_key=service.api_key)
+    connector = connector_registry.get(service)
 
     try:
         await connector.decline_request(request.jellyseerr_id)
@@ -73,5 +71,3 @@ async def decline_request(request_id: str, db: Session = Depends(get_db)):
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Erreur lors du refus: {str(e)}"
         ) from e
-    finally:
-        await connector.close()
@@ -0,0 +1,96 @@
+"""
+Exposition Prometheus / OpenMetrics (texte 0.0.4)
+"""
+
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core import metrics
+from app.db import engine
+from app.services.metrics_sampler import metrics_sampler
+from app.services.webhook_queue import webhook_queue
+
+router = APIRouter(tags=["Metrics"])
+
+# Type de contenu attendu par Prometheus pour le format texte
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Champs du dernier relevé exposés en jauges (servarr_server_<champ>)
+SAMPLER_FIELDS = (
+    ("cpu_usage_percent", "Utilisation CPU moyenne sur le dernier intervalle (%)"),
+    ("memory_usage_gb", "Mémoire utilisée (Go)"),
+    ("memory_total_gb", "Mémoire totale (Go)"),
+    ("storage_used_tb", "Stockage utilisé (To)"),
+    ("storage_total_tb", "Stockage total (To)"),
+    ("bandwidth_mbps", "Débit réseau moyen sur le dernier intervalle (Mbps)"),
+    ("disk_read_mbps", "Débit de lecture disque moyen sur le dernier intervalle (Mbps)"),
+    ("disk_write_mbps", "Débit d'écriture disque moyen sur le dernier intervalle (Mbps)"),
+    ("active_sessions_count", "Sessions de lecture actives"),
+    ("active_transcoding_count", "Transcodages actifs"),
+)
+
+
+def _webhook_queue_metrics() -> list[str]:
+    stats = webhook_queue.stats()
+    lines = metrics.snapshot(
+        "servarr_webhook_queue_depth", "Événements en attente dans la file webhooks", [({}, stats["depth"])]
+    )
+    lines += metrics.snapshot(
+        "servarr_webhook_queue_capacity", "Capacité de la file webhooks", [({}, stats["capacity"])]
+    )
+    lines += metrics.snapshot(
+        "servarr_webhook_queue_events",
+        "Événements de la file webhooks par issue",
+        [({"result": result}, stats[result]) for result in ("accepted", "rejected", "processed", "failed")],
+        kind="counter",
+    )
+    lines += metrics.snapshot(
+        "servarr_webhook_queue_batches",
+        "Micro-lots appliqués par la file webhooks",
+        [({}, stats["batches"])],
+        kind="counter",
+    )
+    return lines
+
+
+def _db_pool_metrics() -> list[str]:
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return []
+    return metrics.snapshot(
+        "servarr_db_pool_connections",
+        "Connexions du pool SQLAlchemy par état",
+        [
+            ({"state": "checked_out"}, pool.checkedout()),
+            ({"state": "idle"}, pool.checkedin()),
+            ({"state": "overflow"}, max(0, pool.overflow())),
+            ({"state": "size"}, pool.size()),
+        ],
+    )
+
+
+def _sampler_metrics() -> list[str]:
+    sample = metrics_sampler.latest()
+    if sample is None:
+        return []
+
+    lines = metrics.snapshot(
+        "servarr_server_sample_timestamp_seconds",
+        "Horodatage du dernier relevé de l'échantillonneur",
+        [({}, sample.recorded_at.timestamp())],
+    )
+    for field, documentation in SAMPLER_FIELDS:
+        lines += metrics.snapshot(f"servarr_server_{field}", documentation, [({}, getattr(sample, field))])
+    return lines
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """
+    Métriques au format texte Prometheus
+
+    Uniquement des compteurs en mémoire (sync, connecteurs, webhooks, pool DB, échantillonneur) :
+    aucune requête SQL par scrape.
+    """
+    body = metrics.render(_webhook_queue_metrics(), _db_pool_metrics(), _sampler_metrics())
+    return PlainTextResponse(body, media_type=CONTENT_TYPE)
@@ -6,7 +6,7 @@ from sqlalchemy.orm import Session
 from app.api.schemas import ServiceConfigurationCreate, ServiceConfigurationResponse, ServiceConfigurationUpdate
 from app.db import get_db
 from app.models import ServiceConfiguration, ServiceType
-from app.services import JellyfinConnector, JellyseerrConnector, RadarrConnector, SonarrConnector
+from app.services.connector_registry import connector_registry
 
 router = APIRouter(prefix="/services", tags=["Services"])
 
@@ -94,32 +94,22 @@ async def test_service_connection(service_name: ServiceType, db: Session = Depen
     if not service:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Service {service_name} non trouvé")
 
-    # Créer le bon connecteur selon le type
-    connector_map = {
-        ServiceType.RADARR: RadarrConnector,
-        ServiceType.SONARR: SonarrConnector,
-        ServiceType.JELLYFIN: JellyfinConnector,
-        ServiceType.JELLYSEERR: JellyseerrConnector,
-    }
-
-    ConnectorClass = connector_map.get(service_name)
-    if not ConnectorClass:
+    # Connecteurs testables (qBittorrent a sa propre route)
+    testable_services = (ServiceType.RADARR, ServiceType.SONARR, ServiceType.JELLYFIN, ServiceType.JELLYSEERR)
+    if service_name not in testable_services:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail=f"Type de service non supporté: {service_name}"
         )
 
-    # Passer le port au connecteur si disponible
-    connector = ConnectorClass(base_url=service.url, api_key=service.api_key, port=service.port)
+    # Connecteur partagé : le test réutilise (et préchauffe) le pool de connexions du service
+    connector = connector_registry.get(service)
 
-    try:
-        success, message = await connector.test_connection()
+    success, message = await connector.test_connection()
 
-        # Mettre à jour le statut du test
-        service.last_tested_at = datetime.now()
-        service.test_status = "success" if success else "failed"
-        service.test_message = message
-        db.commit()
+    # Mettre à jour le statut du test
+    service.last_tested_at = datetime.now()
+    service.test_status = "success" if success else "failed"
+    service.test_message = message
+    db.commit()
 
-        return {"success": success, "message": message, "tested_at": service.last_tested_at}
-    finally:
-        await connector.close()
+    return {"success": success, "message": message, "tested_at": service.last_tested_at}
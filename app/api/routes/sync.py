@@ -3,19 +3,29 @@ from sqlalchemy.orm import Session
 
 from app.api.schemas import SyncMetadataResponse
 from app.db import get_db
-from app.models import SyncMetadata
+from app.models import SyncMetadata, SyncMode
 from app.schedulers.sync_service import SyncService
 
 router = APIRouter(prefix="/sync", tags=["Synchronization"])
 
 
 @router.post("/trigger")
-async def trigger_sync(background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    """Déclencher manuellement une synchronisation complète"""
+async def trigger_sync(
+    background_tasks: BackgroundTasks, mode: SyncMode = SyncMode.RECENT, db: Session = Depends(get_db)
+):
+    """
+    Déclencher manuellement une synchronisation complète
+
+    Args:
+        mode: 'recent' (ajouts des 30 derniers jours), 'full' (bibliothèque Radarr/Sonarr complète,
+            avec suppression des items disparus) ou 'incremental' (seulement les items touchés
+            depuis le high-water mark, via l'historique et la queue ; réconciliation complète si
+            aucun mark n'existe ou si la dernière date de plus de 24h)
+    """
 
     async def run_sync():
         sync_service = SyncService(db)
-        await sync_service.sync_all()
+        await sync_service.sync_all(mode=mode)
 
     background_tasks.add_task(run_sync)
 
@@ -23,16 +33,21 @@ async def trigger_sync(background_tasks: BackgroundTasks, db: Session = Depends(
 
 
 @router.post("/trigger/{service_name}")
-async def trigger_service_sync(service_name: str, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
-    """Déclencher la synchronisation d'un service spécifique"""
+async def trigger_service_sync(
+    service_name: str,
+    background_tasks: BackgroundTasks,
+    mode: SyncMode = SyncMode.RECENT,
+    db: Session = Depends(get_db),
+):
+    """Déclencher la synchronisation d'un service spécifique (mode : voir /sync/trigger)"""
 
     async def run_service_sync():
         sync_service = SyncService(db)
 
         if service_name == "radarr":
-            await sync_service.sync_radarr()
+            await sync_service.sync_radarr(mode=mode)
         elif service_name == "sonarr":
-            await sync_service.sync_sonarr()
+            await sync_service.sync_sonarr(mode=mode)
         elif service_name == "jellyfin":
             await sync_service.sync_jellyfin()
         elif service_name == "jellyseerr":
@@ -10,7 +10,7 @@ from sqlalchemy.orm import Session
 from app.core.security import verify_api_key
 from app.db import get_db
 from app.models.models import ServiceConfiguration
-from app.services.connector_factory import create_connector
+from app.services.connector_registry import connector_registry
 from app.services.torrent_enrichment_service import TorrentEnrichmentService
 
 router = APIRouter(prefix="/api/torrents", tags=["torrents"])
@@ -40,15 +40,12 @@ async def get_torrent_info(
         raise HTTPException(status_code=404, detail="Service qBittorrent non configuré")
 
     try:
-        # Créer le connector
-        connector = create_connector(qbt_service)
+        # Connector partagé (session qBittorrent déjà authentifiée)
+        connector = connector_registry.get(qbt_service)
 
         # Récupérer les infos
         torrent_info = await connector.get_torrent_info(torrent_hash)
 
-        # Fermer la session
-        await connector.close()
-
         if not torrent_info:
             raise HTTPException(status_code=404, detail=f"Torrent {torrent_hash} non trouvé")
 
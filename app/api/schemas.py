@@ -180,6 +180,10 @@ class SyncMetadataResponse(BaseModel):
     next_sync_time: datetime | None = None
     sync_duration_ms: int | None = None
     records_synced: int
+    progress_processed: int | None = None
+    progress_total: int | None = None
+    high_water_mark: str | None = None
+    last_full_sync_time: datetime | None = None
     created_at: datetime
     updated_at: datetime
 
@@ -392,6 +396,14 @@ class DeviceBreakdownItem(BaseModel):
     percentage: float
 
 
+class HourOfDayItem(BaseModel):
+    """Schéma pour l'activité par heure de la journée (UTC)"""
+
+    hour: int
+    plays: int
+    hours_watched: float
+
+
 class ServerPerformanceResponse(BaseModel):
     """Schéma pour les métriques serveur (Vue 3)"""
 
@@ -405,5 +417,24 @@ class ServerPerformanceResponse(BaseModel):
     storage_status: str
     bandwidth_mbps: float
     bandwidth_status: str
+    disk_read_mbps: float | None = None
+    disk_write_mbps: float | None = None
     active_sessions: list[ActiveSessionItem]
     active_transcoding_count: int
+
+
+class ServerMetricHistoryPoint(BaseModel):
+    """Point de l'historique d'une métrique serveur (intervalle commençant à timestamp)"""
+
+    timestamp: datetime
+    min: float
+    avg: float
+    max: float
+
+
+class ServerMetricHistoryResponse(BaseModel):
+    """Schéma pour l'historique d'une métrique serveur"""
+
+    metric: str
+    resolution: str  # "raw", "minute" ou "hour"
+    points: list[ServerMetricHistoryPoint]
@@ -17,11 +17,57 @@ class Settings(BaseSettings):
     DEBUG: bool = False
     JELLYFIN_PUBLIC_URL: str
 
+    # Threads dédiés au travail DB lancé depuis l'event loop (app.db.run_db)
+    DB_EXECUTOR_WORKERS: int = 8
+
+    # File d'ingestion des webhooks de lecture (app.services.webhook_queue)
+    WEBHOOK_QUEUE_CAPACITY: int = 1000
+    WEBHOOK_BATCH_SIZE: int = 50
+    WEBHOOK_BATCH_WINDOW_MS: int = 200
+
+    # Journal append-only des webhooks acceptés (app.services.webhook_event_log)
+    WEBHOOK_EVENT_LOG_ENABLED: bool = True
+    WEBHOOK_EVENT_LOG_DIR: str = "data/webhook_events"
+    WEBHOOK_EVENT_LOG_SEGMENT_MB: int = 64
+    # fsync avant chaque lot : survit à un crash de l'OS ou une coupure de courant, au prix d'une
+    # écriture disque synchrone par lot (hors event loop). False : seul un crash du processus est couvert
+    WEBHOOK_EVENT_LOG_FSYNC: bool = True
+
+    # Métriques serveur (app.services.metrics_sampler) : intervalle de capture et relevés gardés en mémoire
+    METRICS_SAMPLE_INTERVAL_SECONDS: int = 30
+    METRICS_BUFFER_SIZE: int = 120
+    # Historique sous-échantillonné (app.services.metrics_history), purgé par la rétention
+    METRICS_MINUTE_RETENTION_DAYS: int = 7
+    METRICS_HOUR_RETENTION_DAYS: int = 365
+
+    # Partitions mensuelles de playback_sessions et server_metrics (MariaDB, app.services.partition_service)
+    DB_PARTITIONING_ENABLED: bool = False
+    DB_PARTITION_AHEAD_MONTHS: int = 3
+
+    # Rétention des tables brutes (app.services.retention_service), 0 = conserver
+    RETENTION_PLAYBACK_SESSIONS_DAYS: int = 90
+    RETENTION_SERVER_METRICS_DAYS: int = 7
+    RETENTION_CHUNK_SIZE: int = 1000
+    RETENTION_CHUNK_PAUSE_MS: int = 50
+    RETENTION_MAX_SECONDS: int = 60
+    RETENTION_ARCHIVE_ENABLED: bool = False
+    RETENTION_ARCHIVE_DIR: str = "data/archive"
+
+    # Profilage SQL par requête HTTP et tâche planifiée (app.core.query_profiler), en-têtes X-DB-* en réponse
+    QUERY_PROFILING_ENABLED: bool = False
+    QUERY_PROFILING_SLOW_MS: int = 500
+
     # Security
     SECRET_KEY: str
     API_KEY: str
     WEBHOOK_SECRET: str = ""
 
+    # Connecteurs HTTP (clients partagés par le connector_registry)
+    HTTP_TIMEOUT: float = 30.0
+    HTTP_MAX_CONNECTIONS: int = 20
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 10
+    HTTP_KEEPALIVE_EXPIRY: float = 60.0
+
     # App Info
     APP_NAME: str = "Servarr Hub"
     APP_VERSION: str = "1.0.0"
@@ -0,0 +1,180 @@
+"""
+Compteurs internes exposés au format texte Prometheus (/metrics)
+"""
+
+import math
+import re
+import threading
+from collections.abc import Iterable
+
+# Bornes par défaut des histogrammes de durée (secondes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Segments de chemin variables (ids numériques, GUID Jellyfin, UUID) : une série par endpoint, pas par id
+_ID_SEGMENT = re.compile(r"^(\d+|[0-9a-fA-F]{16,}|[0-9a-fA-F-]{36})$")
+
+
+def endpoint_label(endpoint: str) -> str:
+    """Chemin d'endpoint sans ses identifiants (ex: /api/v3/movie/42 -> /api/v3/movie/{id})"""
+    path = endpoint.split("?", 1)[0]
+    return "/".join("{id}" if _ID_SEGMENT.match(segment) else segment for segment in path.split("/"))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Compteur monotone, une valeur par combinaison de labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        lines = self._header()
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}_total{_labels(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    """Histogramme cumulatif (buckets, somme, nombre), par combinaison de labels"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        # Par clé : [compte par bucket (non cumulé)..., somme]
+        self._values: dict[tuple[str, ...], list[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [0] * len(self.buckets) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    def render(self) -> list[str]:
+        with self._lock:
+            values = {key: list(counts) for key, counts in self._values.items()}
+        lines = self._header()
+        for key, counts in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts[:-1], strict=True):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {_number(counts[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+def snapshot(
+    name: str, documentation: str, samples: Iterable[tuple[dict[str, str], float | None]], kind: str = "gauge"
+) -> list[str]:
+    """
+    Métrique calculée au moment du scrape, à partir de l'état en mémoire (file, pool, échantillonneur)
+
+    Args:
+        samples: [(labels, valeur), ...] ; les valeurs None sont omises
+        kind: "gauge", ou "counter" pour un compteur tenu ailleurs (suffixe _total ajouté)
+    """
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    suffix = "_total" if kind == "counter" else ""
+    for labels, value in samples:
+        if value is None:
+            continue
+        names = tuple(labels)
+        lines.append(f"{name}{suffix}{_labels(names, tuple(labels[n] for n in names))} {_number(value)}")
+    return lines
+
+
+def render(*snapshots: list[str]) -> str:
+    """Toutes les métriques enregistrées, puis celles calculées au scrape, au format texte 0.0.4"""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    for snapshot_lines in snapshots:
+        lines.extend(snapshot_lines)
+    return "\n".join(lines) + "\n"
+
+
+# Métriques déclarées (dans l'ordre de déclaration à l'exposition)
+REGISTRY: list[_Metric] = []
+
+SYNC_DURATION = Histogram(
+    "servarr_sync_duration_seconds", "Durée des synchronisations par service", ("service", "status")
+)
+SYNC_RECORDS = Counter("servarr_sync_records", "Enregistrements synchronisés par service", ("service",))
+
+CONNECTOR_REQUEST_DURATION = Histogram(
+    "servarr_connector_request_duration_seconds",
+    "Latence des requêtes vers les services externes",
+    ("connector", "method", "endpoint"),
+)
+CONNECTOR_ERRORS = Counter(
+    "servarr_connector_errors",
+    "Requêtes en erreur vers les services externes (HTTP >= 400 ou erreur réseau)",
+    ("connector", "method", "endpoint", "reason"),
+)
+
+WEBHOOK_EVENTS = Counter("servarr_webhook_events", "Webhooks de lecture reçus par type et issue", ("event", "result"))
+
+DB_POOL_WAIT = Histogram(
+    "servarr_db_pool_checkout_wait_seconds",
+    "Attente d'une connexion du pool SQLAlchemy",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0),
+)
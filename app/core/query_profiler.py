@@ -0,0 +1,160 @@
+"""
+Profilage des requêtes SQL par requête HTTP et par tâche planifiée (opt-in)
+
+Les événements de l'engine SQLAlchemy alimentent le profil courant, porté par un contextvar :
+il suit la requête HTTP dans le threadpool de Starlette, dans run_db et dans les tâches créées
+par asyncio.gather. Activé par QUERY_PROFILING_ENABLED ; sans effet sinon.
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Nombre de fingerprints détaillés dans le log d'une requête lente
+SLOW_LOG_FINGERPRINTS = 10
+
+_current: ContextVar["QueryProfile | None"] = ContextVar("query_profile", default=None)
+
+_PARAMETER = re.compile(r"%\(\w+\)s|%s|\?|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PARAMETER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """Requête sans ses valeurs : les N+1 d'une même requête partagent le même fingerprint"""
+    normalized = _PARAMETER.sub("?", statement)
+    normalized = _PARAMETER_LIST.sub("(...)", normalized)
+    return _WHITESPACE.sub(" ", normalized).strip()
+
+
+class QueryProfile:
+    """Requêtes SQL exécutées pendant une requête HTTP ou une tâche planifiée"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_time = 0.0
+        self.rows = 0
+        self.fingerprints: Counter[str] = Counter()
+        self.fingerprint_time: Counter[str] = Counter()
+        # Requêtes concurrentes possibles (run_db dans asyncio.gather)
+        self._lock = threading.Lock()
+
+    def record(self, statement: str, seconds: float, rowcount: int):
+        key = fingerprint(statement)
+        with self._lock:
+            self.statements += 1
+            self.db_time += seconds
+            # Lignes lues (SELECT) ou modifiées (DML) ; -1 si inconnu
+            self.rows += max(rowcount, 0)
+            self.fingerprints[key] += 1
+            self.fingerprint_time[key] += seconds
+
+    @property
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def headers(self) -> dict[str, str]:
+        """En-têtes de debug (X-DB-*) ajoutés aux réponses"""
+        return {
+            "X-DB-Query-Count": str(self.statements),
+            "X-DB-Time-Ms": f"{self.db_time * 1000:.1f}",
+            "X-DB-Rows": str(self.rows),
+        }
+
+    def log_if_slow(self):
+        """Logger le profil si la durée dépasse QUERY_PROFILING_SLOW_MS, avec les requêtes les plus répétées"""
+        elapsed_ms = self.elapsed_ms
+        if elapsed_ms < settings.QUERY_PROFILING_SLOW_MS:
+            return
+
+        with self._lock:
+            top = self.fingerprints.most_common(SLOW_LOG_FINGERPRINTS)
+            lines = [f"    {count:>5}x {self.fingerprint_time[key] * 1000:>8.1f}ms  {key[:300]}" for key, count in top]
+
+        logger.warning(
+            f"🐢 {self.name} : {elapsed_ms:.0f}ms, {self.statements} requêtes SQL "
+            f"({self.db_time * 1000:.0f}ms en base, {self.rows} lignes)\n" + "\n".join(lines)
+        )
+
+
+@contextmanager
+def profile(name: str) -> Iterator[QueryProfile | None]:
+    """
+    Profiler les requêtes SQL exécutées dans le bloc (None si le profilage est désactivé)
+
+    Args:
+        name: Libellé du profil (ex: "GET /api/dashboard", "sync_job")
+    """
+    if not settings.QUERY_PROFILING_ENABLED:
+        yield None
+        return
+
+    query_profile = QueryProfile(name)
+    token = _current.set(query_profile)
+    try:
+        yield query_profile
+    finally:
+        _current.reset(token)
+        query_profile.log_if_slow()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Une requête à la fois par connexion : pas de pile (une requête en erreur n'a pas d'after)
+    conn.info["query_profiler_started"] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    query_profile = _current.get()
+    if query_profile is not None:
+        started = conn.info.get("query_profiler_started", time.perf_counter())
+        query_profile.record(statement, time.perf_counter() - started, cursor.rowcount)
+
+
+def install(engine: Engine):
+    """Brancher le profilage sur les événements de l'engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryProfilerMiddleware:
+    """
+    Middleware ASGI : un profil par requête HTTP, exposé dans les en-têtes X-DB-* de la réponse
+
+    Les en-têtes reflètent les requêtes exécutées avant l'envoi de la réponse (pas celles des
+    BackgroundTasks, comptées dans le log).
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.QUERY_PROFILING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        with profile(f"{scope['method']} {scope['path']}") as query_profile:
+
+            async def send_with_headers(message: Message):
+                if message["type"] == "http.response.start":
+                    headers = MutableHeaders(scope=message)
+                    for name, value in query_profile.headers().items():
+                        headers.append(name, value)
+                await send(message)
+
+            await self.app(scope, receive, send_with_headers)
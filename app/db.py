@@ -2,21 +2,49 @@
 Configuration de la base de données
 """
 
+import asyncio
+import contextvars
+import functools
 import logging
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
 
 from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import QueuePool
 
+from app.core import query_profiler
 from app.core.config import settings
+from app.core.metrics import DB_POOL_WAIT
 
 # Désactiver les logs SQLAlchemy
 logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
 logging.getLogger("sqlalchemy.pool").setLevel(logging.WARNING)
 
+
+class TimedQueuePool(QueuePool):
+    """QueuePool qui mesure l'attente d'une connexion (pool saturé ou ouverture), exposée sur /metrics"""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+
 # Créer l'engine SQLAlchemy
 engine = create_engine(
-    settings.DATABASE_URL, echo=False, pool_pre_ping=True, pool_size=10, max_overflow=20, pool_recycle=3600
+    settings.DATABASE_URL,
+    echo=False,
+    poolclass=TimedQueuePool,
+    pool_pre_ping=True,
+    pool_size=10,
+    max_overflow=20,
+    pool_recycle=3600,
 )
 
 
@@ -28,10 +56,21 @@ def receive_connect(dbapi_conn, connection_record):
     connection_record.info.pop("sqlalchemy_cache", None)
 
 
+if settings.QUERY_PROFILING_ENABLED:
+    query_profiler.install(engine)
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
+# Pool de threads dédié au travail SQLAlchemy synchrone lancé depuis l'event loop (voir run_db).
+# Séparé du threadpool par défaut d'anyio/Starlette pour qu'une rafale de webhooks ne prive
+# pas les autres routes de threads. Borné par le pool de connexions.
+db_executor = ThreadPoolExecutor(max_workers=settings.DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+
+T = TypeVar("T")
+
 
 def get_db():
     """Dépendance pour obtenir une session DB"""
@@ -42,6 +81,39 @@ def get_db():
         db.close()
 
 
+def _run_with_session(fn: Callable[..., T], *args: Any) -> T:
+    """Exécuter fn(db, *args) avec une session dédiée (thread du db_executor)"""
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def run_db(fn: Callable[..., T], *args: Any) -> T:
+    """
+    Exécuter du travail SQLAlchemy synchrone hors de l'event loop
+
+    fn reçoit une session ouverte pour l'appel (fermée ensuite) : les objets ORM ne doivent
+    pas sortir de fn, retourner des valeurs simples.
+
+    Args:
+        fn: Fonction synchrone fn(db, *args)
+        *args: Arguments supplémentaires de fn
+
+    Returns:
+        Valeur retournée par fn
+    """
+    loop = asyncio.get_running_loop()
+    # Propager les contextvars (logging, profiling) dans le thread
+    context = contextvars.copy_context()
+    call = functools.partial(context.run, _run_with_session, fn, *args)
+    return await loop.run_in_executor(db_executor, call)
+
+
 def check_db_connection():
     """Vérifier la connexion à la base de données"""
     try:
@@ -53,5 +125,12 @@ def check_db_connection():
 
 
 def init_db():
-    """Initialiser la base de données (créer les tables)"""
+    """Initialiser la base de données (créer les tables, partitionner si activé)"""
     Base.metadata.create_all(bind=engine)
+
+    if settings.DB_PARTITIONING_ENABLED:
+        from app.services.partition_service import PartitionService
+
+        with SessionLocal() as db:
+            PartitionService.ensure_partitioned(db)
+            PartitionService.maintain(db)
@@ -4,7 +4,9 @@ Script de migration pour ajouter les tables analytics
 
 from sqlalchemy import inspect
 
-from app.db import Base, check_db_connection, engine
+from app.core.config import settings
+from app.db import Base, SessionLocal, check_db_connection, engine
+from app.services.partition_service import PartitionService
 
 
 def get_existing_tables():
@@ -60,6 +62,28 @@ def create_analytics_tables():
         return False
 
 
+def partition_analytics_tables():
+    """Partitionne par mois playback_sessions et server_metrics (si DB_PARTITIONING_ENABLED)"""
+    if not settings.DB_PARTITIONING_ENABLED:
+        print("\nℹ️  Partitionnement désactivé (DB_PARTITIONING_ENABLED=false)")
+        return True
+
+    try:
+        print("\n🧱 Partitionnement mensuel des tables brutes (réécriture des tables existantes)...")
+        with SessionLocal() as db:
+            converted = PartitionService.ensure_partitioned(db)
+            PartitionService.maintain(db)
+        if converted:
+            print(f"✅ Tables partitionnées : {', '.join(converted)}")
+        else:
+            print("✅ Tables déjà partitionnées")
+        return True
+
+    except Exception as e:
+        print(f"❌ Erreur lors du partitionnement : {e}")
+        return False
+
+
 def show_table_info():
     """Affiche les informations détaillées sur toutes les tables"""
     inspector = inspect(engine)
@@ -93,7 +117,7 @@ if __name__ == "__main__":
     print("=" * 60)
 
     # Créer les tables
-    success = create_analytics_tables()
+    success = create_analytics_tables() and partition_analytics_tables()
 
     if success:
         # Afficher les infos
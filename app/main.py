@@ -3,12 +3,16 @@ from contextlib import asynccontextmanager
 from fastapi import Depends, FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.api.routes import analytics, dashboard, jellyseerr, services, sync, torrents
+from app.api.routes import analytics, dashboard, jellyseerr, metrics, services, sync, torrents
 from app.core.config import settings
+from app.core.query_profiler import QueryProfilerMiddleware
 from app.core.security import verify_api_key
-from app.db import check_db_connection, init_db
+from app.db import SessionLocal, check_db_connection, db_executor, init_db
 from app.schedulers.analytics_scheduler import analytics_scheduler
 from app.schedulers.scheduler import app_scheduler
+from app.services.active_sessions import active_session_index
+from app.services.connector_registry import connector_registry
+from app.services.webhook_queue import webhook_queue
 
 
 @asynccontextmanager
@@ -22,12 +26,17 @@ async def lifespan(app: FastAPI):
         print("✅ Connexion à la base de données OK")
         init_db()
         print("✅ Tables initialisées")
+
+        # Charger l'index des sessions actives avant d'accepter des webhooks
+        with SessionLocal() as db:
+            active_session_index.warm(db)
     else:
         print("❌ Échec de connexion à la base de données")
 
     # Démarrer le scheduler (sync toutes les 15 minutes)
     app_scheduler.start(interval_minutes=15)
     analytics_scheduler.start()
+    webhook_queue.start()
 
     yield
 
@@ -35,6 +44,9 @@ async def lifespan(app: FastAPI):
     print("🛑 Arrêt de l'application...")
     app_scheduler.stop()
     analytics_scheduler.stop()
+    await webhook_queue.stop()
+    await connector_registry.close_all()
+    db_executor.shutdown(wait=True)
 
 
 # Créer l'application FastAPI
@@ -47,8 +59,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-DB-Query-Count", "X-DB-Time-Ms", "X-DB-Rows"],
 )
 
+# Profilage SQL par requête (QUERY_PROFILING_ENABLED)
+app.add_middleware(QueryProfilerMiddleware)
+
 # Inclure les routers
 app.include_router(services.router, prefix="/api", dependencies=[Depends(verify_api_key)])
 app.include_router(dashboard.router, prefix="/api", dependencies=[Depends(verify_api_key)])
@@ -56,6 +72,7 @@ app.include_router(jellyseerr.router, prefix="/api", dependencies=[Depends(verif
 app.include_router(sync.router, prefix="/api", dependencies=[Depends(verify_api_key)])
 app.include_router(analytics.router, prefix="/api")
 app.include_router(torrents.router, dependencies=[Depends(verify_api_key)])
+app.include_router(metrics.router, dependencies=[Depends(verify_api_key)])
 
 
 @app.get("/")
@@ -80,4 +97,5 @@ async def health_check():
         "database": "connected" if db_status else "disconnected",
         "scheduler": "running" if app_scheduler.is_running else "stopped",
         "analytics_scheduler": "running" if analytics_scheduler.running else "stopped",
+        "webhook_queue": webhook_queue.stats(),
     }
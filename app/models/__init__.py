@@ -5,6 +5,7 @@ from app.models.enums import (
     RequestStatus,
     ServiceType,
     StatType,
+    SyncMode,
     SyncStatus,
 )
 from app.models.models import (
@@ -20,6 +21,7 @@ __all__ = [
     "ServiceType",
     "StatType",
     "SyncStatus",
+    "SyncMode",
     "MediaType",
     "RequestPriority",
     "RequestStatus",
@@ -9,6 +9,12 @@ class ServiceType(str, enum.Enum):
     QBITTORRENT = "qbittorrent"
 
 
+class SyncMode(str, enum.Enum):
+    RECENT = "recent"  # Ajouts des 30 derniers jours
+    FULL = "full"  # Bibliothèque complète, traitée par lots
+    INCREMENTAL = "incremental"  # Delta depuis le high-water mark + réconciliation périodique
+
+
 class StatType(str, enum.Enum):
     USERS = "users"
     MOVIES = "movies"
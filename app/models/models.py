@@ -1,6 +1,20 @@
 import uuid
 
-from sqlalchemy import JSON, Boolean, Column, Date, DateTime, Float, Index, Integer, String, Text
+from sqlalchemy import (
+    JSON,
+    BigInteger,
+    Boolean,
+    Column,
+    Computed,
+    Date,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    PrimaryKeyConstraint,
+    String,
+    Text,
+)
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.sql import func
 
@@ -69,6 +83,12 @@ class SyncMetadata(Base):
     next_sync_time = Column(DateTime(timezone=True), index=True)
     sync_duration_ms = Column(Integer)
     records_synced = Column(Integer, default=0)
+    # Progression de la synchro en cours (mise à jour à chaque lot)
+    progress_processed = Column(Integer, default=0)
+    progress_total = Column(Integer, default=0)
+    # Synchro incrémentale : date du dernier événement d'historique traité
+    high_water_mark = Column(String(64))
+    last_full_sync_time = Column(DateTime(timezone=True))
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
@@ -93,6 +113,10 @@ class LibraryItem(Base):
     nb_media = Column(Integer, default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Clé naturelle (type, titre, année) pour l'upsert en masse : voir app/services/bulk_upsert.py
+    natural_key = Column(String(40), nullable=False)
+
+    __table_args__ = (Index("uq_library_natural_key", "natural_key", unique=True),)
 
 
 # Table 5: Calendar Events
@@ -109,6 +133,10 @@ class CalendarEvent(Base):
     status = Column(SQLEnum(CalendarStatus), nullable=False, default=CalendarStatus.MONITORED, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Clé naturelle (type, titre ou épisode, date) pour l'upsert en masse : voir app/services/bulk_upsert.py
+    natural_key = Column(String(40), nullable=False)
+
+    __table_args__ = (Index("uq_calendar_natural_key", "natural_key", unique=True),)
 
 
 # Table 6: Jellyseerr Requests
@@ -173,6 +201,8 @@ class PlaybackSession(Base):
     # Timestamps
     start_time = Column(DateTime(timezone=True), nullable=False, index=True)
     end_time = Column(DateTime(timezone=True), index=True)
+    # Jour de début, calculé par la base : regroupements par jour sans func.date(start_time)
+    session_date = Column(Date, Computed("DATE(start_time)", persisted=True))
     last_activity = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Durée et progression
@@ -193,6 +223,7 @@ class PlaybackSession(Base):
         Index("idx_session_media_start", "media_id", "start_time"),
         Index("idx_session_user_start", "user_id", "start_time"),
         Index("idx_session_device_start", "device_type", "start_time"),
+        Index("idx_session_date_device", "session_date", "device_type"),
     )
 
 
@@ -293,7 +324,12 @@ class DailyAnalytic(Base):
 
 # Table 11: Server Metrics (Métriques serveur en temps réel)
 class ServerMetric(Base):
-    """Métriques du serveur (CPU, RAM, etc.) - Snapshots réguliers"""
+    """
+    Métriques du serveur (CPU, RAM, etc.) - anciens snapshots réguliers
+
+    Plus alimentée : les relevés restent en mémoire (metrics_sampler) et l'historique est dans
+    server_metrics_minute / server_metrics_hour. Conservée pour que la rétention purge les lignes existantes.
+    """
 
     __tablename__ = "server_metrics"
 
@@ -320,3 +356,133 @@ class ServerMetric(Base):
     # Timestamp
     recorded_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# Tables 12-14: Ensembles "déjà vu" des compteurs uniques (MediaStatistic.unique_users,
+# DailyAnalytic.unique_users / unique_media). Une ligne par couple rencontré : un INSERT IGNORE
+# par session arrêtée dit si le couple est nouveau, au lieu d'un COUNT(DISTINCT) sur l'historique.
+class MediaViewer(Base):
+    """Utilisateurs ayant terminé une session sur un média"""
+
+    __tablename__ = "media_viewers"
+
+    media_id = Column(String(255), primary_key=True)
+    user_id = Column(String(255), primary_key=True)
+
+
+class DailyViewer(Base):
+    """Utilisateurs ayant terminé une session commencée un jour donné"""
+
+    __tablename__ = "daily_viewers"
+
+    date = Column(Date, primary_key=True)
+    user_id = Column(String(255), primary_key=True)
+
+
+class DailyMedia(Base):
+    """Médias dont une session commencée un jour donné a été terminée"""
+
+    __tablename__ = "daily_media"
+
+    date = Column(Date, primary_key=True)
+    media_id = Column(String(255), primary_key=True)
+
+
+# Tables 15-18: Rollups temporels des sessions de lecture (app/services/rollup_service.py)
+# Une ligne par période et par combinaison (type d'appareil, type de média, méthode de lecture).
+# hourly est calculé depuis playback_sessions, daily depuis hourly, weekly et monthly depuis daily.
+class PlaybackRollupMixin:
+    """Dimensions et compteurs communs aux tables de rollup"""
+
+    device_type = Column(SQLEnum(DeviceType), nullable=False)
+    media_type = Column(SQLEnum(MediaType), nullable=False)
+    playback_method = Column(SQLEnum(PlaybackMethod), nullable=False)
+
+    plays = Column(Integer, nullable=False, default=0)
+    watched_seconds = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (PrimaryKeyConstraint("period_start", "device_type", "media_type", "playback_method"),)
+
+
+class HourlyPlaybackRollup(PlaybackRollupMixin, Base):
+    """Sessions par heure de début (UTC)"""
+
+    __tablename__ = "playback_rollups_hourly"
+
+    period_start = Column(DateTime, nullable=False)  # Début de l'heure
+
+
+class DailyPlaybackRollup(PlaybackRollupMixin, Base):
+    """Sessions par jour de début"""
+
+    __tablename__ = "playback_rollups_daily"
+
+    period_start = Column(Date, nullable=False)
+
+
+class WeeklyPlaybackRollup(PlaybackRollupMixin, Base):
+    """Sessions par semaine ISO de début"""
+
+    __tablename__ = "playback_rollups_weekly"
+
+    period_start = Column(Date, nullable=False)  # Lundi de la semaine
+
+
+class MonthlyPlaybackRollup(PlaybackRollupMixin, Base):
+    """Sessions par mois de début"""
+
+    __tablename__ = "playback_rollups_monthly"
+
+    period_start = Column(Date, nullable=False)  # 1er du mois
+
+
+# Tables 19-20: Historique sous-échantillonné des métriques serveur (app/services/metrics_history.py)
+# min/avg/max de chaque série par minute (depuis les relevés bruts) et par heure (depuis les minutes).
+class ServerMetricSeriesMixin:
+    """Nombre de relevés et min/avg/max des séries de métriques serveur sur une période"""
+
+    samples = Column(Integer, nullable=False, default=0)
+
+    cpu_usage_percent_min = Column(Float)
+    cpu_usage_percent_avg = Column(Float)
+    cpu_usage_percent_max = Column(Float)
+
+    memory_usage_gb_min = Column(Float)
+    memory_usage_gb_avg = Column(Float)
+    memory_usage_gb_max = Column(Float)
+
+    bandwidth_mbps_min = Column(Float)
+    bandwidth_mbps_avg = Column(Float)
+    bandwidth_mbps_max = Column(Float)
+
+    disk_read_mbps_min = Column(Float)
+    disk_read_mbps_avg = Column(Float)
+    disk_read_mbps_max = Column(Float)
+
+    disk_write_mbps_min = Column(Float)
+    disk_write_mbps_avg = Column(Float)
+    disk_write_mbps_max = Column(Float)
+
+    active_sessions_count_min = Column(Float)
+    active_sessions_count_avg = Column(Float)
+    active_sessions_count_max = Column(Float)
+
+    active_transcoding_count_min = Column(Float)
+    active_transcoding_count_avg = Column(Float)
+    active_transcoding_count_max = Column(Float)
+
+
+class ServerMetricMinute(ServerMetricSeriesMixin, Base):
+    """Métriques serveur par minute (UTC)"""
+
+    __tablename__ = "server_metrics_minute"
+
+    period_start = Column(DateTime, primary_key=True)
+
+
+class ServerMetricHour(ServerMetricSeriesMixin, Base):
+    """Métriques serveur par heure (UTC)"""
+
+    __tablename__ = "server_metrics_hour"
+
+    period_start = Column(DateTime, primary_key=True)
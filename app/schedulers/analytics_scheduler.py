@@ -7,9 +7,15 @@ import threading
 import time
 from datetime import datetime, timedelta
 
+from app.core.config import settings
+from app.core.query_profiler import profile
 from app.db import SessionLocal
 from app.services.analytics_service import AnalyticsService
+from app.services.metrics_sampler import metrics_sampler
 from app.services.metrics_service import MetricsService
+from app.services.partition_service import PartitionService
+from app.services.retention_service import retention_service
+from app.services.rollup_service import rollup_service
 
 logger = logging.getLogger(__name__)
 
@@ -30,10 +36,10 @@ class AnalyticsScheduler:
 
         self.running = True
 
-        # Thread 1 : Capture des métriques serveur (toutes les 30 secondes)
+        # Thread 1 : Capture des métriques serveur (toutes les 30 secondes par défaut)
         self.metrics_thread = threading.Thread(target=self._metrics_loop, daemon=True)
         self.metrics_thread.start()
-        logger.info("✅ Metrics scheduler démarré (intervalle: 30s)")
+        logger.info(f"✅ Metrics scheduler démarré (intervalle: {settings.METRICS_SAMPLE_INTERVAL_SECONDS}s)")
 
         # Thread 2 : Nettoyage et agrégations (toutes les heures)
         self.cleanup_thread = threading.Thread(target=self._cleanup_loop, daemon=True)
@@ -47,20 +53,25 @@ class AnalyticsScheduler:
 
     def _metrics_loop(self):
         """Boucle pour capturer les métriques serveur"""
+        interval = settings.METRICS_SAMPLE_INTERVAL_SECONDS
+
+        # Compteurs de référence : la première capture couvre déjà un intervalle complet
+        metrics_sampler.prime()
+
         while self.running:
             try:
+                # Attendre l'intervalle (les débits sont des moyennes sur cette période)
+                time.sleep(interval)
+
                 db = SessionLocal()
                 try:
-                    MetricsService.capture_metrics(db)
+                    with profile("metrics_job"):
+                        MetricsService.capture_metrics(db)
                 finally:
                     db.close()
 
-                # Attendre 30 secondes
-                time.sleep(30)
-
             except Exception as e:
                 logger.error(f"❌ Erreur dans metrics_loop : {e}")
-                time.sleep(30)
 
     def _cleanup_loop(self):
         """Boucle pour le nettoyage et les agrégations"""
@@ -68,15 +79,22 @@ class AnalyticsScheduler:
             try:
                 db = SessionLocal()
                 try:
-                    # 1. Nettoyer les sessions orphelines (actives depuis > 24h)
-                    AnalyticsService.cleanup_orphan_sessions(db, timeout_hours=24)
+                    with profile("cleanup_job"):
+                        # 1. Nettoyer les sessions orphelines (actives depuis > 24h)
+                        AnalyticsService.cleanup_orphan_sessions(db, timeout_hours=24)
+
+                        # 2. Mettre à jour les device statistics d'hier
+                        yesterday = (datetime.utcnow() - timedelta(days=1)).date()
+                        AnalyticsService.update_device_statistics(db, yesterday)
+
+                        # 3. Compacter les rollups horaires, quotidiens, hebdomadaires et mensuels
+                        rollup_service.compact(db)
 
-                    # 2. Mettre à jour les device statistics d'hier
-                    yesterday = (datetime.utcnow() - timedelta(days=1)).date()
-                    AnalyticsService.update_device_statistics(db, yesterday)
+                        # 4. Créer à l'avance les partitions des mois à venir
+                        PartitionService.maintain(db)
 
-                    # 3. Nettoyer les vieilles métriques (garder 7 jours)
-                    MetricsService.cleanup_old_metrics(db, keep_days=7)
+                        # 5. Purger les sessions et métriques expirées (partitions puis lots, budget de temps borné)
+                        retention_service.run(db)
 
                 finally:
                     db.close()
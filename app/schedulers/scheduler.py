@@ -1,7 +1,9 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
+from app.core.query_profiler import profile
 from app.db import SessionLocal
+from app.models import SyncMode
 from app.schedulers.sync_service import SyncService
 from app.services.torrent_enrichment_service import TorrentEnrichmentService
 
@@ -15,22 +17,23 @@ class AppScheduler:
 
     async def run_sync_job(self):
         """Tâche de synchronisation à exécuter"""
-        db = SessionLocal()
-        try:
-            # 1. Synchronisation des données
-            sync_service = SyncService(db)
-            await sync_service.sync_all()
+        with profile("sync_job"):
+            db = SessionLocal()
+            try:
+                # 1. Synchronisation des données (delta depuis le dernier passage, réconciliation quotidienne)
+                sync_service = SyncService(db)
+                await sync_service.sync_all(mode=SyncMode.INCREMENTAL)
 
-            # 2. Enrichissement des torrents
-            print("\n🔄 Enrichissement des torrents...")
-            torrent_service = TorrentEnrichmentService(db)
-            stats = await torrent_service.enrich_all_items(limit=50)  # Limiter à 50 par run
-            print(f"✅ Torrents enrichis : {stats.get('success')}/{stats.get('total')}")
+                # 2. Enrichissement des torrents
+                print("\n🔄 Enrichissement des torrents...")
+                torrent_service = TorrentEnrichmentService(db)
+                stats = await torrent_service.enrich_changed_items()  # Seulement les torrents modifiés
+                print(f"✅ Torrents enrichis : {stats.get('success')}/{stats.get('total')}")
 
-        except Exception as e:
-            print(f"❌ Erreur lors de la synchro planifiée: {e}")
-        finally:
-            db.close()
+            except Exception as e:
+                print(f"❌ Erreur lors de la synchro planifiée: {e}")
+            finally:
+                db.close()
 
     def start(self, interval_minutes: int = 15):
         """
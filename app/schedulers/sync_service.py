@@ -1,15 +1,17 @@
+import asyncio
 import time
+from collections.abc import Awaitable, Callable, Iterable
 from datetime import UTC, datetime, timedelta
 from typing import Any
 
 from sqlalchemy.orm import Session
 
+from app.core.metrics import SYNC_DURATION, SYNC_RECORDS
+from app.db import SessionLocal
 from app.models import (
-    CalendarEvent,
     CalendarStatus,
     DashboardStatistic,
     JellyseerrRequest,
-    LibraryItem,
     MediaType,
     RequestPriority,
     RequestStatus,
@@ -17,16 +19,48 @@ from app.models import (
     ServiceType,
     StatType,
     SyncMetadata,
+    SyncMode,
     SyncStatus,
 )
-from app.services import JellyfinConnector, JellyseerrConnector, RadarrConnector, SonarrConnector
+from app.services import RadarrConnector, SonarrConnector
+from app.services.bulk_upsert import (
+    UpsertResult,
+    calendar_event_key,
+    delete_missing_library_items,
+    iter_batches,
+    library_item_key,
+    upsert_calendar_events,
+    upsert_library_items,
+)
+from app.services.connector_registry import connector_registry
+from app.services.upstream_snapshot import UpstreamSnapshot
+
+# Synchronisations lancées par sync_all (nom -> méthode sync_<nom>)
+SYNC_TASKS = ("radarr", "sonarr", "jellyfin", "jellyseerr", "monitored_items")
+
+# Synchronisations qui acceptent un SyncMode
+MODE_AWARE_TASKS = ("radarr", "sonarr", "monitored_items")
+
+# Synchronisations lancées après les autres : elles réutilisent les collections du snapshot
+SECOND_PHASE_TASKS = ("monitored_items",)
+
+# Taille des lots du pipeline transformation -> upsert -> commit
+SYNC_BATCH_SIZE = 500
+
+# Intervalle entre deux réconciliations complètes en mode INCREMENTAL (détection des suppressions)
+RECONCILE_INTERVAL = timedelta(hours=24)
+
+# Requêtes concurrentes max pour récupérer les items touchés par un delta
+DELTA_FETCH_CONCURRENCY = 8
 
 
 class SyncService:
     """Service de synchronisation des données depuis les APIs externes"""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, snapshot: UpstreamSnapshot | None = None):
         self.db = db
+        # Collections upstream partagées pendant le run (voir sync_all)
+        self.snapshot = snapshot or UpstreamSnapshot()
 
     def get_active_service(self, service_type: ServiceType) -> ServiceConfiguration:
         """Récupérer la configuration d'un service actif"""
@@ -36,16 +70,34 @@ class SyncService:
             .first()
         )
 
-    def update_sync_metadata(
-        self, service_type: ServiceType, status: SyncStatus, records: int = 0, duration_ms: int = 0, error: str = None
-    ):
-        """Mettre à jour les métadonnées de sync"""
+    def _get_sync_metadata(self, service_type: ServiceType) -> SyncMetadata:
+        """Récupérer (ou créer) les métadonnées de sync d'un service"""
         sync_meta = self.db.query(SyncMetadata).filter(SyncMetadata.service_name == service_type).first()
 
         if not sync_meta:
             sync_meta = SyncMetadata(service_name=service_type)
             self.db.add(sync_meta)
 
+        return sync_meta
+
+    def update_sync_progress(self, service_type: ServiceType, processed: int, total: int):
+        """Enregistrer la progression d'une synchro en cours (appelé après chaque lot)"""
+        sync_meta = self._get_sync_metadata(service_type)
+        sync_meta.sync_status = SyncStatus.IN_PROGRESS
+        sync_meta.progress_processed = processed
+        sync_meta.progress_total = total
+
+        self.db.commit()
+
+    def update_sync_metadata(
+        self, service_type: ServiceType, status: SyncStatus, records: int = 0, duration_ms: int = 0, error: str = None
+    ):
+        """Mettre à jour les métadonnées de sync"""
+        sync_meta = self._get_sync_metadata(service_type)
+
+        if status == SyncStatus.SUCCESS and sync_meta.progress_total:
+            sync_meta.progress_processed = sync_meta.progress_total
+
         sync_meta.last_sync_time = datetime.now(UTC)
         sync_meta.sync_status = status
         sync_meta.records_synced = records
@@ -55,73 +107,132 @@ class SyncService:
 
         self.db.commit()
 
-    async def sync_monitored_items(self) -> dict[str, Any]:
+        # Compteurs en mémoire exposés sur /metrics
+        SYNC_DURATION.observe(duration_ms / 1000, service=service_type.value, status=status.value)
+        SYNC_RECORDS.inc(records, service=service_type.value)
+
+    async def _get_radarr_movies(
+        self, connector: RadarrConnector, cached_only: bool = False
+    ) -> list[dict[str, Any]] | None:
+        """
+        Liste complète des films Radarr, téléchargée une seule fois par run
+
+        Args:
+            cached_only: Ne pas télécharger, retourner None si la liste n'est pas déjà dans le snapshot
+        """
+        key = f"{connector.base_url}/api/v3/movie"
+        if cached_only:
+            return self.snapshot.peek(key)
+        # Erreur propagée : une panne ne doit pas passer pour une bibliothèque vide
+        return await self.snapshot.fetch(key, lambda: connector.get_movies(raise_errors=True))
+
+    async def _get_sonarr_series(
+        self, connector: SonarrConnector, cached_only: bool = False
+    ) -> list[dict[str, Any]] | None:
+        """
+        Liste complète des séries Sonarr, téléchargée une seule fois par run
+
+        Args:
+            cached_only: Ne pas télécharger, retourner None si la liste n'est pas déjà dans le snapshot
+        """
+        key = f"{connector.base_url}/api/v3/series"
+        if cached_only:
+            return self.snapshot.peek(key)
+        return await self.snapshot.fetch(key, lambda: connector.get_series(raise_errors=True))
+
+    async def sync_monitored_items(self, mode: SyncMode = SyncMode.RECENT) -> dict[str, Any]:
         """
         Synchroniser les statistiques des items monitorés (Radarr + Sonarr)
+
+        Les statistiques de chaque service sont conservées séparément dans details["services"] :
+        un service dont la liste n'a pas pu être relue garde ses statistiques précédentes, et
+        les totaux sont recalculés à partir des deux parts.
+
+        Args:
+            mode: En INCREMENTAL, la part d'un service n'est recalculée que si sa liste complète a
+                déjà été téléchargée pendant le run (passe de réconciliation), pour ne pas
+                retélécharger toute la bibliothèque à chaque synchro. Radarr et Sonarr se
+                réconcilient chacun à leur rythme : chaque part est rafraîchie indépendamment.
         """
         print("📊 Synchronisation des items monitorés...")
+        cached_only = mode == SyncMode.INCREMENTAL
 
         try:
-            # Initialiser les totaux
-            total_monitored = 0
-            total_unmonitored = 0
-            downloading = 0
-            downloaded = 0
-            missing = 0
-            queued = 0
-            unreleased = 0
+            monitored_stat = (
+                self.db.query(DashboardStatistic)
+                .filter(DashboardStatistic.stat_type == StatType.MONITORED_ITEMS)
+                .first()
+            )
+            previous = (monitored_stat.details or {}).get("services", {}) if monitored_stat else {}
+
+            services: dict[str, dict[str, int]] = {}
+            refreshed = []
 
             # === RADARR ===
             radarr_service = self.get_active_service(ServiceType.RADARR)
             if radarr_service:
-                radarr_connector = RadarrConnector(
-                    base_url=radarr_service.url, api_key=radarr_service.api_key, port=radarr_service.port
-                )
+                radarr_connector = connector_registry.get(radarr_service)
+                part = previous.get("radarr")
 
                 try:
-                    radarr_stats = await radarr_connector.get_statistics()
-
-                    # Ajouter les stats Radarr
-                    total_monitored += radarr_stats.get("monitored_movies", 0)
-                    total_unmonitored += radarr_stats.get("total_movies", 0) - radarr_stats.get("monitored_movies", 0)
-                    downloaded += radarr_stats.get("downloaded_movies", 0)
-                    missing += radarr_stats.get("missing_movies", 0)
-
-                    print(f"  📽️  Radarr: {radarr_stats.get('monitored_movies', 0)} monitorés")
+                    movies = await self._get_radarr_movies(radarr_connector, cached_only=cached_only)
+                    if movies is None:
+                        print("  ⏭️  Radarr: liste complète absente du snapshot, statistiques précédentes conservées")
+                    else:
+                        radarr_stats = await radarr_connector.get_statistics(movies=movies)
+                        part = {
+                            "monitored": radarr_stats.get("monitored_movies", 0),
+                            "unmonitored": radarr_stats.get("total_movies", 0)
+                            - radarr_stats.get("monitored_movies", 0),
+                            "downloaded": radarr_stats.get("downloaded_movies", 0),
+                            "missing": radarr_stats.get("missing_movies", 0),
+                        }
+                        refreshed.append("radarr")
+                        print(f"  📽️  Radarr: {part['monitored']} monitorés")
                 except Exception as e:
                     print(f"  ⚠️  Erreur stats Radarr: {e}")
-                finally:
-                    await radarr_connector.close()
+
+                if part is not None:
+                    services["radarr"] = part
 
             # === SONARR ===
             sonarr_service = self.get_active_service(ServiceType.SONARR)
             if sonarr_service:
-                sonarr_connector = SonarrConnector(
-                    base_url=sonarr_service.url, api_key=sonarr_service.api_key, port=sonarr_service.port
-                )
+                sonarr_connector = connector_registry.get(sonarr_service)
+                part = previous.get("sonarr")
 
                 try:
-                    sonarr_stats = await sonarr_connector.get_statistics()
-
-                    # Ajouter les stats Sonarr
-                    total_monitored += sonarr_stats.get("monitored_series", 0)
-                    total_unmonitored += sonarr_stats.get("total_series", 0) - sonarr_stats.get("monitored_series", 0)
-                    downloaded += sonarr_stats.get("downloaded_episodes", 0)
-                    missing += sonarr_stats.get("missing_episodes", 0)
-
-                    print(f"  📺 Sonarr: {sonarr_stats.get('monitored_series', 0)} monitorés")
+                    series = await self._get_sonarr_series(sonarr_connector, cached_only=cached_only)
+                    if series is None:
+                        print("  ⏭️  Sonarr: liste complète absente du snapshot, statistiques précédentes conservées")
+                    else:
+                        sonarr_stats = await sonarr_connector.get_statistics(series=series)
+                        part = {
+                            "monitored": sonarr_stats.get("monitored_series", 0),
+                            "unmonitored": sonarr_stats.get("total_series", 0)
+                            - sonarr_stats.get("monitored_series", 0),
+                            "downloaded": sonarr_stats.get("downloaded_episodes", 0),
+                            "missing": sonarr_stats.get("missing_episodes", 0),
+                        }
+                        refreshed.append("sonarr")
+                        print(f"  📺 Sonarr: {part['monitored']} monitorés")
                 except Exception as e:
                     print(f"  ⚠️  Erreur stats Sonarr: {e}")
-                finally:
-                    await sonarr_connector.close()
 
-            # Mettre à jour ou créer la statistique MONITORED_ITEMS
-            monitored_stat = (
-                self.db.query(DashboardStatistic)
-                .filter(DashboardStatistic.stat_type == StatType.MONITORED_ITEMS)
-                .first()
-            )
+                if part is not None:
+                    services["sonarr"] = part
 
+            active = [name for name, service in (("radarr", radarr_service), ("sonarr", sonarr_service)) if service]
+            if cached_only and (not refreshed or len(services) < len(active)):
+                # Rien de nouveau, ou part d'un service encore inconnue (première réconciliation à venir)
+                return {"success": True, "skipped": True, "message": "Listes complètes non téléchargées pendant ce run"}
+
+            total_monitored = sum(part["monitored"] for part in services.values())
+            total_unmonitored = sum(part["unmonitored"] for part in services.values())
+            downloaded = sum(part["downloaded"] for part in services.values())
+            missing = sum(part["missing"] for part in services.values())
+
+            # Mettre à jour ou créer la statistique MONITORED_ITEMS
             if not monitored_stat:
                 monitored_stat = DashboardStatistic(stat_type=StatType.MONITORED_ITEMS)
                 self.db.add(monitored_stat)
@@ -131,11 +242,12 @@ class SyncService:
             monitored_stat.details = {
                 "monitored": total_monitored,
                 "unmonitored": total_unmonitored,
-                "downloading": downloading,
+                "downloading": 0,
                 "downloaded": downloaded,
                 "missing": missing,
-                "queued": queued,
-                "unreleased": unreleased,
+                "queued": 0,
+                "unreleased": 0,
+                "services": services,
             }
             monitored_stat.last_synced = datetime.now(UTC)
 
@@ -146,6 +258,7 @@ class SyncService:
                 "success": True,
                 "monitored": total_monitored,
                 "unmonitored": total_unmonitored,
+                "refreshed": refreshed,
                 "details": monitored_stat.details,
             }
 
@@ -153,174 +266,414 @@ class SyncService:
             print(f"❌ Erreur sync monitored items: {e}")
             return {"success": False, "error": str(e)}
 
-    async def sync_radarr(self) -> dict[str, Any]:
-        """Synchroniser les données Radarr"""
-        print("🎬 Synchronisation Radarr...")
-        start_time = time.time()
+    @staticmethod
+    def _poster_url(images: list[dict[str, Any]]) -> str:
+        """URL du poster (à défaut, première image disponible)"""
+        for img in images:
+            if img.get("coverType") == "poster":
+                return img.get("remoteUrl", "")
+        return images[0].get("remoteUrl", "") if images else ""
+
+    def _added_time_ago(self, added_date: str) -> str:
+        """Date d'ajout Radarr/Sonarr formatée en 'X days ago'"""
+        if not added_date:
+            return "Unknown"
+        added_dt = datetime.fromisoformat(added_date.replace("Z", "+00:00"))
+        return self._format_time_ago(added_dt)
+
+    def _movie_to_row(self, movie: dict[str, Any], movie_hash_map: dict[int, str]) -> dict[str, Any]:
+        """Transformer un film Radarr en ligne library_items"""
+        title = movie.get("title", "Unknown")
+        year = movie.get("year", 0)
+        movie_id = movie.get("id")
+        size_bytes = movie.get("sizeOnDisk", 0)
+
+        return {
+            "natural_key": library_item_key(MediaType.MOVIE, title, year),
+            "title": title,
+            "year": year,
+            "media_type": MediaType.MOVIE,
+            "image_url": self._poster_url(movie.get("images", [])),
+            "image_alt": f"{movie.get('title')} poster",
+            "quality": str(movie.get("qualityProfileId", "Unknown")),
+            "rating": str(movie.get("ratings", {}).get("imdb", {}).get("value", "")),
+            "description": movie.get("overview", ""),
+            "added_date": self._added_time_ago(movie.get("added", "")),
+            "size": f"{round(size_bytes / (1024**3), 1)} GB",
+            "torrent_hash": movie_hash_map.get(movie_id) if movie_id else None,
+            "nb_media": 1 if movie.get("hasFile") else 0,
+            "_size_bytes": size_bytes,
+        }
+
+    def _series_to_row(self, series: dict[str, Any], series_hash_map: dict[int, str]) -> dict[str, Any]:
+        """Transformer une série Sonarr en ligne library_items"""
+        title = series.get("title", "Unknown")
+        year = series.get("year", 0)
+        series_id = series.get("id")
+        statistics = series.get("statistics", {})
+        size_bytes = statistics.get("sizeOnDisk", 0)
+
+        return {
+            "natural_key": library_item_key(MediaType.TV, title, year),
+            "title": title,
+            "year": year,
+            "media_type": MediaType.TV,
+            "image_url": self._poster_url(series.get("images", [])),
+            "image_alt": f"{series.get('title')} poster",
+            "quality": str(series.get("qualityProfileId", "Unknown")),
+            "rating": str(series.get("ratings", {}).get("value", "")),
+            "description": series.get("overview", ""),
+            "added_date": self._added_time_ago(series.get("added", "")),
+            "size": f"{round(size_bytes / (1024**3), 1)} GB",
+            "torrent_hash": series_hash_map.get(series_id) if series_id else None,
+            "nb_media": statistics.get("episodeFileCount", 0),
+            "_size_bytes": size_bytes,
+        }
+
+    def _radarr_event_to_row(self, event: dict[str, Any]) -> dict[str, Any] | None:
+        """Transformer une sortie du calendrier Radarr en ligne calendar_events (None si sans date)"""
+        release_date_str = event.get("physicalRelease") or event.get("digitalRelease")
+        if not release_date_str:
+            return None
 
-        service = self.get_active_service(ServiceType.RADARR)
-        if not service:
-            print("⚠️ Service Radarr non configuré")
-            return {"success": False, "message": "Service non configuré"}
-
-        connector = RadarrConnector(base_url=service.url, api_key=service.api_key, port=service.port)
+        try:
+            release_date = datetime.fromisoformat(release_date_str.replace("Z", "+00:00")).date()
+        except (ValueError, TypeError):
+            return None
+
+        title = event.get("title", "Unknown")
+
+        return {
+            "natural_key": calendar_event_key(MediaType.MOVIE, title, release_date, None),
+            "title": title,
+            "media_type": MediaType.MOVIE,
+            "release_date": release_date,
+            "episode": None,
+            "image_url": self._poster_url(event.get("images", [])),
+            "image_alt": f"{title} poster",
+            "status": CalendarStatus.MONITORED,
+        }
+
+    def _sonarr_event_to_row(self, event: dict[str, Any]) -> dict[str, Any] | None:
+        """Transformer un épisode du calendrier Sonarr en ligne calendar_events (None si sans date)"""
+        if not event.get("airDate"):
+            return None
 
         try:
-            # Récupérer les films récents
-            recent_movies = await connector.get_recent_additions(days=30)
+            air_date = datetime.fromisoformat(event.get("airDate") + "T00:00:00+00:00").date()
+        except (ValueError, TypeError):
+            return None
+
+        # Titre et image depuis l'objet series (inclus via includeSeries=true)
+        series_data = event.get("series", {})
+        series_title = series_data.get("title") or event.get("title", "Unknown")
+        season = event.get("seasonNumber", 0)
+        episode_num = event.get("episodeNumber", 0)
+        episode_str = f"Season {season}, Episode {episode_num}"
+
+        return {
+            "natural_key": calendar_event_key(MediaType.TV, series_title, air_date, episode_str),
+            "title": series_title,
+            "media_type": MediaType.TV,
+            "release_date": air_date,
+            "episode": episode_str,
+            "image_url": self._poster_url(series_data.get("images", [])),
+            "image_alt": f"{series_title} poster",
+            "status": CalendarStatus.MONITORED,
+        }
+
+    @staticmethod
+    def _parse_upstream_date(value: str | None) -> datetime | None:
+        """Parser une date ISO 8601 Radarr/Sonarr (None si absente ou invalide)"""
+        if not value:
+            return None
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except (ValueError, TypeError):
+            return None
+        return parsed if parsed.tzinfo else parsed.replace(tzinfo=UTC)
+
+    def _needs_reconciliation(self, sync_meta: SyncMetadata) -> bool:
+        """Une réconciliation complète est due (pas de high-water mark, ou dernière trop ancienne)"""
+        if not sync_meta.high_water_mark or not sync_meta.last_full_sync_time:
+            return True
+
+        last_full = sync_meta.last_full_sync_time
+        # MariaDB renvoie des datetimes naïfs (stockés en UTC)
+        if last_full.tzinfo is None:
+            last_full = last_full.replace(tzinfo=UTC)
+
+        return datetime.now(UTC) - last_full >= RECONCILE_INTERVAL
+
+    @staticmethod
+    async def _fetch_by_ids(
+        fetch_one: Callable[[int], Awaitable[dict[str, Any] | None]], ids: Iterable[int]
+    ) -> tuple[list[dict[str, Any]], set[int]]:
+        """
+        Récupérer des items un par un (concurrence bornée)
 
-            # Récupérer la map movieId -> torrent_hash
-            movie_hash_map = await connector.get_movie_history_map()
-            print(f"📥 {len(movie_hash_map)} hash de torrents récupérés depuis Radarr")
+        Returns:
+            (items trouvés, IDs en erreur) ; les items supprimés upstream (None) sont ignorés
+        """
+        semaphore = asyncio.Semaphore(DELTA_FETCH_CONCURRENCY)
+        failed: set[int] = set()
 
-            # Ajouter à la DB (éviter les doublons)
-            added_count = 0
-            updated_count = 0
+        async def fetch(item_id: int) -> dict[str, Any] | None:
+            async with semaphore:
+                try:
+                    return await fetch_one(item_id)
+                except Exception:
+                    failed.add(item_id)
+                    return None
+
+        items = await asyncio.gather(*(fetch(item_id) for item_id in ids))
+        return [item for item in items if item], failed
+
+    def _delta_mark(
+        self,
+        history: list[dict[str, Any]],
+        queue: list[dict[str, Any]],
+        since: str,
+        id_field: str,
+        failed_ids: set[int],
+    ) -> str:
+        """
+        Nouveau high-water mark : dernier événement traité, sans dépasser le premier item en erreur
 
-            for movie in recent_movies[:20]:  # Limiter à 20 pour ne pas surcharger
-                # Vérifier si existe déjà (par titre + année)
-                existing = (
-                    self.db.query(LibraryItem)
-                    .filter(
-                        LibraryItem.title == movie.get("title"),
-                        LibraryItem.year == movie.get("year"),
-                        LibraryItem.media_type == MediaType.MOVIE,
-                    )
-                    .first()
-                )
+        Les événements des items dont la récupération a échoué (timeout, 5xx) restent après le
+        mark et seront revus au prochain delta ; les suppressions (404) avancent normalement.
+        """
+        if not history:
+            return since
+        if not failed_ids:
+            return history[-1].get("date", since)
+
+        blocked = [
+            self._parse_upstream_date(record.get("date") or record.get("added"))
+            for record in history + queue
+            if record.get(id_field) in failed_ids
+        ]
+        # Date inconnue : impossible de savoir jusqu'où avancer, le mark est conservé
+        if any(date is None for date in blocked):
+            return since
+        first_blocked = min(blocked)
+
+        mark = since
+        for record in history:
+            date = self._parse_upstream_date(record.get("date"))
+            if date is None or date >= first_blocked:
+                break
+            mark = record["date"]
+        return mark
+
+    async def _fetch_delta(
+        self,
+        connector: RadarrConnector | SonarrConnector,
+        since: str,
+        id_field: str,
+        fetch_one: Callable[[int], Awaitable[dict[str, Any] | None]],
+    ) -> tuple[list[dict[str, Any]], dict[int, str], str]:
+        """
+        Récupérer les items modifiés depuis le high-water mark
 
-                # Récupérer le torrent_hash depuis la map
-                movie_id = movie.get("id")
-                torrent_hash = movie_hash_map.get(movie_id) if movie_id else None
+        L'historique (/history/since) et la queue plus récents que le mark donnent les IDs
+        touchés (grab, import, renommage, suppression de fichier...), qui sont ensuite
+        récupérés individuellement au lieu de retélécharger toute la bibliothèque.
 
-                nb_media = 1 if movie.get("hasFile") else 0
+        Args:
+            connector: Connecteur Radarr ou Sonarr
+            since: High-water mark (date ISO du dernier événement traité)
+            id_field: Champ portant l'ID de l'item ('movieId' ou 'seriesId')
+            fetch_one: Récupération d'un item par son ID
 
-                if existing:
-                    # Mettre à jour le hash si on en a un et qu'il n'existe pas encore
-                    if torrent_hash and not existing.torrent_hash:
-                        existing.torrent_hash = torrent_hash
-                        existing.updated_at = datetime.now(UTC)
-                        updated_count += 1
-                        print(f"  🔄 Mise à jour hash pour: {movie.get('title')} - {torrent_hash[:8]}...")
-                    # Toujours mettre à jour nb_media
-                    existing.nb_media = nb_media
-                    # Mettre à jour la taille si elle était à 0
-                    size_bytes = movie.get("sizeOnDisk", 0)
-                    if size_bytes > 0:
-                        size_gb = round(size_bytes / (1024**3), 1)
-                        existing.size = f"{size_gb} GB"
-                else:
-                    # Calculer la taille
-                    size_bytes = movie.get("sizeOnDisk", 0)
-                    size_gb = round(size_bytes / (1024**3), 1)
-
-                    # Date d'ajout
-                    added_date = movie.get("added", "")
-                    if added_date:
-                        added_dt = datetime.fromisoformat(added_date.replace("Z", "+00:00"))
-                        time_ago = self._format_time_ago(added_dt)
-                    else:
-                        time_ago = "Unknown"
-
-                    # Récupérer l'image
-                    image_url = ""
-                    for img in movie.get("images", []):
-                        if img.get("coverType") == "poster":
-                            image_url = img.get("remoteUrl", "")
-                            break
-
-                    if not image_url and movie.get("images"):
-                        image_url = movie.get("images", [{}])[0].get("remoteUrl", "")
-
-                    item = LibraryItem(
-                        title=movie.get("title", "Unknown"),
-                        year=movie.get("year", 0),
-                        media_type=MediaType.MOVIE,
-                        image_url=image_url,
-                        image_alt=f"{movie.get('title')} poster",
-                        quality=str(movie.get("qualityProfileId", "Unknown")),
-                        rating=str(movie.get("ratings", {}).get("imdb", {}).get("value", "")),
-                        description=movie.get("overview", ""),
-                        added_date=time_ago,
-                        size=f"{size_gb} GB",
-                        torrent_hash=torrent_hash,
-                        nb_media=nb_media,
-                    )
+        Returns:
+            (items touchés, map id -> torrent_hash, nouveau high-water mark)
+        """
+        history = await connector.get_history_since(since)
+
+        since_dt = self._parse_upstream_date(since)
+        queue = []
+        for record in await connector.get_queue():
+            added = self._parse_upstream_date(record.get("added"))
+            # Sans date d'ajout exploitable, l'enregistrement est conservé (la queue reste petite)
+            if since_dt is None or added is None or added > since_dt:
+                queue.append(record)
+
+        records = history + queue
+        ids = {record[id_field] for record in records if record.get(id_field)}
+        items, failed_ids = await self._fetch_by_ids(fetch_one, sorted(ids))
+
+        # L'historique est trié par date : le mark avance jusqu'au premier item en erreur
+        mark = self._delta_mark(history, queue, since, id_field, failed_ids)
+
+        print(f"🔎 Delta depuis {since} : {len(history)} événements, {len(queue)} en queue, {len(items)} items")
+        if failed_ids:
+            print(f"⚠️  {len(failed_ids)} items en erreur, revus au prochain delta (mark conservé à {mark})")
+        return items, connector.build_hash_map(records), mark
+
+    async def _take_high_water_mark(self, connector: RadarrConnector | SonarrConnector) -> str:
+        """High-water mark pris avant une réconciliation (dernier événement d'historique, sinon maintenant)"""
+        return await connector.get_latest_history_date() or datetime.now(UTC).isoformat()
+
+    def _reconcile_library(
+        self, service_type: ServiceType, media_type: MediaType, upstream_keys: set[str], mark: str
+    ) -> int:
+        """Supprimer les items disparus upstream et enregistrer la réconciliation dans SyncMetadata"""
+        deleted = delete_missing_library_items(self.db, media_type, upstream_keys)
+
+        sync_meta = self._get_sync_metadata(service_type)
+        sync_meta.high_water_mark = mark
+        sync_meta.last_full_sync_time = datetime.now(UTC)
+        self.db.commit()
 
-                    self.db.add(item)
-                    added_count += 1
+        if deleted:
+            print(f"🗑️  {deleted} items supprimés (absents de {service_type.value})")
+        return deleted
 
-                    if torrent_hash:
-                        print(f"  ✅ {movie.get('title')} - hash: {torrent_hash[:8]}...")
+    def _advance_high_water_mark(self, service_type: ServiceType, mark: str):
+        """Avancer le high-water mark après une synchro incrémentale réussie"""
+        self._get_sync_metadata(service_type).high_water_mark = mark
+        self.db.commit()
 
-            # Récupérer le calendrier
-            calendar = await connector.get_calendar(days_ahead=30)
+    def _upsert_in_batches(
+        self,
+        service_type: ServiceType,
+        rows: Iterable[dict[str, Any]],
+        upsert: Callable[[Session, list[dict[str, Any]]], UpsertResult],
+        done: int,
+        total: int,
+    ) -> UpsertResult:
+        """
+        Pipeline par lots : transformation (générateur) -> upsert -> commit -> progression
 
-            # Ajouter/mettre à jour le calendrier
-            calendar_count = 0
-            for event in calendar[:20]:
-                release_date_str = event.get("physicalRelease") or event.get("digitalRelease")
-                if not release_date_str:
-                    continue
+        Seul le lot courant est matérialisé : la mémoire reste stable quelle que soit la
+        taille de la bibliothèque.
 
-                try:
-                    release_date = datetime.fromisoformat(release_date_str.replace("Z", "+00:00")).date()
-                except (ValueError, TypeError):
-                    continue
+        Args:
+            service_type: Service dont la progression est enregistrée dans SyncMetadata
+            rows: Générateur de lignes transformées
+            upsert: Fonction d'upsert en masse (upsert_library_items, upsert_calendar_events)
+            done: Éléments déjà traités par les étapes précédentes de la synchro
+            total: Nombre total d'éléments de la synchro
 
-                title = event.get("title", "Unknown")
-
-                # Récupérer l'image
-                image_url = ""
-                for img in event.get("images", []):
-                    if img.get("coverType") == "poster":
-                        image_url = img.get("remoteUrl", "")
-                        break
-                if not image_url and event.get("images"):
-                    image_url = event.get("images", [{}])[0].get("remoteUrl", "")
-
-                existing = (
-                    self.db.query(CalendarEvent)
-                    .filter(CalendarEvent.title == title, CalendarEvent.release_date == release_date)
-                    .first()
-                )
+        Returns:
+            Résultat cumulé de l'upsert
+        """
+        result = UpsertResult()
 
-                if existing:
-                    # Mettre à jour les champs potentiellement vides
-                    if image_url and not existing.image_url:
-                        existing.image_url = image_url
-                        existing.image_alt = f"{title} poster"
+        for batch in iter_batches(rows, SYNC_BATCH_SIZE):
+            result += upsert(self.db, batch)
+            self.db.commit()
+
+            done += len(batch)
+            self.update_sync_progress(service_type, done, total)
+
+        return result
+
+    async def sync_radarr(self, mode: SyncMode = SyncMode.RECENT) -> dict[str, Any]:
+        """
+        Synchroniser les données Radarr
+
+        Args:
+            mode: RECENT (ajouts des 30 derniers jours), FULL (bibliothèque complète, avec
+                réconciliation) ou INCREMENTAL (delta depuis le high-water mark, réconciliation
+                complète toutes les RECONCILE_INTERVAL)
+        """
+        print("🎬 Synchronisation Radarr...")
+        start_time = time.time()
+
+        service = self.get_active_service(ServiceType.RADARR)
+        if not service:
+            print("⚠️ Service Radarr non configuré")
+            return {"success": False, "message": "Service non configuré"}
+
+        connector = connector_registry.get(service)
+
+        try:
+            sync_meta = self._get_sync_metadata(ServiceType.RADARR)
+            incremental = mode == SyncMode.INCREMENTAL and not self._needs_reconciliation(sync_meta)
+            reconcile = mode == SyncMode.FULL or (mode == SyncMode.INCREMENTAL and not incremental)
+            mark = None
+            deleted_count = 0
+
+            if incremental:
+                # Seulement les films touchés depuis le dernier passage
+                selected_movies, movie_hash_map, mark = await self._fetch_delta(
+                    connector, sync_meta.high_water_mark, "movieId", connector.get_movie
+                )
+            else:
+                # Mark pris avant le téléchargement : les événements concurrents seront revus au prochain delta
+                if reconcile:
+                    mark = await self._take_high_water_mark(connector)
+
+                # Récupérer les films (tous, ou seulement les ajouts récents)
+                movies = await self._get_radarr_movies(connector)
+                if reconcile:
+                    selected_movies = movies
                 else:
-                    cal_event = CalendarEvent(
-                        title=title,
-                        media_type=MediaType.MOVIE,
-                        release_date=release_date,
-                        image_url=image_url,
-                        image_alt=f"{title} poster",
-                        status=CalendarStatus.MONITORED,
-                    )
-                    self.db.add(cal_event)
+                    selected_movies = await connector.get_recent_additions(days=30, movies=movies)
 
-                calendar_count += 1
+                # Récupérer la map movieId -> torrent_hash
+                movie_hash_map = await connector.get_movie_history_map()
+            print(f"📥 {len(movie_hash_map)} hash de torrents récupérés depuis Radarr")
 
-            self.db.commit()
+            calendar = await connector.get_calendar(days_ahead=30)
+            total = len(selected_movies) + len(calendar)
 
+            # Upsert en masse par lots (1 SELECT par lot au lieu d'1 par film)
+            rows = (self._movie_to_row(movie, movie_hash_map) for movie in selected_movies)
+            movies_result = self._upsert_in_batches(ServiceType.RADARR, rows, upsert_library_items, 0, total)
+
+            event_rows = (row for row in map(self._radarr_event_to_row, calendar) if row)
+            calendar_result = self._upsert_in_batches(
+                ServiceType.RADARR, event_rows, upsert_calendar_events, len(selected_movies), total
+            )
+            calendar_count = calendar_result.inserted + calendar_result.updated + calendar_result.unchanged
+
+            if reconcile and not selected_movies:
+                # Liste vide : rien ne prouve la réconciliation, elle reste due (mark et date inchangés)
+                print("⚠️  Liste complète vide, réconciliation Radarr reportée")
+                reconcile = False
+            elif reconcile:
+                upstream_keys = {
+                    library_item_key(MediaType.MOVIE, movie.get("title", "Unknown"), movie.get("year", 0))
+                    for movie in selected_movies
+                }
+                deleted_count = self._reconcile_library(ServiceType.RADARR, MediaType.MOVIE, upstream_keys, mark)
+            elif incremental:
+                self._advance_high_water_mark(ServiceType.RADARR, mark)
+
+            added_count = movies_result.inserted
+            updated_count = movies_result.updated
             duration_ms = int((time.time() - start_time) * 1000)
             self.update_sync_metadata(ServiceType.RADARR, SyncStatus.SUCCESS, added_count + calendar_count, duration_ms)
 
             print(f"✅ Radarr: {added_count} films ajoutés, {updated_count} mis à jour, {calendar_count} événements")
-            return {"success": True, "movies_added": added_count, "calendar_events": calendar_count}
+            return {
+                "success": True,
+                "movies_added": added_count,
+                "calendar_events": calendar_count,
+                "incremental": incremental,
+                "reconciled": reconcile,
+                "movies_deleted": deleted_count,
+            }
 
         except Exception as e:
+            self.db.rollback()
             duration_ms = int((time.time() - start_time) * 1000)
             self.update_sync_metadata(ServiceType.RADARR, SyncStatus.FAILED, 0, duration_ms, str(e))
             print(f"❌ Erreur sync Radarr: {e}")
             return {"success": False, "error": str(e)}
-        finally:
-            await connector.close()
 
-    async def sync_sonarr(self) -> dict[str, Any]:
-        """Synchroniser les données Sonarr"""
+    async def sync_sonarr(self, mode: SyncMode = SyncMode.RECENT) -> dict[str, Any]:
+        """
+        Synchroniser les données Sonarr
+
+        Args:
+            mode: RECENT (ajouts des 30 derniers jours), FULL (bibliothèque complète, avec
+                réconciliation) ou INCREMENTAL (delta depuis le high-water mark, réconciliation
+                complète toutes les RECONCILE_INTERVAL)
+        """
         print("📺 Synchronisation Sonarr...")
         start_time = time.time()
 
@@ -329,181 +682,83 @@ class SyncService:
             print("⚠️ Service Sonarr non configuré")
             return {"success": False, "message": "Service non configuré"}
 
-        connector = SonarrConnector(base_url=service.url, api_key=service.api_key, port=service.port)
+        connector = connector_registry.get(service)
 
         try:
-            # Récupérer les séries récentes
-            recent_series = await connector.get_recent_additions(days=30)
-
-            # Récupérer la map seriesId -> torrent_hash
-            series_hash_map = await connector.get_series_history_map()
-            print(f"📥 {len(series_hash_map)} hash de torrents récupérés depuis Sonarr")
-
-            added_count = 0
-            updated_count = 0
-
-            for series in recent_series[:20]:
-                existing = (
-                    self.db.query(LibraryItem)
-                    .filter(
-                        LibraryItem.title == series.get("title"),
-                        LibraryItem.year == series.get("year"),
-                        LibraryItem.media_type == MediaType.TV,
-                    )
-                    .first()
+            sync_meta = self._get_sync_metadata(ServiceType.SONARR)
+            incremental = mode == SyncMode.INCREMENTAL and not self._needs_reconciliation(sync_meta)
+            reconcile = mode == SyncMode.FULL or (mode == SyncMode.INCREMENTAL and not incremental)
+            mark = None
+            deleted_count = 0
+
+            if incremental:
+                # Seulement les séries touchées depuis le dernier passage
+                selected_series, series_hash_map, mark = await self._fetch_delta(
+                    connector, sync_meta.high_water_mark, "seriesId", connector.get_series_by_id
                 )
-
-                # Récupérer le torrent_hash depuis la map
-                series_id = series.get("id")
-                torrent_hash = series_hash_map.get(series_id) if series_id else None
-
-                nb_media = series.get("statistics", {}).get("episodeFileCount", 0)
-
-                if existing:
-                    # Mettre à jour le hash si on en a un et qu'il n'existe pas encore
-                    if torrent_hash and not existing.torrent_hash:
-                        existing.torrent_hash = torrent_hash
-                        existing.updated_at = datetime.now(UTC)
-                        updated_count += 1
-                        print(f"  🔄 Mise à jour hash pour: {series.get('title')} - {torrent_hash[:8]}...")
-                    # Toujours mettre à jour nb_media
-                    existing.nb_media = nb_media
-                    # Mettre à jour la taille si elle était à 0
-                    size_bytes = series.get("statistics", {}).get("sizeOnDisk", 0)
-                    if size_bytes > 0:
-                        size_gb = round(size_bytes / (1024**3), 1)
-                        existing.size = f"{size_gb} GB"
+            else:
+                # Mark pris avant le téléchargement : les événements concurrents seront revus au prochain delta
+                if reconcile:
+                    mark = await self._take_high_water_mark(connector)
+
+                # Récupérer les séries (toutes, ou seulement les ajouts récents)
+                all_series = await self._get_sonarr_series(connector)
+                if reconcile:
+                    selected_series = all_series
                 else:
-                    size_bytes = series.get("statistics", {}).get("sizeOnDisk", 0)
-                    size_gb = round(size_bytes / (1024**3), 1)
-
-                    added_date = series.get("added", "")
-                    if added_date:
-                        added_dt = datetime.fromisoformat(added_date.replace("Z", "+00:00"))
-                        time_ago = self._format_time_ago(added_dt)
-                    else:
-                        time_ago = "Unknown"
-
-                    # Récupérer l'image
-                    image_url = ""
-                    for img in series.get("images", []):
-                        if img.get("coverType") == "poster":
-                            image_url = img.get("remoteUrl", "")
-                            break
-
-                    if not image_url and series.get("images"):
-                        image_url = series.get("images", [{}])[0].get("remoteUrl", "")
-
-                    item = LibraryItem(
-                        title=series.get("title", "Unknown"),
-                        year=series.get("year", 0),
-                        media_type=MediaType.TV,
-                        image_url=image_url,
-                        image_alt=f"{series.get('title')} poster",
-                        quality=str(series.get("qualityProfileId", "Unknown")),
-                        rating=str(series.get("ratings", {}).get("value", "")),
-                        description=series.get("overview", ""),
-                        added_date=time_ago,
-                        size=f"{size_gb} GB",
-                        torrent_hash=torrent_hash,
-                        nb_media=nb_media,
-                    )
-
-                    self.db.add(item)
-                    added_count += 1
+                    selected_series = await connector.get_recent_additions(days=30, series=all_series)
 
-                    if torrent_hash:
-                        print(f"  ✅ {series.get('title')} - hash: {torrent_hash[:8]}...")
+                # Récupérer la map seriesId -> torrent_hash
+                series_hash_map = await connector.get_series_history_map()
+            print(f"📥 {len(series_hash_map)} hash de torrents récupérés depuis Sonarr")
 
             # Récupérer le calendrier (includeSeries=true dans le connector)
             calendar = await connector.get_calendar(days_ahead=30)
-            calendar_count = 0
-
-            for event in calendar[:20]:
-                if not event.get("airDate"):
-                    continue
-
-                try:
-                    air_date = datetime.fromisoformat(event.get("airDate") + "T00:00:00+00:00").date()
-                except (ValueError, TypeError):
-                    continue
-
-                # Titre et image depuis l'objet series (inclus via includeSeries=true)
-                series_data = event.get("series", {})
-                series_title = series_data.get("title") or event.get("title", "Unknown")
-                season = event.get("seasonNumber", 0)
-                episode_num = event.get("episodeNumber", 0)
-                episode_str = f"Season {season}, Episode {episode_num}"
-
-                # Récupérer l'image depuis les images de la série
-                image_url = ""
-                for img in series_data.get("images", []):
-                    if img.get("coverType") == "poster":
-                        image_url = img.get("remoteUrl", "")
-                        break
-                if not image_url and series_data.get("images"):
-                    image_url = series_data.get("images", [{}])[0].get("remoteUrl", "")
-
-                # Chercher un enregistrement existant (par titre + date + épisode)
-                existing = (
-                    self.db.query(CalendarEvent)
-                    .filter(
-                        CalendarEvent.release_date == air_date,
-                        CalendarEvent.episode == episode_str,
-                        CalendarEvent.media_type == MediaType.TV,
-                    )
-                    .first()
-                )
+            total = len(selected_series) + len(calendar)
 
-                # Aussi chercher par ancien titre "Unknown" pour corriger
-                if not existing:
-                    existing = (
-                        self.db.query(CalendarEvent)
-                        .filter(
-                            CalendarEvent.title == "Unknown",
-                            CalendarEvent.release_date == air_date,
-                            CalendarEvent.episode == episode_str,
-                            CalendarEvent.media_type == MediaType.TV,
-                        )
-                        .first()
-                    )
-
-                if existing:
-                    # Mettre à jour les champs vides ou incorrects
-                    if existing.title == "Unknown" and series_title != "Unknown":
-                        existing.title = series_title
-                    if image_url and not existing.image_url:
-                        existing.image_url = image_url
-                    existing.image_alt = f"{series_title} poster"
-                else:
-                    cal_event = CalendarEvent(
-                        title=series_title,
-                        media_type=MediaType.TV,
-                        release_date=air_date,
-                        episode=episode_str,
-                        image_url=image_url,
-                        image_alt=f"{series_title} poster",
-                        status=CalendarStatus.MONITORED,
-                    )
-                    self.db.add(cal_event)
-
-                calendar_count += 1
-
-            self.db.commit()
+            # Upsert en masse par lots (1 SELECT par lot au lieu d'1 par série)
+            rows = (self._series_to_row(series, series_hash_map) for series in selected_series)
+            series_result = self._upsert_in_batches(ServiceType.SONARR, rows, upsert_library_items, 0, total)
 
+            event_rows = (row for row in map(self._sonarr_event_to_row, calendar) if row)
+            calendar_result = self._upsert_in_batches(
+                ServiceType.SONARR, event_rows, upsert_calendar_events, len(selected_series), total
+            )
+            calendar_count = calendar_result.inserted + calendar_result.updated + calendar_result.unchanged
+
+            if reconcile and not selected_series:
+                # Liste vide : rien ne prouve la réconciliation, elle reste due (mark et date inchangés)
+                print("⚠️  Liste complète vide, réconciliation Sonarr reportée")
+                reconcile = False
+            elif reconcile:
+                upstream_keys = {
+                    library_item_key(MediaType.TV, series.get("title", "Unknown"), series.get("year", 0))
+                    for series in selected_series
+                }
+                deleted_count = self._reconcile_library(ServiceType.SONARR, MediaType.TV, upstream_keys, mark)
+            elif incremental:
+                self._advance_high_water_mark(ServiceType.SONARR, mark)
+
+            added_count = series_result.inserted
             duration_ms = int((time.time() - start_time) * 1000)
             self.update_sync_metadata(ServiceType.SONARR, SyncStatus.SUCCESS, added_count + calendar_count, duration_ms)
 
             print(f"✅ Sonarr: {added_count} séries, {calendar_count} événements")
-            return {"success": True, "series_added": added_count, "calendar_events": calendar_count}
+            return {
+                "success": True,
+                "series_added": added_count,
+                "calendar_events": calendar_count,
+                "incremental": incremental,
+                "reconciled": reconcile,
+                "series_deleted": deleted_count,
+            }
 
         except Exception as e:
+            self.db.rollback()
             duration_ms = int((time.time() - start_time) * 1000)
             self.update_sync_metadata(ServiceType.SONARR, SyncStatus.FAILED, 0, duration_ms, str(e))
             print(f"❌ Erreur sync Sonarr: {e}")
             return {"success": False, "error": str(e)}
-        finally:
-            await connector.close()
 
     async def sync_jellyfin(self) -> dict[str, Any]:
         """Synchroniser les données Jellyfin"""
@@ -515,7 +770,7 @@ class SyncService:
             print("⚠️  Service Jellyfin non configuré")
             return {"success": False, "message": "Service non configuré"}
 
-        connector = JellyfinConnector(base_url=service.url, api_key=service.api_key, port=service.port)
+        connector = connector_registry.get(service)
 
         try:
             # Récupérer les stats
@@ -604,8 +859,6 @@ class SyncService:
             self.update_sync_metadata(ServiceType.JELLYFIN, SyncStatus.FAILED, 0, duration_ms, str(e))
             print(f"❌ Erreur sync Jellyfin: {e}")
             return {"success": False, "error": str(e)}
-        finally:
-            await connector.close()
 
     async def sync_jellyseerr(self) -> dict[str, Any]:
         """Synchroniser les données Jellyseerr (upsert par jellyseerr_id)"""
@@ -617,7 +870,7 @@ class SyncService:
             print("⚠️  Service Jellyseerr non configuré")
             return {"success": False, "message": "Service non configuré"}
 
-        connector = JellyseerrConnector(base_url=service.url, api_key=service.api_key, port=service.port)
+        connector = connector_registry.get(service)
 
         try:
             # Tester d'abord la connexion
@@ -769,25 +1022,87 @@ class SyncService:
             self.update_sync_metadata(ServiceType.JELLYSEERR, SyncStatus.FAILED, 0, duration_ms, str(e))
             print(f"❌ Erreur sync Jellyseerr: {e}")
             return {"success": False, "error": str(e)}
+
+    @staticmethod
+    def _task_options(name: str, mode: SyncMode) -> dict[str, Any]:
+        """Arguments passés à sync_<name> par sync_all"""
+        return {"mode": mode} if name in MODE_AWARE_TASKS else {}
+
+    async def _run_isolated(self, name: str, snapshot: UpstreamSnapshot, **options: Any) -> tuple[str, dict[str, Any]]:
+        """
+        Exécuter une synchronisation avec sa propre session DB
+
+        Les sessions SQLAlchemy ne sont pas partageables entre tâches concurrentes :
+        chaque service obtient donc sa session, fermée en fin de tâche.
+        """
+        start_time = time.time()
+        db = SessionLocal()
+        try:
+            service = SyncService(db, snapshot=snapshot)
+            result = await getattr(service, f"sync_{name}")(**options)
+        except Exception as e:
+            db.rollback()
+            result = {"success": False, "error": str(e)}
         finally:
-            await connector.close()
+            db.close()
+
+        result["duration_ms"] = int((time.time() - start_time) * 1000)
+        return name, result
+
+    async def sync_all(self, concurrent: bool = True, mode: SyncMode = SyncMode.RECENT) -> dict[str, Any]:
+        """
+        Synchroniser tous les services
 
-    async def sync_all(self) -> dict[str, Any]:
-        """Synchroniser tous les services"""
+        Args:
+            concurrent: Lancer les synchronisations en parallèle (une tâche et une session DB
+                par service). Si False, les services sont synchronisés l'un après l'autre
+                sur la session courante.
+            mode: Mode de synchronisation de Radarr/Sonarr (RECENT, FULL ou INCREMENTAL)
+
+        Un snapshot upstream neuf est créé pour le run : chaque collection n'est téléchargée
+        qu'une fois, même si plusieurs synchronisations la consomment.
+        """
         print("\n" + "=" * 50)
         print("🔄 DÉBUT DE LA SYNCHRONISATION GLOBALE")
         print("=" * 50 + "\n")
 
         results = {}
+        snapshot = UpstreamSnapshot()
+
+        # Phase 2 après la phase 1 : les statistiques réutilisent les collections déjà téléchargées
+        first_phase = [name for name in SYNC_TASKS if name not in SECOND_PHASE_TASKS]
+        second_phase = [name for name in SYNC_TASKS if name in SECOND_PHASE_TASKS]
+
+        if concurrent:
+            for phase in (first_phase, second_phase):
+                tasks = [
+                    asyncio.create_task(self._run_isolated(name, snapshot, **self._task_options(name, mode)))
+                    for name in phase
+                ]
+
+                # Collecter les résultats au fil de l'eau : un service lent ne bloque plus les autres
+                for finished in asyncio.as_completed(tasks):
+                    name, result = await finished
+                    results[name] = result
+                    state = "✅" if result.get("success") else "❌"
+                    print(f"{state} {name} terminé en {result['duration_ms']} ms")
+        else:
+            self.snapshot = snapshot
+            for name in first_phase + second_phase:
+                results[name] = await getattr(self, f"sync_{name}")(**self._task_options(name, mode))
 
-        results["radarr"] = await self.sync_radarr()
-        results["sonarr"] = await self.sync_sonarr()
-        results["jellyfin"] = await self.sync_jellyfin()
-        results["jellyseerr"] = await self.sync_jellyseerr()
-        results["monitored_items"] = await self.sync_monitored_items()
+        failed = [name for name, result in results.items() if not result.get("success")]
+
+        snapshot_report = snapshot.report()
+        results["upstream_snapshot"] = snapshot_report
+        downloads, reuses = snapshot_report["misses"], snapshot_report["hits"]
+        print(f"📦 Snapshot upstream : {downloads} téléchargements, {reuses} réutilisations")
 
         print("\n" + "=" * 50)
-        print("✅ SYNCHRONISATION TERMINÉE")
+        if failed:
+            print(f"⚠️  SYNCHRONISATION TERMINÉE AVEC ERREURS : {', '.join(failed)}")
+        else:
+            print("✅ SYNCHRONISATION TERMINÉE")
         print("=" * 50 + "\n")
 
         return results
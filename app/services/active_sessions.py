@@ -0,0 +1,232 @@
+"""
+Index en mémoire des sessions de lecture actives
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, replace
+from datetime import UTC, datetime
+
+from sqlalchemy.orm import Session
+
+from app.models.enums import DeviceType, SessionStatus, VideoQuality
+from app.models.models import PlaybackSession
+
+logger = logging.getLogger(__name__)
+
+# Clé de l'index : (user_id, media_id)
+SessionKey = tuple[str, str]
+
+
+@dataclass(frozen=True)
+class ActiveSession:
+    """Copie détachée d'une PlaybackSession active (mêmes attributs que ceux lus par les routes)"""
+
+    id: str
+    media_id: str
+    user_id: str
+    media_title: str
+    user_name: str
+    device_type: DeviceType
+    video_quality: VideoQuality
+    video_codec_source: str | None
+    video_codec_target: str | None
+    transcoding_progress: int
+    transcoding_speed: float | None
+    start_time: datetime
+    status: SessionStatus
+
+    @property
+    def key(self) -> SessionKey:
+        return (self.user_id, self.media_id)
+
+    @classmethod
+    def from_model(cls, session: PlaybackSession) -> "ActiveSession":
+        start_time = session.start_time
+        # MariaDB rend des datetimes naïfs (UTC) : les aligner sur ceux créés par start_session
+        if start_time.tzinfo is None:
+            start_time = start_time.replace(tzinfo=UTC)
+
+        return cls(
+            id=session.id,
+            media_id=session.media_id,
+            user_id=session.user_id,
+            media_title=session.media_title,
+            user_name=session.user_name,
+            device_type=session.device_type,
+            video_quality=session.video_quality,
+            video_codec_source=session.video_codec_source,
+            video_codec_target=session.video_codec_target,
+            transcoding_progress=session.transcoding_progress or 0,
+            transcoding_speed=session.transcoding_speed,
+            start_time=start_time,
+            status=session.status,
+        )
+
+
+# Modification en attente d'une session : (nouvelle valeur, ou None si retirée ; ajoutée par ces modifications)
+SessionDelta = tuple[ActiveSession | None, bool]
+
+
+class ActiveSessionChanges:
+    """
+    Modifications de l'index en attente du commit de la transaction SQL
+
+    Les lectures voient l'index et les modifications en attente. commit() les reporte dans le
+    parent (l'index, ou les modifications du lot pour un savepoint) ; sans commit() elles sont
+    simplement abandonnées, comme la transaction.
+
+    Les modifications sont des deltas par session (ajout, mise à jour, retrait) et non des listes
+    complètes : une session retirée de l'index pendant la transaction (discard) ne réapparaît pas
+    au commit.
+    """
+
+    def __init__(self, parent: "ActiveSessionIndex | ActiveSessionChanges"):
+        self._parent = parent
+        self._changes: dict[SessionKey, dict[str, SessionDelta]] = {}
+
+    def get(self, user_id: str, media_id: str) -> ActiveSession | None:
+        """Session active la plus récente d'un utilisateur sur un média"""
+        sessions = self._current((user_id, media_id))
+        return sessions[-1] if sessions else None
+
+    def add(self, session: ActiveSession):
+        self._changes.setdefault(session.key, {})[session.id] = (session, True)
+
+    def remove(self, session: ActiveSession):
+        deltas = self._changes.setdefault(session.key, {})
+        if deltas.get(session.id, (None, False))[1]:
+            # Ajoutée par ces mêmes modifications : le parent ne la connaît pas
+            del deltas[session.id]
+        else:
+            deltas[session.id] = (None, False)
+
+    def set_status(self, session: ActiveSession, status: SessionStatus):
+        current = next((s for s in self._current(session.key) if s.id == session.id), None)
+        if current is None:
+            return
+        deltas = self._changes.setdefault(session.key, {})
+        added = deltas.get(session.id, (None, False))[1]
+        deltas[session.id] = (replace(current, status=status), added)
+
+    def savepoint(self) -> "ActiveSessionChanges":
+        """Modifications imbriquées, à committer avec le savepoint SQL correspondant"""
+        return ActiveSessionChanges(self)
+
+    def commit(self):
+        self._parent._merge(self._changes)
+        self._changes = {}
+
+    def _current(self, key: SessionKey) -> list[ActiveSession]:
+        sessions = self._parent._current(key)
+        if key in self._changes:
+            sessions = _apply_deltas(sessions, self._changes[key])
+        return sessions
+
+    def _merge(self, changes: dict[SessionKey, dict[str, SessionDelta]]):
+        for key, child_deltas in changes.items():
+            deltas = self._changes.setdefault(key, {})
+            for session_id, (session, added) in child_deltas.items():
+                previous_added = deltas.get(session_id, (None, False))[1]
+                if session is None and previous_added:
+                    del deltas[session_id]
+                else:
+                    deltas[session_id] = (session, added or previous_added)
+
+
+def _apply_deltas(sessions: list[ActiveSession], deltas: dict[str, SessionDelta]) -> list[ActiveSession]:
+    """
+    Nouvelle liste des sessions d'une clé après application des deltas
+
+    Une mise à jour ne porte que sur une session encore présente : si elle a été retirée entre-temps
+    (discard), elle n'est pas recréée. Les sessions ajoutées passent en fin de liste (plus récentes).
+    """
+    result = []
+    for session in sessions:
+        if session.id not in deltas:
+            result.append(session)
+        elif (updated := deltas[session.id][0]) is not None:
+            result.append(updated)
+
+    present = {s.id for s in sessions}
+    result.extend(
+        session
+        for session_id, (session, added) in deltas.items()
+        if added and session is not None and session_id not in present
+    )
+    return result
+
+
+class ActiveSessionIndex:
+    """
+    Sessions actives indexées par (user_id, media_id), chauffé depuis la base au démarrage
+
+    Le chemin webhook le tient à jour via transaction() : Pause/Resume/Stop retrouvent la
+    session sans requête, et les sessions actives (routes, métriques serveur) sont lues en
+    mémoire. Tant que l'index n'est pas chauffé (ready=False, ex: script de rejeu), les
+    appelants repassent par la base. Suppose un seul process applicatif.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Sessions actives d'une clé, de la plus ancienne à la plus récente
+        self._sessions: dict[SessionKey, list[ActiveSession]] = {}
+        self.ready = False
+
+    def warm(self, db: Session):
+        """(Re)charger l'index depuis les sessions is_active en base"""
+        rows = db.query(PlaybackSession).filter(PlaybackSession.is_active == True).order_by(PlaybackSession.start_time)
+
+        sessions: dict[SessionKey, list[ActiveSession]] = {}
+        for row in rows:
+            session = ActiveSession.from_model(row)
+            sessions.setdefault(session.key, []).append(session)
+
+        with self._lock:
+            self._sessions = sessions
+            self.ready = True
+
+        logger.info(f"✅ Index des sessions actives chargé : {sum(len(s) for s in sessions.values())} session(s)")
+
+    def transaction(self) -> ActiveSessionChanges:
+        """Modifications à reporter dans l'index après le commit SQL"""
+        return ActiveSessionChanges(self)
+
+    def all(self) -> list[ActiveSession]:
+        """Toutes les sessions actives, de la plus récente à la plus ancienne"""
+        with self._lock:
+            sessions = [s for key_sessions in self._sessions.values() for s in key_sessions]
+        return sorted(sessions, key=lambda s: s.start_time, reverse=True)
+
+    def counts(self) -> tuple[int, int]:
+        """(sessions actives, transcodages actifs)"""
+        sessions = self.all()
+        return len(sessions), sum(1 for s in sessions if s.transcoding_progress > 0)
+
+    def discard(self, session_ids: set[str]):
+        """Retirer des sessions arrêtées hors du chemin webhook (ex: sessions orphelines)"""
+        with self._lock:
+            for key, sessions in list(self._sessions.items()):
+                remaining = [s for s in sessions if s.id not in session_ids]
+                if len(remaining) != len(sessions):
+                    self._store_locked(key, remaining)
+
+    def _current(self, key: SessionKey) -> list[ActiveSession]:
+        with self._lock:
+            return self._sessions.get(key, [])
+
+    def _merge(self, changes: dict[SessionKey, dict[str, SessionDelta]]):
+        # Deltas appliqués à l'état courant sous le verrou, pas à la copie lue pendant la transaction
+        with self._lock:
+            for key, deltas in changes.items():
+                self._store_locked(key, _apply_deltas(self._sessions.get(key, []), deltas))
+
+    def _store_locked(self, key: SessionKey, sessions: list[ActiveSession]):
+        if sessions:
+            self._sessions[key] = sessions
+        else:
+            self._sessions.pop(key, None)
+
+
+# Instance globale de l'index
+active_session_index = ActiveSessionIndex()
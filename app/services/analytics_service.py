@@ -3,14 +3,26 @@ Service de gestion des analytics et des sessions de lecture
 """
 
 import logging
-from datetime import UTC, date, datetime, timedelta
+from datetime import UTC, date, datetime, time, timedelta
 from typing import Any
 
-from sqlalchemy import desc, func
+from sqlalchemy import desc, func, insert
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 from sqlalchemy.orm import Session
 
 from app.models.enums import DeviceType, MediaType, PlaybackMethod, SessionStatus, VideoQuality
-from app.models.models import DailyAnalytic, DeviceStatistic, MediaStatistic, PlaybackSession
+from app.models.models import (
+    DailyAnalytic,
+    DailyMedia,
+    DailyViewer,
+    DeviceStatistic,
+    MediaStatistic,
+    MediaViewer,
+    PlaybackSession,
+    generate_uuid,
+)
+from app.services.active_sessions import ActiveSession, active_session_index
+from app.services.bulk_upsert import UPSERT_CHUNK_SIZE, iter_batches
 
 logger = logging.getLogger(__name__)
 
@@ -87,13 +99,17 @@ class AnalyticsService:
             return PlaybackMethod.DIRECT_STREAM
 
     @staticmethod
-    def start_session(db: Session, session_data: dict[str, Any]) -> PlaybackSession:
+    def start_session(
+        db: Session, session_data: dict[str, Any], commit: bool = True, at: datetime | None = None
+    ) -> PlaybackSession:
         """
         Démarre une nouvelle session de lecture
 
         Args:
             db: Session SQLAlchemy
             session_data: Données de la session depuis le webhook
+            commit: Commit immédiat (False : flush seulement, la transaction reste à l'appelant)
+            at: Heure de début (par défaut : maintenant ; réception du webhook pour la file et le rejeu)
         """
         try:
             # Mapper les types
@@ -127,7 +143,7 @@ class AnalyticsService:
                 transcoding_speed=session_data.get("transcoding_speed"),
                 video_codec_source=session_data.get("video_codec_source"),
                 video_codec_target=session_data.get("video_codec_target"),
-                start_time=datetime.now(UTC),
+                start_time=at or datetime.now(UTC),
                 duration_seconds=session_data.get("duration_seconds"),
                 watched_seconds=0,
                 status=SessionStatus.ACTIVE,
@@ -135,20 +151,26 @@ class AnalyticsService:
             )
 
             db.add(session)
-            db.commit()
-            db.refresh(session)
+            AnalyticsService._save(db, session, commit)
 
             logger.info(f"✅ Session créée : {session.id} - {session.media_title}")
             return session
 
         except Exception as e:
-            db.rollback()
+            if commit:
+                db.rollback()
             logger.error(f"❌ Erreur lors de la création de session : {e}")
             raise
 
     @staticmethod
     def stop_session(
-        db: Session, media_id: str, user_id: str, watched_seconds: int | None = None
+        db: Session,
+        media_id: str,
+        user_id: str,
+        watched_seconds: int | None = None,
+        commit: bool = True,
+        at: datetime | None = None,
+        session_id: str | None = None,
     ) -> PlaybackSession | None:
         """
         Arrête une session de lecture active
@@ -158,26 +180,25 @@ class AnalyticsService:
             media_id: ID du média
             user_id: ID de l'utilisateur
             watched_seconds: Durée regardée (optionnel)
+            commit: Commit immédiat (False : flush seulement, la transaction reste à l'appelant)
+            at: Heure de fin (par défaut : maintenant)
+            session_id: Session déjà identifiée par l'index des sessions actives (lecture par clé primaire)
         """
         try:
             # Trouver la session active
-            session = (
-                db.query(PlaybackSession)
-                .filter(
-                    PlaybackSession.media_id == media_id,
-                    PlaybackSession.user_id == user_id,
-                    PlaybackSession.is_active == True,
-                )
-                .order_by(desc(PlaybackSession.start_time))
-                .first()
-            )
+            if session_id:
+                session = db.get(PlaybackSession, session_id)
+                if session is not None and not session.is_active:
+                    session = None
+            else:
+                session = AnalyticsService._find_active_session(db, media_id, user_id)
 
             if not session:
                 logger.warning(f"⚠️  Aucune session active trouvée pour media_id={media_id}, user_id={user_id}")
                 return None
 
             # Mettre à jour la session
-            session.end_time = datetime.now(UTC)
+            session.end_time = at or datetime.now(UTC)
             session.status = SessionStatus.STOPPED
             session.is_active = False
 
@@ -185,87 +206,112 @@ class AnalyticsService:
                 session.watched_seconds = watched_seconds
             else:
                 # Fallback : calculer la durée à partir du temps écoulé
-                elapsed = int((session.end_time - session.start_time).total_seconds())
+                # start_time relu depuis MariaDB est naïf (UTC) : l'aligner sur end_time
+                start_time = session.start_time
+                if start_time.tzinfo is None:
+                    start_time = start_time.replace(tzinfo=UTC)
+                elapsed = int((session.end_time - start_time).total_seconds())
                 # Plafonner au maximum à la durée du média si connue
                 if session.duration_seconds and elapsed > session.duration_seconds:
                     elapsed = session.duration_seconds
                 session.watched_seconds = elapsed
 
-            db.commit()
-            db.refresh(session)
+            AnalyticsService._save(db, session, commit)
 
             logger.info(f"✅ Session arrêtée : {session.id} - {session.media_title}")
 
             # Mettre à jour les statistiques
-            AnalyticsService.update_media_statistics(db, session)
-            AnalyticsService.update_daily_analytics(db, session)
+            AnalyticsService.update_media_statistics(db, session, commit=commit)
+            AnalyticsService.update_daily_analytics(db, session, commit=commit)
 
             return session
 
         except Exception as e:
-            db.rollback()
+            if commit:
+                db.rollback()
             logger.error(f"❌ Erreur lors de l'arrêt de session : {e}")
             raise
 
     @staticmethod
-    def pause_session(db: Session, media_id: str, user_id: str) -> PlaybackSession | None:
-        """Met en pause une session active"""
+    def pause_session(db: Session, media_id: str, user_id: str, commit: bool = True) -> PlaybackSession | None:
+        """Met en pause une session active (commit=False : flush seulement)"""
         try:
-            session = (
-                db.query(PlaybackSession)
-                .filter(
-                    PlaybackSession.media_id == media_id,
-                    PlaybackSession.user_id == user_id,
-                    PlaybackSession.is_active == True,
-                )
-                .order_by(desc(PlaybackSession.start_time))
-                .first()
-            )
+            session = AnalyticsService._find_active_session(db, media_id, user_id)
 
             if session:
                 session.status = SessionStatus.PAUSED
-                db.commit()
-                db.refresh(session)
+                AnalyticsService._save(db, session, commit)
                 logger.info(f"⏸️  Session en pause : {session.id}")
 
             return session
 
         except Exception as e:
-            db.rollback()
+            if commit:
+                db.rollback()
             logger.error(f"❌ Erreur lors de la pause : {e}")
             raise
 
     @staticmethod
-    def resume_session(db: Session, media_id: str, user_id: str) -> PlaybackSession | None:
-        """Reprend une session en pause"""
+    def resume_session(db: Session, media_id: str, user_id: str, commit: bool = True) -> PlaybackSession | None:
+        """Reprend une session en pause (commit=False : flush seulement)"""
         try:
-            session = (
-                db.query(PlaybackSession)
-                .filter(
-                    PlaybackSession.media_id == media_id,
-                    PlaybackSession.user_id == user_id,
-                    PlaybackSession.is_active == True,
-                )
-                .order_by(desc(PlaybackSession.start_time))
-                .first()
-            )
+            session = AnalyticsService._find_active_session(db, media_id, user_id)
 
             if session:
                 session.status = SessionStatus.ACTIVE
-                db.commit()
-                db.refresh(session)
+                AnalyticsService._save(db, session, commit)
                 logger.info(f"▶️  Session reprise : {session.id}")
 
             return session
 
         except Exception as e:
-            db.rollback()
+            if commit:
+                db.rollback()
             logger.error(f"❌ Erreur lors de la reprise : {e}")
             raise
 
     @staticmethod
-    def update_media_statistics(db: Session, session: PlaybackSession):
-        """Met à jour les statistiques du média après une session"""
+    def set_session_status(db: Session, session_id: str, status: SessionStatus, commit: bool = True) -> bool:
+        """
+        Change le statut d'une session active par sa clé primaire, sans la charger
+
+        Pause/Resume depuis l'index des sessions actives : un UPDATE, sans SELECT.
+
+        Returns:
+            False si la session n'est plus active en base
+        """
+        try:
+            updated = (
+                db.query(PlaybackSession)
+                .filter(PlaybackSession.id == session_id, PlaybackSession.is_active == True)
+                .update({PlaybackSession.status: status}, synchronize_session=False)
+            )
+            AnalyticsService._save(db, None, commit)
+            return updated > 0
+
+        except Exception as e:
+            if commit:
+                db.rollback()
+            logger.error(f"❌ Erreur lors du changement de statut de la session {session_id} : {e}")
+            raise
+
+    @staticmethod
+    def _find_active_session(db: Session, media_id: str, user_id: str) -> PlaybackSession | None:
+        """Session active la plus récente d'un utilisateur sur un média (sans l'index en mémoire)"""
+        return (
+            db.query(PlaybackSession)
+            .filter(
+                PlaybackSession.media_id == media_id,
+                PlaybackSession.user_id == user_id,
+                PlaybackSession.is_active == True,
+            )
+            .order_by(desc(PlaybackSession.start_time))
+            .first()
+        )
+
+    @staticmethod
+    def update_media_statistics(db: Session, session: PlaybackSession, commit: bool = True):
+        """Met à jour les statistiques du média après une session (voir stop_session pour commit)"""
         try:
             # Récupérer ou créer les stats du média
             media_stat = db.query(MediaStatistic).filter(MediaStatistic.media_id == session.media_id).first()
@@ -297,24 +343,23 @@ class AnalyticsService:
             elif session.playback_method == PlaybackMethod.TRANSCODED:
                 media_stat.transcoded_count += 1
 
-            # Calculer les utilisateurs uniques
-            unique_users_count = (
-                db.query(func.count(func.distinct(PlaybackSession.user_id)))
-                .filter(PlaybackSession.media_id == session.media_id)
-                .scalar()
-            )
-            media_stat.unique_users = unique_users_count
+            # Utilisateurs uniques : +1 si l'utilisateur n'avait jamais terminé ce média
+            if AnalyticsService._mark_seen(db, MediaViewer, media_id=session.media_id, user_id=session.user_id):
+                media_stat.unique_users += 1
 
-            db.commit()
+            AnalyticsService._save(db, None, commit)
             logger.info(f"📊 Stats média mises à jour : {media_stat.media_title}")
 
         except Exception as e:
+            # Sans commit, l'erreur remonte pour que l'appelant annule son savepoint
+            if not commit:
+                raise
             db.rollback()
             logger.error(f"❌ Erreur lors de la mise à jour des stats média : {e}")
 
     @staticmethod
-    def update_daily_analytics(db: Session, session: PlaybackSession):
-        """Met à jour les analytics quotidiennes"""
+    def update_daily_analytics(db: Session, session: PlaybackSession, commit: bool = True):
+        """Met à jour les analytics quotidiennes (voir stop_session pour commit)"""
         try:
             session_date = session.start_time.date()
 
@@ -349,31 +394,72 @@ class AnalyticsService:
             elif session.playback_method == PlaybackMethod.TRANSCODED:
                 daily_stat.transcoded_count += 1
 
-            # Calculer les utilisateurs et médias uniques du jour
-            unique_users = (
-                db.query(func.count(func.distinct(PlaybackSession.user_id)))
-                .filter(func.date(PlaybackSession.start_time) == session_date)
-                .scalar()
-            )
-            daily_stat.unique_users = unique_users
+            # Utilisateurs et médias uniques du jour : +1 à la première rencontre
+            if AnalyticsService._mark_seen(db, DailyViewer, date=session_date, user_id=session.user_id):
+                daily_stat.unique_users += 1
+            if AnalyticsService._mark_seen(db, DailyMedia, date=session_date, media_id=session.media_id):
+                daily_stat.unique_media += 1
 
-            unique_media = (
-                db.query(func.count(func.distinct(PlaybackSession.media_id)))
-                .filter(func.date(PlaybackSession.start_time) == session_date)
-                .scalar()
-            )
-            daily_stat.unique_media = unique_media
-
-            db.commit()
+            AnalyticsService._save(db, None, commit)
             logger.info(f"📅 Analytics quotidiennes mises à jour : {session_date}")
 
         except Exception as e:
+            # Sans commit, l'erreur remonte pour que l'appelant annule son savepoint
+            if not commit:
+                raise
             db.rollback()
             logger.error(f"❌ Erreur lors de la mise à jour des analytics quotidiennes : {e}")
 
     @staticmethod
-    def get_active_sessions(db: Session) -> list[PlaybackSession]:
-        """Récupère toutes les sessions actives"""
+    def _mark_seen(db: Session, model: type, **key: Any) -> bool:
+        """
+        Enregistrer un couple dans un ensemble "déjà vu" (MediaViewer, DailyViewer, DailyMedia)
+
+        Un INSERT IGNORE sur la clé primaire : coût constant quelle que soit la taille de
+        l'historique, contrairement à un COUNT(DISTINCT) sur playback_sessions.
+
+        Returns:
+            True si le couple est nouveau (le compteur unique correspondant doit augmenter)
+        """
+        result = db.execute(insert(model).prefix_with("IGNORE").values(**key))
+        return result.rowcount > 0
+
+    @staticmethod
+    def day_range(start_date: date, end_date: date | None = None) -> tuple:
+        """
+        Filtre semi-ouvert [start_date 00:00, end_date + 1 jour 00:00) sur start_time
+
+        À utiliser à la place de func.date(start_time) : la comparaison directe sur la colonne
+        permet un range scan sur les index (start_time, device_type + start_time, ...).
+
+        Args:
+            start_date: Premier jour inclus
+            end_date: Dernier jour inclus (par défaut : start_date)
+        """
+        end_date = end_date or start_date
+        # Bornes naïves : start_time est stocké en UTC dans un DATETIME sans fuseau
+        return (
+            PlaybackSession.start_time >= datetime.combine(start_date, time.min),
+            PlaybackSession.start_time < datetime.combine(end_date + timedelta(days=1), time.min),
+        )
+
+    @staticmethod
+    def _save(db: Session, instance: Any | None, commit: bool):
+        """Commit (et rechargement de l'instance), ou simple flush si la transaction appartient à l'appelant"""
+        if not commit:
+            db.flush()
+            return
+
+        db.commit()
+        if instance is not None:
+            db.refresh(instance)
+
+    @staticmethod
+    def get_active_sessions(db: Session) -> list[PlaybackSession | ActiveSession]:
+        """Récupère toutes les sessions actives (depuis l'index en mémoire une fois chargé)"""
+        if active_session_index.ready:
+            return active_session_index.all()
+
         return (
             db.query(PlaybackSession)
             .filter(PlaybackSession.is_active == True)
@@ -401,6 +487,7 @@ class AnalyticsService:
             )
 
             count = 0
+            orphan_ids = set()
             for session in orphan_sessions:
                 session.is_active = False
                 session.status = SessionStatus.STOPPED
@@ -409,9 +496,11 @@ class AnalyticsService:
                 # Ne pas estimer watched_seconds pour les sessions orphelines
                 # pour éviter de corrompre les données analytics
 
+                orphan_ids.add(session.id)
                 count += 1
 
             db.commit()
+            active_session_index.discard(orphan_ids)
 
             if count > 0:
                 logger.info(f"🧹 {count} sessions orphelines nettoyées")
@@ -424,67 +513,70 @@ class AnalyticsService:
             return 0
 
     @staticmethod
-    def update_device_statistics(db: Session, target_date: date | None = None):
+    def update_device_statistics(db: Session, target_date: date | None = None, end_date: date | None = None) -> int:
         """
-        Met à jour les statistiques par appareil pour une date donnée
+        Met à jour les statistiques par appareil d'un jour, ou de chaque jour d'une période
+
+        Une seule requête agrégée (GROUP BY jour, type d'appareil) sur toute la période, puis un
+        upsert en masse dans device_statistics : une ligne par jour et par type d'appareil.
+        Permet de recalculer une année en un appel.
 
         Args:
             db: Session DB
-            target_date: Date cible (par défaut : hier)
+            target_date: Premier jour (par défaut : hier)
+            end_date: Dernier jour inclus (par défaut : target_date)
+
+        Returns:
+            Nombre de lignes (jour, type d'appareil) écrites
         """
         try:
             if not target_date:
                 target_date = (datetime.now(UTC) - timedelta(days=1)).date()
-
-            # Pour chaque type d'appareil
-            for device_type in DeviceType:
-                # Compter les sessions
-                sessions = (
-                    db.query(PlaybackSession)
-                    .filter(
-                        func.date(PlaybackSession.start_time) == target_date, PlaybackSession.device_type == device_type
-                    )
-                    .all()
+            end_date = end_date or target_date
+
+            rollup = (
+                db.query(
+                    PlaybackSession.session_date,
+                    PlaybackSession.device_type,
+                    func.count(PlaybackSession.id).label("session_count"),
+                    func.coalesce(func.sum(PlaybackSession.watched_seconds), 0).label("total_duration"),
+                    func.count(func.distinct(PlaybackSession.user_id)).label("unique_users"),
                 )
+                .filter(*AnalyticsService.day_range(target_date, end_date))
+                .group_by(PlaybackSession.session_date, PlaybackSession.device_type)
+                .all()
+            )
 
-                if not sessions:
-                    continue
-
-                session_count = len(sessions)
-                total_duration = sum([s.watched_seconds for s in sessions])
-                unique_users = len(set([s.user_id for s in sessions]))
-
-                # Vérifier si l'enregistrement existe
-                device_stat = (
-                    db.query(DeviceStatistic)
-                    .filter(
-                        DeviceStatistic.device_type == device_type,
-                        DeviceStatistic.period_start == target_date,
-                        DeviceStatistic.period_end == target_date,
-                    )
-                    .first()
+            rows = [
+                {
+                    "id": generate_uuid(),
+                    "device_type": row.device_type,
+                    "period_start": row.session_date,
+                    "period_end": row.session_date,
+                    "session_count": row.session_count,
+                    "total_duration_seconds": int(row.total_duration),
+                    "unique_users": row.unique_users,
+                }
+                for row in rollup
+            ]
+
+            # Upsert sur l'index unique (device_type, period_start, period_end)
+            for chunk in iter_batches(rows, UPSERT_CHUNK_SIZE):
+                stmt = mysql_insert(DeviceStatistic.__table__).values(chunk)
+                stmt = stmt.on_duplicate_key_update(
+                    session_count=stmt.inserted.session_count,
+                    total_duration_seconds=stmt.inserted.total_duration_seconds,
+                    unique_users=stmt.inserted.unique_users,
+                    updated_at=func.now(),
                 )
-
-                if device_stat:
-                    # Mettre à jour
-                    device_stat.session_count = session_count
-                    device_stat.total_duration_seconds = total_duration
-                    device_stat.unique_users = unique_users
-                else:
-                    # Créer
-                    device_stat = DeviceStatistic(
-                        device_type=device_type,
-                        period_start=target_date,
-                        period_end=target_date,
-                        session_count=session_count,
-                        total_duration_seconds=total_duration,
-                        unique_users=unique_users,
-                    )
-                    db.add(device_stat)
+                db.execute(stmt)
 
             db.commit()
-            logger.info(f"📊 Statistiques par appareil mises à jour pour {target_date}")
+            period = target_date if end_date == target_date else f"{target_date} → {end_date}"
+            logger.info(f"📊 Statistiques par appareil mises à jour pour {period} ({len(rows)} lignes)")
+            return len(rows)
 
         except Exception as e:
             db.rollback()
             logger.error(f"❌ Erreur lors de la mise à jour des device statistics : {e}")
+            return 0
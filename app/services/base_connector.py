@@ -1,12 +1,22 @@
+import time
 from typing import Any
 
 import httpx
 
+from app.core.metrics import CONNECTOR_ERRORS, CONNECTOR_REQUEST_DURATION, endpoint_label
+
 
 class BaseConnector:
     """Classe de base pour tous les connecteurs API"""
 
-    def __init__(self, base_url: str, api_key: str, port: int | None = None, timeout: int = 30):
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        port: int | None = None,
+        timeout: int = 30,
+        limits: httpx.Limits | None = None,
+    ):
         # Si un port est fourni et pas déjà dans l'URL, l'ajouter
         if port and f":{port}" not in base_url:
             # Supprimer le / final si présent
@@ -18,12 +28,43 @@ class BaseConnector:
         self.base_url = base_url.rstrip("/")
         self.api_key = api_key
         self.timeout = timeout
-        self.client = httpx.AsyncClient(timeout=timeout)
+        self.client = httpx.AsyncClient(timeout=timeout, limits=limits or httpx.Limits())
+        # Connecteur partagé par le connector_registry : close() ne ferme rien, le registry s'en charge
+        self.shared = False
 
     async def close(self):
-        """Fermer la connexion HTTP"""
+        """Fermer la connexion HTTP (sans effet sur un connecteur partagé)"""
+        if self.shared:
+            return
+        await self.aclose()
+
+    async def aclose(self):
+        """Fermer réellement les connexions HTTP (appelé par le connector_registry à l'arrêt)"""
         await self.client.aclose()
 
+    async def _send(self, method: str, endpoint: str, **kwargs: Any) -> httpx.Response:
+        """
+        Requête HTTP mesurée (latence et erreurs par endpoint, exposées sur /metrics)
+
+        Raises:
+            httpx.HTTPError: En cas d'erreur réseau ou de statut >= 400
+        """
+        labels = {"connector": type(self).__name__, "method": method, "endpoint": endpoint_label(endpoint)}
+        started = time.perf_counter()
+
+        try:
+            response = await self.client.request(method, f"{self.base_url}{endpoint}", **kwargs)
+            response.raise_for_status()
+            return response
+        except httpx.HTTPStatusError as e:
+            CONNECTOR_ERRORS.inc(reason=str(e.response.status_code), **labels)
+            raise
+        except httpx.HTTPError as e:
+            CONNECTOR_ERRORS.inc(reason=type(e).__name__, **labels)
+            raise
+        finally:
+            CONNECTOR_REQUEST_DURATION.observe(time.perf_counter() - started, **labels)
+
     async def _get(self, endpoint: str, params: dict[str, Any] | None = None) -> dict[str, Any]:
         """
         Effectuer une requête GET
@@ -38,12 +79,10 @@ class BaseConnector:
         Raises:
             httpx.HTTPError: En cas d'erreur HTTP
         """
-        url = f"{self.base_url}{endpoint}"
         headers = self._get_headers()
 
         try:
-            response = await self.client.get(url, headers=headers, params=params)
-            response.raise_for_status()
+            response = await self._send("GET", endpoint, headers=headers, params=params)
             return response.json()
         except httpx.HTTPError as e:
             print(f"❌ Erreur HTTP {endpoint}: {e}")
@@ -63,15 +102,13 @@ class BaseConnector:
         Returns:
             Réponse JSON
         """
-        url = f"{self.base_url}{endpoint}"
         headers = self._get_headers()
 
         # Utiliser json si fourni, sinon data
         payload = json if json is not None else data
 
         try:
-            response = await self.client.post(url, headers=headers, json=payload)
-            response.raise_for_status()
+            response = await self._send("POST", endpoint, headers=headers, json=payload)
             return response.json()
         except httpx.HTTPError as e:
             print(f"❌ Erreur HTTP POST {endpoint}: {e}")
@@ -79,12 +116,10 @@ class BaseConnector:
 
     async def _put(self, endpoint: str, data: dict[str, Any] | None = None) -> dict[str, Any]:
         """Effectuer une requête PUT"""
-        url = f"{self.base_url}{endpoint}"
         headers = self._get_headers()
 
         try:
-            response = await self.client.put(url, headers=headers, json=data)
-            response.raise_for_status()
+            response = await self._send("PUT", endpoint, headers=headers, json=data)
             return response.json()
         except httpx.HTTPError as e:
             print(f"❌ Erreur HTTP PUT {endpoint}: {e}")
@@ -92,12 +127,10 @@ class BaseConnector:
 
     async def _delete(self, endpoint: str) -> dict[str, Any]:
         """Effectuer une requête DELETE"""
-        url = f"{self.base_url}{endpoint}"
         headers = self._get_headers()
 
         try:
-            response = await self.client.delete(url, headers=headers)
-            response.raise_for_status()
+            response = await self._send("DELETE", endpoint, headers=headers)
             return response.json() if response.content else {}
         except httpx.HTTPError as e:
             print(f"❌ Erreur HTTP DELETE {endpoint}: {e}")
@@ -0,0 +1,218 @@
+"""
+Upsert en masse (INSERT ... ON DUPLICATE KEY UPDATE) des LibraryItem et CalendarEvent
+"""
+
+import hashlib
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from datetime import date
+from typing import Any
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.engine import Row
+from sqlalchemy.orm import Session
+
+from app.models.enums import MediaType
+from app.models.models import CalendarEvent, LibraryItem, generate_uuid
+
+# Nombre de lignes par requête INSERT multi-valeurs
+UPSERT_CHUNK_SIZE = 500
+
+
+@dataclass
+class UpsertResult:
+    """Résultat d'un upsert en masse"""
+
+    inserted: int = 0
+    updated: int = 0
+    unchanged: int = 0
+
+    def __iadd__(self, other: "UpsertResult") -> "UpsertResult":
+        self.inserted += other.inserted
+        self.updated += other.updated
+        self.unchanged += other.unchanged
+        return self
+
+
+def iter_batches(items: Iterable[Any], size: int) -> Iterator[list[Any]]:
+    """Découper un itérable en lots de taille fixe (le dernier peut être plus petit)"""
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def build_natural_key(*parts: Any) -> str:
+    """
+    Hash SHA1 d'une clé naturelle (ex: 'MOVIE|Dune|2021')
+
+    Doit rester identique au backfill SQL (migration/add_natural_keys.sql) :
+    SHA1(CONCAT_WS('|', ...)) avec les enums stockés par leur nom.
+    """
+    raw = "|".join("" if part is None else str(part) for part in parts)
+    return hashlib.sha1(raw.encode("utf-8"), usedforsecurity=False).hexdigest()
+
+
+def library_item_key(media_type: MediaType, title: str, year: int) -> str:
+    """Clé naturelle d'un LibraryItem : (type, titre, année)"""
+    return build_natural_key(media_type.name, title, year)
+
+
+def calendar_event_key(media_type: MediaType, title: str, release_date: date, episode: str | None) -> str:
+    """
+    Clé naturelle d'un CalendarEvent
+
+    Films : (type, titre, date). Épisodes : (type, date, épisode) sans le titre, pour
+    pouvoir corriger les anciens événements enregistrés avec le titre 'Unknown'.
+    """
+    key_title = "" if media_type == MediaType.TV else title
+    return build_natural_key(media_type.name, key_title, release_date.isoformat(), episode or "")
+
+
+def bulk_upsert(
+    db: Session,
+    model: type,
+    rows: list[dict[str, Any]],
+    update_columns: list[str],
+    merge: Callable[[Row, dict[str, Any]], dict[str, Any]],
+    chunk_size: int = UPSERT_CHUNK_SIZE,
+) -> UpsertResult:
+    """
+    Upsert d'un lot de lignes identifiées par leur natural_key
+
+    1 SELECT charge l'état courant des clés du lot, le diff est calculé en mémoire, puis seules
+    les lignes nouvelles ou modifiées sont écrites par INSERT ... ON DUPLICATE KEY UPDATE.
+    Ne commit pas : la transaction reste à la charge de l'appelant.
+
+    Args:
+        db: Session SQLAlchemy
+        model: Modèle cible (doit avoir une colonne natural_key unique)
+        rows: Lignes complètes (toutes les colonnes NOT NULL). Les clés préfixées par '_'
+            sont transmises à merge mais jamais écrites.
+        update_columns: Colonnes mises à jour sur les lignes existantes
+        merge: (état courant, nouvelle ligne) -> colonnes à modifier ({} si inchangée)
+        chunk_size: Nombre de lignes par requête INSERT
+
+    Returns:
+        Nombre de lignes insérées, mises à jour et inchangées
+    """
+    result = UpsertResult()
+
+    # Dédupliquer le lot par clé (la dernière occurrence gagne)
+    by_key = {row["natural_key"]: row for row in rows}
+    if not by_key:
+        return result
+
+    columns = [model.natural_key, *(getattr(model, column) for column in update_columns)]
+    existing = {row.natural_key: row for row in db.execute(select(*columns).where(model.natural_key.in_(by_key)))}
+
+    to_write = []
+    for key, row in by_key.items():
+        values = {column: value for column, value in row.items() if not column.startswith("_")}
+        current = existing.get(key)
+
+        if current is None:
+            result.inserted += 1
+        else:
+            changes = merge(current, row)
+            if not changes:
+                result.unchanged += 1
+                continue
+            # Repartir de l'état courant : ON DUPLICATE KEY UPDATE écrase toutes les update_columns
+            values.update({column: getattr(current, column) for column in update_columns}, **changes)
+            result.updated += 1
+
+        # L'id n'est utilisé qu'à l'insertion (ignoré en cas de doublon)
+        values["id"] = generate_uuid()
+        to_write.append(values)
+
+    for chunk in iter_batches(to_write, chunk_size):
+        stmt = insert(model.__table__).values(chunk)
+        stmt = stmt.on_duplicate_key_update(
+            {**{column: stmt.inserted[column] for column in update_columns}, "updated_at": func.now()}
+        )
+        db.execute(stmt)
+
+    return result
+
+
+def delete_missing_library_items(
+    db: Session, media_type: MediaType, upstream_keys: set[str], chunk_size: int = UPSERT_CHUNK_SIZE
+) -> int:
+    """
+    Supprimer les LibraryItem d'un type absents de la bibliothèque upstream (passe de réconciliation)
+
+    Ne commit pas. Ne supprime rien si upstream_keys est vide : les connecteurs retournent []
+    en cas d'erreur, ce qui viderait la table.
+
+    Args:
+        db: Session SQLAlchemy
+        media_type: Type des items à réconcilier
+        upstream_keys: natural_key de tous les items présents upstream
+        chunk_size: Nombre d'ids par requête DELETE
+
+    Returns:
+        Nombre de lignes supprimées
+    """
+    if not upstream_keys:
+        return 0
+
+    rows = db.execute(select(LibraryItem.id, LibraryItem.natural_key).where(LibraryItem.media_type == media_type))
+    stale_ids = [row.id for row in rows if row.natural_key not in upstream_keys]
+
+    for chunk in iter_batches(stale_ids, chunk_size):
+        db.execute(delete(LibraryItem).where(LibraryItem.id.in_(chunk)))
+
+    return len(stale_ids)
+
+
+def _merge_library_item(current: Row, row: dict[str, Any]) -> dict[str, Any]:
+    """Règles de mise à jour d'un LibraryItem existant"""
+    changes = {}
+
+    # Le hash n'est renseigné que s'il n'existe pas encore
+    if row["torrent_hash"] and not current.torrent_hash:
+        changes["torrent_hash"] = row["torrent_hash"]
+
+    # nb_media est toujours mis à jour
+    if current.nb_media != row["nb_media"]:
+        changes["nb_media"] = row["nb_media"]
+
+    # La taille n'est mise à jour que si l'API en fournit une
+    if row["_size_bytes"] > 0 and current.size != row["size"]:
+        changes["size"] = row["size"]
+
+    return changes
+
+
+def _merge_calendar_event(current: Row, row: dict[str, Any]) -> dict[str, Any]:
+    """Règles de mise à jour d'un CalendarEvent existant"""
+    changes = {}
+
+    # Corriger les anciens titres 'Unknown'
+    if current.title == "Unknown" and row["title"] != "Unknown":
+        changes["title"] = row["title"]
+
+    # Compléter l'image si elle était vide
+    if row["image_url"] and not current.image_url:
+        changes["image_url"] = row["image_url"]
+        changes["image_alt"] = row["image_alt"]
+    elif row["media_type"] == MediaType.TV and current.image_alt != row["image_alt"]:
+        changes["image_alt"] = row["image_alt"]
+
+    return changes
+
+
+def upsert_library_items(db: Session, rows: list[dict[str, Any]]) -> UpsertResult:
+    """Upsert en masse de LibraryItem (voir bulk_upsert)"""
+    return bulk_upsert(db, LibraryItem, rows, ["torrent_hash", "nb_media", "size"], _merge_library_item)
+
+
+def upsert_calendar_events(db: Session, rows: list[dict[str, Any]]) -> UpsertResult:
+    """Upsert en masse de CalendarEvent (voir bulk_upsert)"""
+    return bulk_upsert(db, CalendarEvent, rows, ["title", "image_url", "image_alt"], _merge_calendar_event)
@@ -2,6 +2,8 @@
 Factory pour créer les connectors selon le type de service
 """
 
+from typing import Any
+
 from app.models import ServiceConfiguration
 from app.services.jellyfin_connector import JellyfinConnector
 from app.services.jellyseerr_connector import JellyseerrConnector
@@ -10,12 +12,13 @@ from app.services.radarr_connector import RadarrConnector
 from app.services.sonarr_connector import SonarrConnector
 
 
-def create_connector(service: ServiceConfiguration):
+def create_connector(service: ServiceConfiguration, **options: Any):
     """
     Crée le bon connector selon le type de service
 
     Args:
         service: Configuration du service
+        **options: Options transmises au connector (timeout, limits)
 
     Returns:
         Instance du connector approprié
@@ -26,23 +29,27 @@ def create_connector(service: ServiceConfiguration):
     service_type = service.service_name.lower()
 
     if service_type == "jellyfin":
-        return JellyfinConnector(base_url=service.url, api_key=service.api_key, port=service.port)
+        return JellyfinConnector(base_url=service.url, api_key=service.api_key, port=service.port, **options)
 
     elif service_type == "jellyseerr":
-        return JellyseerrConnector(base_url=service.url, api_key=service.api_key, port=service.port)
+        return JellyseerrConnector(base_url=service.url, api_key=service.api_key, port=service.port, **options)
 
     elif service_type == "sonarr":
-        return SonarrConnector(base_url=service.url, api_key=service.api_key, port=service.port)
+        return SonarrConnector(base_url=service.url, api_key=service.api_key, port=service.port, **options)
 
     elif service_type == "radarr":
-        return RadarrConnector(base_url=service.url, api_key=service.api_key, port=service.port)
+        return RadarrConnector(base_url=service.url, api_key=service.api_key, port=service.port, **options)
 
     elif service_type == "qbittorrent":
         if not service.username or not service.password:
             raise ValueError("qBittorrent nécessite username et password")
 
         return QBittorrentConnector(
-            base_url=service.url, username=service.username, password=service.password, port=service.port
+            base_url=service.url,
+            username=service.username,
+            password=service.password,
+            port=service.port,
+            **options,
         )
 
     else:
@@ -0,0 +1,116 @@
+"""
+Registry process-wide des connecteurs : clients HTTP persistants et poolés (keep-alive)
+"""
+
+import asyncio
+import logging
+
+import httpx
+
+from app.core.config import settings
+from app.models import ServiceConfiguration
+from app.services.base_connector import BaseConnector
+from app.services.connector_factory import create_connector
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectorRegistry:
+    """
+    Connecteurs partagés, un par ServiceConfiguration
+
+    Chaque connecteur garde son pool de connexions (et sa session qBittorrent authentifiée)
+    d'une requête à l'autre : plus de handshake TCP/TLS ni de login à chaque sync ou appel API.
+    Le connecteur n'est reconstruit que si la configuration de connexion du service change.
+    """
+
+    def __init__(self):
+        # service.id -> (empreinte de la configuration, connecteur)
+        self._connectors: dict[str, tuple[tuple, BaseConnector]] = {}
+        # Fermetures différées des connecteurs remplacés (tâche -> connecteur)
+        self._retiring: dict[asyncio.Task, BaseConnector] = {}
+
+    @staticmethod
+    def _fingerprint(service: ServiceConfiguration) -> tuple:
+        """
+        Empreinte de la configuration de connexion d'un service
+
+        updated_at seul ne suffit pas : le test de connexion le modifie (test_status) sans
+        toucher à la configuration, ce qui reconstruirait le client à chaque test.
+        """
+        return (service.service_name, service.url, service.port, service.api_key, service.username, service.password)
+
+    @staticmethod
+    def _limits() -> httpx.Limits:
+        """Limites du pool de connexions (voir settings.HTTP_*)"""
+        return httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY,
+        )
+
+    def get(self, service: ServiceConfiguration) -> BaseConnector:
+        """
+        Récupérer le connecteur partagé d'un service (créé au premier appel)
+
+        Le connecteur retourné est partagé : son close() ne ferme rien.
+
+        Args:
+            service: Configuration du service
+
+        Returns:
+            Instance du connector approprié
+
+        Raises:
+            ValueError: Si le type de service n'est pas supporté
+        """
+        fingerprint = self._fingerprint(service)
+        entry = self._connectors.get(service.id)
+
+        if entry is not None:
+            current_fingerprint, connector = entry
+            if current_fingerprint == fingerprint:
+                return connector
+            # Configuration modifiée : remplacer le connecteur sans couper les requêtes en cours
+            logger.info(f"🔄 Configuration {service.service_name} modifiée, nouveau client HTTP")
+            self._retire(connector)
+
+        connector = create_connector(service, timeout=settings.HTTP_TIMEOUT, limits=self._limits())
+        connector.shared = True
+        self._connectors[service.id] = (fingerprint, connector)
+        return connector
+
+    def _retire(self, connector: BaseConnector):
+        """Fermer un connecteur remplacé une fois ses requêtes en cours terminées (délai = timeout)"""
+
+        async def close_later():
+            await asyncio.sleep(connector.timeout)
+            await connector.aclose()
+
+        task = asyncio.get_running_loop().create_task(close_later())
+        self._retiring[task] = connector
+        task.add_done_callback(lambda done: self._retiring.pop(done, None))
+
+    async def close_all(self):
+        """Fermer tous les clients (shutdown de l'application)"""
+        connectors = [connector for _, connector in self._connectors.values()]
+        self._connectors.clear()
+
+        # Les connecteurs remplacés sont fermés tout de suite plutôt qu'après leur délai
+        for task, connector in list(self._retiring.items()):
+            task.cancel()
+            connectors.append(connector)
+        self._retiring.clear()
+
+        for connector in connectors:
+            try:
+                await connector.aclose()
+            except Exception as e:
+                logger.error(f"❌ Erreur fermeture connecteur {connector.base_url} : {e}")
+
+        if connectors:
+            print(f"🔒 {len(connectors)} clients HTTP fermés")
+
+
+# Instance globale du registry
+connector_registry = ConnectorRegistry()
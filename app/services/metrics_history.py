@@ -0,0 +1,186 @@
+"""
+Historique des métriques serveur : sous-échantillonnage minute / heure et lecture pour graphiques
+"""
+
+import logging
+import math
+import threading
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.models import ServerMetricHour, ServerMetricMinute
+from app.services.metrics_sampler import SERIES, MetricsSample, metrics_sampler
+
+logger = logging.getLogger(__name__)
+
+
+class _Aggregate:
+    """min / somme / max / nombre de relevés de chaque série sur une période"""
+
+    def __init__(self, period_start: datetime):
+        self.period_start = period_start
+        self.samples = 0
+        self._stats: dict[str, list[float]] = {}
+
+    def add(self, name: str, minimum: float, average: float, maximum: float, count: int):
+        stats = self._stats.get(name)
+        if stats is None:
+            self._stats[name] = [minimum, average * count, maximum, count]
+        else:
+            stats[0] = min(stats[0], minimum)
+            stats[1] += average * count
+            stats[2] = max(stats[2], maximum)
+            stats[3] += count
+
+    def add_sample(self, sample: MetricsSample):
+        self.samples += 1
+        for name in SERIES:
+            value = getattr(sample, name)
+            if value is not None:
+                self.add(name, value, value, value, 1)
+
+    def add_period(self, period: "_Aggregate"):
+        """Ajouter une période plus fine (minute dans l'heure)"""
+        self.samples += period.samples
+        for name, (minimum, total, maximum, count) in period._stats.items():
+            self.add(name, minimum, total / count, maximum, count)
+
+    def row(self, model: type) -> Any:
+        values: dict[str, Any] = {"period_start": self.period_start, "samples": self.samples}
+        for name, (minimum, total, maximum, count) in self._stats.items():
+            values[f"{name}_min"] = minimum
+            values[f"{name}_avg"] = round(total / count, 3)
+            values[f"{name}_max"] = maximum
+        return model(**values)
+
+
+class MetricsHistory:
+    """
+    Sous-échantillonnage des relevés en min/avg/max par minute puis par heure
+
+    add() reçoit chaque relevé de capture_metrics : à chaque changement de minute, la minute
+    terminée est écrite dans server_metrics_minute et ajoutée à l'heure en cours ; à chaque
+    changement d'heure, l'heure terminée est écrite dans server_metrics_hour. La minute et
+    l'heure en cours restent en mémoire (perdues au redémarrage).
+
+    history() renvoie au plus N points d'une série en lisant la résolution la plus grossière qui
+    en donne encore au moins N (buffer brut, minutes ou heures), regroupés en N intervalles.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._minute: _Aggregate | None = None
+        self._hour: _Aggregate | None = None
+
+    def add(self, db: Session, sample: MetricsSample):
+        """Ajouter un relevé, et écrire les minutes et heures terminées"""
+        recorded_at = sample.recorded_at.astimezone(UTC).replace(tzinfo=None)
+        minute = recorded_at.replace(second=0, microsecond=0)
+        hour = minute.replace(minute=0)
+        rows = []
+
+        with self._lock:
+            if self._minute is not None and self._minute.period_start != minute:
+                rows.append(self._minute.row(ServerMetricMinute))
+                self._hour = self._hour or _Aggregate(self._minute.period_start.replace(minute=0))
+                self._hour.add_period(self._minute)
+                self._minute = None
+
+            if self._hour is not None and self._hour.period_start != hour:
+                rows.append(self._hour.row(ServerMetricHour))
+                self._hour = None
+
+            self._minute = self._minute or _Aggregate(minute)
+            self._minute.add_sample(sample)
+
+        if rows:
+            for row in rows:
+                # merge : une période réécrite (ex: redémarrage dans la même minute) est remplacée
+                db.merge(row)
+            db.commit()
+
+    def history(self, db: Session, metric: str, hours: int, points: int) -> tuple[str, list[dict[str, Any]]]:
+        """
+        Série d'une métrique sur les dernières heures, en au plus points intervalles
+
+        Args:
+            db: Session SQLAlchemy
+            metric: Nom de la série (voir SERIES)
+            hours: Fenêtre, en heures
+            points: Nombre maximum de points
+
+        Returns:
+            (résolution lue : "raw", "minute" ou "hour", [{timestamp, min, avg, max}, ...])
+        """
+        end = datetime.now(UTC)
+        start = end - timedelta(hours=hours)
+        step = (end - start).total_seconds() / points
+
+        resolution = self._resolution(step, start, hours)
+        if resolution == "raw":
+            rows = [
+                (timestamp, value, value, value, 1)
+                for timestamp, value in metrics_sampler.points(metric, start.timestamp())
+            ]
+        else:
+            model = ServerMetricMinute if resolution == "minute" else ServerMetricHour
+            query = (
+                db.query(
+                    model.period_start,
+                    getattr(model, f"{metric}_min"),
+                    getattr(model, f"{metric}_avg"),
+                    getattr(model, f"{metric}_max"),
+                    model.samples,
+                )
+                .filter(model.period_start >= start.replace(tzinfo=None), getattr(model, f"{metric}_avg").isnot(None))
+                .order_by(model.period_start)
+            )
+            rows = [
+                (period_start.replace(tzinfo=UTC).timestamp(), minimum, average, maximum, samples)
+                for period_start, minimum, average, maximum, samples in query
+            ]
+
+        return resolution, self._bucket(rows, start.timestamp(), step, points)
+
+    @staticmethod
+    def _resolution(step: float, start: datetime, hours: int) -> str:
+        """Résolution la plus grossière dont le pas reste inférieur à celui demandé, si disponible"""
+        oldest = metrics_sampler.oldest()
+        raw_covers = oldest is not None and oldest <= start.timestamp() + settings.METRICS_SAMPLE_INTERVAL_SECONDS
+
+        if step < 60 and raw_covers:
+            return "raw"
+        if step < 3600 and hours <= settings.METRICS_MINUTE_RETENTION_DAYS * 24:
+            return "minute"
+        return "hour"
+
+    @staticmethod
+    def _bucket(rows: list[tuple], start: float, step: float, points: int) -> list[dict[str, Any]]:
+        """Regrouper des (timestamp, min, avg, max, relevés) en au plus points intervalles de step secondes"""
+        buckets: dict[int, _Aggregate] = {}
+        for timestamp, minimum, average, maximum, samples in rows:
+            index = min(points - 1, max(0, math.floor((timestamp - start) / step)))
+            bucket = buckets.get(index)
+            if bucket is None:
+                bucket = buckets[index] = _Aggregate(datetime.fromtimestamp(start + index * step, UTC))
+            bucket.add("value", minimum, average, maximum, max(samples, 1))
+
+        points = []
+        for index in sorted(buckets):
+            minimum, total, maximum, count = buckets[index]._stats["value"]
+            points.append(
+                {
+                    "timestamp": buckets[index].period_start,
+                    "min": round(minimum, 3),
+                    "avg": round(total / count, 3),
+                    "max": round(maximum, 3),
+                }
+            )
+        return points
+
+
+# Instance globale de l'historique
+metrics_history = MetricsHistory()
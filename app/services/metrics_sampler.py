@@ -0,0 +1,218 @@
+"""
+Échantillonnage non bloquant des métriques système
+"""
+
+import logging
+import math
+import threading
+import time
+from array import array
+from dataclasses import dataclass
+from datetime import datetime
+
+import psutil
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Séries numériques d'un relevé conservées dans le buffer et sous-échantillonnées
+SERIES = (
+    "cpu_usage_percent",
+    "memory_usage_gb",
+    "bandwidth_mbps",
+    "disk_read_mbps",
+    "disk_write_mbps",
+    "active_sessions_count",
+    "active_transcoding_count",
+)
+
+
+@dataclass(frozen=True)
+class MetricsSample:
+    """Relevé des métriques serveur (mêmes champs que ServerMetric, plus les débits disque)"""
+
+    recorded_at: datetime
+    cpu_usage_percent: float
+    memory_usage_gb: float
+    memory_total_gb: float
+    storage_used_tb: float
+    storage_total_tb: float
+    bandwidth_mbps: float
+    disk_read_mbps: float | None
+    disk_write_mbps: float | None
+    cpu_status: str
+    memory_status: str
+    storage_status: str
+    bandwidth_status: str
+    active_sessions_count: int
+    active_transcoding_count: int
+
+
+@dataclass(frozen=True)
+class _Counters:
+    """Compteurs cumulés psutil lus à un tick"""
+
+    at: float
+    cpu_busy: float
+    cpu_total: float
+    net_bytes: int | None
+    disk_read_bytes: int | None
+    disk_write_bytes: int | None
+
+
+@dataclass(frozen=True)
+class Rates:
+    """Débits moyens entre deux ticks"""
+
+    cpu_usage_percent: float
+    bandwidth_mbps: float
+    disk_read_mbps: float | None
+    disk_write_mbps: float | None
+
+
+def _read_counters() -> _Counters:
+    cpu = psutil.cpu_times()
+    # Temps inactif : idle, plus iowait sous Linux (comme psutil.cpu_percent)
+    idle = cpu.idle + getattr(cpu, "iowait", 0.0)
+    total = sum(cpu)
+
+    try:
+        net = psutil.net_io_counters()
+        net_bytes = net.bytes_sent + net.bytes_recv
+    except Exception:
+        net_bytes = None
+
+    try:
+        disk = psutil.disk_io_counters()
+    except Exception:
+        disk = None
+
+    return _Counters(
+        at=time.monotonic(),
+        cpu_busy=total - idle,
+        cpu_total=total,
+        net_bytes=net_bytes,
+        disk_read_bytes=disk.read_bytes if disk else None,
+        disk_write_bytes=disk.write_bytes if disk else None,
+    )
+
+
+def _mbps(before: int | None, after: int | None, seconds: float) -> float | None:
+    """Débit en Mbps entre deux compteurs d'octets (None si indisponible ou remis à zéro)"""
+    if before is None or after is None or after < before:
+        return None
+    # Même unité que l'ancienne mesure : Mbit = 1024 * 1024 bits
+    return round((after - before) * 8 / (1024 * 1024) / seconds, 2)
+
+
+class MetricsRingBuffer:
+    """
+    Relevés bruts de taille fixe : un array("d") par série plutôt qu'un objet par relevé
+
+    Une valeur absente (ex: débit disque indisponible) est stockée en NaN. Pas de verrou :
+    protégé par celui du MetricsSampler.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._timestamps = array("d", [math.nan]) * capacity
+        self._series = {name: array("d", [math.nan]) * capacity for name in SERIES}
+        self._next = 0
+        self._size = 0
+
+    def append(self, sample: MetricsSample):
+        index = self._next
+        self._timestamps[index] = sample.recorded_at.timestamp()
+        for name, values in self._series.items():
+            value = getattr(sample, name)
+            values[index] = math.nan if value is None else float(value)
+
+        self._next = (index + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def oldest(self) -> float | None:
+        """Timestamp (epoch) du plus ancien relevé conservé"""
+        if not self._size:
+            return None
+        return self._timestamps[(self._next - self._size) % self.capacity]
+
+    def points(self, name: str, since: float) -> list[tuple[float, float]]:
+        """(timestamp, valeur) d'une série depuis since, du plus ancien au plus récent"""
+        values = self._series[name]
+        points = []
+        for offset in range(self._size, 0, -1):
+            index = (self._next - offset) % self.capacity
+            timestamp, value = self._timestamps[index], values[index]
+            if timestamp >= since and not math.isnan(value):
+                points.append((timestamp, value))
+        return points
+
+
+class MetricsSampler:
+    """
+    Débits CPU, réseau et disque calculés par différence entre deux ticks, sans attente
+
+    Chaque tick lit les compteurs cumulés de psutil et les compare à ceux du tick précédent :
+    les valeurs sont des moyennes sur tout l'intervalle (30s par le scheduler), pas un instantané
+    d'une seconde. Les derniers relevés sont gardés dans un buffer circulaire en mémoire, lu par
+    /analytics/server-metrics sans requête SQL.
+    """
+
+    def __init__(self, capacity: int):
+        self._lock = threading.Lock()
+        self._previous: _Counters | None = None
+        self._buffer = MetricsRingBuffer(capacity)
+        self._latest: MetricsSample | None = None
+
+    def prime(self):
+        """Lire les compteurs de référence du premier intervalle"""
+        with self._lock:
+            self._previous = _read_counters()
+
+    def tick(self) -> Rates:
+        """Débits moyens depuis le tick précédent (0 au premier tick, faute de référence)"""
+        counters = _read_counters()
+
+        with self._lock:
+            previous, self._previous = self._previous, counters
+
+        if previous is None or counters.at <= previous.at:
+            return Rates(cpu_usage_percent=0.0, bandwidth_mbps=0.0, disk_read_mbps=None, disk_write_mbps=None)
+
+        seconds = counters.at - previous.at
+        cpu_total = counters.cpu_total - previous.cpu_total
+        cpu_busy = counters.cpu_busy - previous.cpu_busy
+        cpu_percent = round(min(100.0, max(0.0, cpu_busy / cpu_total * 100)), 1) if cpu_total > 0 else 0.0
+
+        return Rates(
+            cpu_usage_percent=cpu_percent,
+            bandwidth_mbps=_mbps(previous.net_bytes, counters.net_bytes, seconds) or 0.0,
+            disk_read_mbps=_mbps(previous.disk_read_bytes, counters.disk_read_bytes, seconds),
+            disk_write_mbps=_mbps(previous.disk_write_bytes, counters.disk_write_bytes, seconds),
+        )
+
+    def record(self, sample: MetricsSample):
+        """Ajouter un relevé au buffer (le plus ancien est écarté si plein)"""
+        with self._lock:
+            self._buffer.append(sample)
+            self._latest = sample
+
+    def latest(self) -> MetricsSample | None:
+        """Dernier relevé, ou None avant le premier tick"""
+        with self._lock:
+            return self._latest
+
+    def oldest(self) -> float | None:
+        """Timestamp (epoch) du plus ancien relevé du buffer"""
+        with self._lock:
+            return self._buffer.oldest()
+
+    def points(self, name: str, since: float) -> list[tuple[float, float]]:
+        """Relevés bruts d'une série depuis since (epoch), du plus ancien au plus récent"""
+        with self._lock:
+            return self._buffer.points(name, since)
+
+
+# Instance globale de l'échantillonneur
+metrics_sampler = MetricsSampler(capacity=settings.METRICS_BUFFER_SIZE)
@@ -1,10 +1,14 @@
 import logging
-from datetime import datetime
+from datetime import UTC, datetime
 
 import psutil
 from sqlalchemy.orm import Session
 
 from app.models.models import PlaybackSession, ServerMetric
+from app.services.active_sessions import active_session_index
+from app.services.metrics_history import metrics_history
+from app.services.metrics_sampler import MetricsSample, metrics_sampler
+from app.services.retention_service import RetentionPolicy, retention_service
 
 logger = logging.getLogger(__name__)
 
@@ -12,11 +16,6 @@ logger = logging.getLogger(__name__)
 class MetricsService:
     """Service pour gérer les métriques serveur"""
 
-    @staticmethod
-    def get_cpu_usage() -> float:
-        """Récupère l'utilisation CPU en pourcentage"""
-        return psutil.cpu_percent(interval=1)
-
     @staticmethod
     def get_memory_usage() -> tuple[float, float]:
         """
@@ -39,31 +38,6 @@ class MetricsService:
         total_tb = disk.total / (1024**4)
         return used_tb, total_tb
 
-    @staticmethod
-    def get_network_bandwidth() -> float:
-        """
-        Récupère la bande passante réseau en Mbps
-        Mesure sur 1 seconde
-        """
-        try:
-            net_before = psutil.net_io_counters()
-            import time
-
-            time.sleep(1)
-            net_after = psutil.net_io_counters()
-
-            # Calculer les bytes envoyés + reçus par seconde
-            bytes_sent = net_after.bytes_sent - net_before.bytes_sent
-            bytes_recv = net_after.bytes_recv - net_before.bytes_recv
-            total_bytes = bytes_sent + bytes_recv
-
-            # Convertir en Mbps
-            mbps = (total_bytes * 8) / (1024 * 1024)
-            return round(mbps, 2)
-        except Exception as e:
-            logger.warning(f"⚠️  Impossible de récupérer la bande passante : {e}")
-            return 0.0
-
     @staticmethod
     def determine_status(value: float, warning_threshold: float, error_threshold: float) -> str:
         """
@@ -85,16 +59,21 @@ class MetricsService:
             return "success"
 
     @staticmethod
-    def capture_metrics(db: Session) -> ServerMetric:
+    def capture_metrics(db: Session) -> MetricsSample:
         """
-        Capture toutes les métriques système et les enregistre en DB
+        Capture toutes les métriques système
+
+        CPU, réseau et disque sont des moyennes depuis la capture précédente (metrics_sampler,
+        sans attente). Le relevé brut ne reste qu'en mémoire, dans le buffer de l'échantillonneur
+        lu par /server-metrics ; seuls les agrégats minute / heure sont écrits en base.
         """
         try:
             # Récupérer les métriques
-            cpu_percent = MetricsService.get_cpu_usage()
+            rates = metrics_sampler.tick()
+            cpu_percent = rates.cpu_usage_percent
             memory_usage_gb, memory_total_gb = MetricsService.get_memory_usage()
             storage_used_tb, storage_total_tb = MetricsService.get_disk_usage()
-            bandwidth_mbps = MetricsService.get_network_bandwidth()
+            bandwidth_mbps = rates.bandwidth_mbps
 
             # Calculer les pourcentages
             memory_percent = (memory_usage_gb / memory_total_gb) * 100 if memory_total_gb > 0 else 0
@@ -109,42 +88,45 @@ class MetricsService:
             # À adapter selon ton infrastructure
             bandwidth_status = "error" if bandwidth_mbps > 500 else ("warning" if bandwidth_mbps > 100 else "success")
 
-            # Compter les sessions actives
-            active_sessions_count = db.query(PlaybackSession).filter(PlaybackSession.is_active == True).count()
-
-            # Compter les transcodages actifs
-            active_transcoding_count = (
-                db.query(PlaybackSession)
-                .filter(PlaybackSession.is_active == True, PlaybackSession.transcoding_progress > 0)
-                .count()
-            )
-
-            # Créer l'enregistrement
-            metric = ServerMetric(
+            # Compter les sessions actives et les transcodages actifs
+            if active_session_index.ready:
+                active_sessions_count, active_transcoding_count = active_session_index.counts()
+            else:
+                active_sessions_count = db.query(PlaybackSession).filter(PlaybackSession.is_active == True).count()
+                active_transcoding_count = (
+                    db.query(PlaybackSession)
+                    .filter(PlaybackSession.is_active == True, PlaybackSession.transcoding_progress > 0)
+                    .count()
+                )
+
+            sample = MetricsSample(
+                recorded_at=datetime.now(UTC),
                 cpu_usage_percent=cpu_percent,
                 memory_usage_gb=memory_usage_gb,
                 memory_total_gb=memory_total_gb,
                 storage_used_tb=storage_used_tb,
                 storage_total_tb=storage_total_tb,
                 bandwidth_mbps=bandwidth_mbps,
+                disk_read_mbps=rates.disk_read_mbps,
+                disk_write_mbps=rates.disk_write_mbps,
                 cpu_status=cpu_status,
                 memory_status=memory_status,
-                bandwidth_status=bandwidth_status,
                 storage_status=storage_status,
+                bandwidth_status=bandwidth_status,
                 active_sessions_count=active_sessions_count,
                 active_transcoding_count=active_transcoding_count,
             )
+            metrics_sampler.record(sample)
 
-            db.add(metric)
-            db.commit()
-            db.refresh(metric)
+            # Minutes et heures terminées : min/avg/max persistés pour l'historique
+            metrics_history.add(db, sample)
 
             logger.info(
                 f"📊 Métriques capturées : CPU={cpu_percent}%, "
                 f"RAM={memory_usage_gb:.1f}GB, Sessions={active_sessions_count}"
             )
 
-            return metric
+            return sample
 
         except Exception as e:
             db.rollback()
@@ -152,26 +134,18 @@ class MetricsService:
             raise
 
     @staticmethod
-    def cleanup_old_metrics(db: Session, keep_days: int = 7):
+    def cleanup_old_metrics(db: Session, keep_days: int = 7) -> int:
         """
         Nettoie les anciennes métriques (garder seulement les X derniers jours)
 
+        Suppression par lots (voir RetentionService), sans budget de temps.
+
         Args:
             db: Session DB
             keep_days: Nombre de jours à conserver
-        """
-        try:
-            from datetime import timedelta
-
-            cutoff_date = datetime.utcnow() - timedelta(days=keep_days)
 
-            deleted = db.query(ServerMetric).filter(ServerMetric.recorded_at < cutoff_date).delete()
-
-            db.commit()
-
-            if deleted > 0:
-                logger.info(f"🧹 {deleted} anciennes métriques supprimées")
-
-        except Exception as e:
-            db.rollback()
-            logger.error(f"❌ Erreur lors du nettoyage des métriques : {e}")
+        Returns:
+            Nombre de métriques supprimées
+        """
+        policy = RetentionPolicy(model=ServerMetric, time_column="recorded_at", keep_days=keep_days)
+        return retention_service.purge(db, policy)
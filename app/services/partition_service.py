@@ -0,0 +1,238 @@
+"""
+Partitionnement mensuel des tables brutes (MariaDB)
+"""
+
+import logging
+from datetime import UTC, date, datetime
+
+from sqlalchemy import and_, not_, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Tables partitionnées et leur colonne de partitionnement
+PARTITIONED_TABLES = {"playback_sessions": "start_time", "server_metrics": "recorded_at"}
+
+# Dernière partition (MAXVALUE), vide tant que les mois à venir sont créés à l'avance
+FUTURE_PARTITION = "p_future"
+
+
+def _month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def _add_months(month: date, months: int) -> date:
+    years, month_index = divmod(month.month - 1 + months, 12)
+    return date(month.year + years, month_index + 1, 1)
+
+
+def _partition_sql(month: date) -> str:
+    """Définition de la partition d'un mois (p202610 : lignes avant le 2026-11-01)"""
+    return f"PARTITION p{month:%Y%m} VALUES LESS THAN ('{_add_months(month, 1):%Y-%m-%d}')"
+
+
+def _future_partition_sql() -> str:
+    return f"PARTITION {FUTURE_PARTITION} VALUES LESS THAN (MAXVALUE)"
+
+
+class PartitionService:
+    """
+    Partitions RANGE COLUMNS mensuelles de playback_sessions et server_metrics
+
+    Les requêtes bornées dans le temps ne lisent que les mois concernés, et la rétention
+    supprime un mois expiré par DROP PARTITION au lieu de DELETE ligne à ligne.
+
+    MariaDB impose que la clé primaire contienne la colonne de partitionnement : elle devient
+    (id, colonne) en base, le modèle ORM garde id seul. Sans effet si DB_PARTITIONING_ENABLED
+    est faux ou hors MariaDB/MySQL.
+    """
+
+    @staticmethod
+    def enabled(db: Session) -> bool:
+        return settings.DB_PARTITIONING_ENABLED and db.get_bind().dialect.name == "mysql"
+
+    @staticmethod
+    def partitions(db: Session, table: str) -> list[tuple[str, datetime | None]]:
+        """
+        Partitions d'une table, dans l'ordre
+
+        Returns:
+            [(nom, borne supérieure exclue ou None pour MAXVALUE), ...] ; vide si non partitionnée
+        """
+        rows = db.execute(
+            text(
+                "SELECT PARTITION_NAME, PARTITION_DESCRIPTION FROM information_schema.PARTITIONS "
+                "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table AND PARTITION_NAME IS NOT NULL "
+                "ORDER BY PARTITION_ORDINAL_POSITION"
+            ),
+            {"table": table},
+        )
+        return [
+            (name, None if description == "MAXVALUE" else datetime.fromisoformat(description.strip("'")))
+            for name, description in rows
+        ]
+
+    @staticmethod
+    def ensure_partitioned(db: Session) -> list[str]:
+        """
+        Partitionner les tables qui ne le sont pas encore
+
+        Réécrit chaque table convertie (verrou pendant la copie) : à lancer application arrêtée
+        sur une base existante. Une partition par mois depuis la plus ancienne ligne, plus
+        DB_PARTITION_AHEAD_MONTHS mois à venir.
+
+        Returns:
+            Tables converties
+        """
+        if not PartitionService.enabled(db):
+            return []
+
+        current_month = _month_start(datetime.now(UTC).date())
+        converted = []
+
+        for table, column in PARTITIONED_TABLES.items():
+            if PartitionService.partitions(db, table):
+                continue
+
+            # Noms issus de PARTITIONED_TABLES, jamais d'une entrée externe
+            oldest = db.execute(text(f"SELECT MIN({column}) FROM {table}")).scalar()  # noqa: S608
+            month = _month_start(oldest.date()) if oldest else current_month
+            last_month = _add_months(current_month, settings.DB_PARTITION_AHEAD_MONTHS)
+
+            definitions = []
+            while month <= last_month:
+                definitions.append(_partition_sql(month))
+                month = _add_months(month, 1)
+            definitions.append(_future_partition_sql())
+
+            logger.info(f"🧱 Partitionnement de {table} par mois de {column} ({len(definitions)} partitions)...")
+
+            # La colonne entre dans la clé primaire : plus de NULL possible
+            db.execute(
+                text(f"UPDATE {table} SET {column} = COALESCE(created_at, NOW()) WHERE {column} IS NULL")  # noqa: S608
+            )
+            db.execute(text(f"ALTER TABLE {table} DROP PRIMARY KEY, ADD PRIMARY KEY (id, {column})"))
+            db.execute(text(f"ALTER TABLE {table} PARTITION BY RANGE COLUMNS({column}) ({', '.join(definitions)})"))
+            db.commit()
+
+            converted.append(table)
+            logger.info(f"✅ {table} partitionnée")
+
+        return converted
+
+    @staticmethod
+    def ensure_future_partitions(db: Session, table: str) -> list[str]:
+        """
+        Créer les partitions des DB_PARTITION_AHEAD_MONTHS prochains mois
+
+        Returns:
+            Partitions créées
+        """
+        partitions = PartitionService.partitions(db, table)
+        bounds = [upper for _, upper in partitions if upper is not None]
+        if not bounds:
+            return []
+
+        month = max(bounds).date()
+        last_month = _add_months(_month_start(datetime.now(UTC).date()), settings.DB_PARTITION_AHEAD_MONTHS)
+
+        months = []
+        while month <= last_month:
+            months.append(month)
+            month = _add_months(month, 1)
+        if not months:
+            return []
+
+        definitions = ", ".join(_partition_sql(month) for month in months)
+        if partitions[-1][1] is None:
+            # Découper la partition MAXVALUE (vide : pas de copie de lignes)
+            db.execute(
+                text(
+                    f"ALTER TABLE {table} REORGANIZE PARTITION {partitions[-1][0]} "
+                    f"INTO ({definitions}, {_future_partition_sql()})"
+                )
+            )
+        else:
+            db.execute(text(f"ALTER TABLE {table} ADD PARTITION ({definitions})"))
+        db.commit()
+
+        created = [f"p{month:%Y%m}" for month in months]
+        logger.info(f"🧱 Partitions créées pour {table} : {', '.join(created)}")
+        return created
+
+    @staticmethod
+    def drop_expired(
+        db: Session, model: type, cutoff: datetime, filters: tuple = (), empty_only: bool = False
+    ) -> list[str]:
+        """
+        Supprimer les partitions dont toutes les lignes sont antérieures à cutoff
+
+        Une partition n'est supprimée que si toutes ses lignes (et celles des partitions
+        précédentes) remplissent filters, ou si elle est vide quand empty_only est vrai ; sinon
+        elle et les suivantes sont laissées à la purge par lots.
+
+        Args:
+            db: Session SQLAlchemy
+            model: Modèle d'une table partitionnée
+            cutoff: Date limite de rétention
+            filters: Conditions pour qu'une ligne soit supprimable (ex: session terminée)
+            empty_only: Ne supprimer que des partitions vides (lignes à archiver d'abord)
+
+        Returns:
+            Partitions supprimées
+        """
+        table = model.__tablename__
+        if table not in PARTITIONED_TABLES or not PartitionService.enabled(db):
+            return []
+
+        time_column = getattr(model, PARTITIONED_TABLES[table])
+        dropped = []
+
+        for name, upper in PartitionService.partitions(db, table):
+            if upper is None or upper > cutoff:
+                break
+
+            if empty_only:
+                blocking = db.query(time_column).filter(time_column < upper)
+            elif filters:
+                blocking = db.query(time_column).filter(time_column < upper, not_(and_(*filters)))
+            else:
+                blocking = None
+
+            if blocking is not None and blocking.first() is not None:
+                logger.info(f"⏭️  Partition {table}.{name} conservée : lignes encore à garder ou à archiver")
+                break
+
+            db.execute(text(f"ALTER TABLE {table} DROP PARTITION {name}"))
+            dropped.append(name)
+
+        db.commit()
+        if dropped:
+            logger.info(f"🧹 Partitions expirées de {table} supprimées : {', '.join(dropped)}")
+
+        return dropped
+
+    @staticmethod
+    def maintain(db: Session) -> dict[str, list[str]]:
+        """
+        Créer à l'avance les partitions des mois à venir (appelé par le scheduler analytics)
+
+        La suppression des partitions expirées est faite par la rétention (drop_expired).
+
+        Returns:
+            Partitions créées par table
+        """
+        if not PartitionService.enabled(db):
+            return {}
+
+        created = {}
+        for table in PARTITIONED_TABLES:
+            try:
+                created[table] = PartitionService.ensure_future_partitions(db, table)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"❌ Erreur lors de la maintenance des partitions de {table} : {e}")
+
+        return created
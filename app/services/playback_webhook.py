@@ -0,0 +1,345 @@
+"""
+Traitement des webhooks de lecture Jellyfin
+
+Le traitement est découpé en deux étapes :
+- parse_playback_event : validation et extraction du payload (pur, sans I/O), sur l'event loop
+- apply_playback_batch : écritures SQLAlchemy synchrones, exécutées hors de l'event loop (run_db),
+  un micro-lot de la file webhooks par transaction, un savepoint par événement
+"""
+
+import logging
+import re
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.enums import MediaType, SessionStatus
+from app.models.models import LibraryItem
+from app.services.active_sessions import ActiveSession, ActiveSessionChanges, active_session_index
+from app.services.analytics_service import AnalyticsService
+
+logger = logging.getLogger(__name__)
+
+# Pattern Jellyfin ID (hex 32 chars)
+_JELLYFIN_ID_PATTERN = re.compile(r"^[a-fA-F0-9]{1,64}$")
+
+# Mapping des événements Jellyfin
+EVENT_MAPPING = {
+    "Play": "playback.start",
+    "Stop": "playback.stop",
+    "Pause": "playback.pause",
+    "Resume": "playback.unpause",
+}
+
+
+def _truncate(value: str | None, max_length: int = 255) -> str | None:
+    """Tronque une chaîne à une longueur maximale"""
+    if value is None:
+        return None
+    return value[:max_length]
+
+
+def _build_session_data(
+    item: dict[str, Any], user: dict[str, Any], session_info: dict[str, Any], play_state: dict[str, Any]
+) -> dict[str, Any]:
+    """Données de la PlaybackSession à créer pour un événement Play"""
+    media_id = item.get("Id")
+
+    # Déterminer le type de média
+    item_type = item.get("Type", "Movie")
+    media_type = "tv" if item_type == "Episode" else "movie"
+
+    # Info épisode si série
+    episode_info = None
+    if item_type == "Episode":
+        season = item.get("ParentIndexNumber", 0)
+        episode = item.get("IndexNumber", 0)
+        episode_info = f"S{season:02d}E{episode:02d}"
+
+    # Extraire la qualité vidéo depuis les MediaStreams
+    media_streams = item.get("MediaStreams", [])
+    video_stream = next((s for s in media_streams if s.get("Type") == "Video"), {})
+    video_height = video_stream.get("Height", 0)
+
+    # Mapper la qualité (vérifier HDR pour 2160p)
+    video_range = video_stream.get("VideoRange", "")
+    if video_height >= 2160:
+        video_quality = "FOUR_K_HDR" if video_range and video_range.upper() == "HDR" else "FOUR_K"
+    else:
+        quality_map = {1080: "FULL_HD", 720: "HD", 480: "SD"}
+        video_quality = quality_map.get(video_height, "UNKNOWN")
+
+    # Codec vidéo source
+    video_codec_source = video_stream.get("Codec", "unknown")
+
+    # Déterminer si c'est du transcodage
+    play_method = play_state.get("PlayMethod", "DirectPlay")
+    is_transcoding = play_method == "Transcode"
+    is_direct_playing = play_method == "DirectPlay"
+
+    # Codec cible si transcodage
+    video_codec_target = None
+    if is_transcoding:
+        video_codec_target = "h264"  # Par défaut pour le transcodage
+
+    # Durée en secondes
+    run_time_ticks = item.get("RunTimeTicks", 0)
+    duration_seconds = run_time_ticks // 10000000 if run_time_ticks else None
+
+    # Déterminer le type d'appareil
+    device_name = session_info.get("DeviceName", "Unknown")
+    client_name = session_info.get("Client", "Unknown")
+
+    # URL du poster : Utiliser l'URL publique de Jellyfin
+    poster_url = None
+    jellyfin_url = getattr(settings, "JELLYFIN_PUBLIC_URL", None)
+    if item.get("ImageTags", {}).get("Primary") and jellyfin_url:
+        poster_url = f"{jellyfin_url}/Items/{media_id}/Images/Primary"
+
+    return {
+        "media_id": media_id,
+        "media_title": _truncate(item.get("Name", "Unknown")),
+        "media_type": media_type,
+        "media_year": item.get("ProductionYear"),
+        "episode_info": _truncate(episode_info, 20),
+        "poster_url": _truncate(poster_url, 500),
+        "user_id": user.get("Id"),
+        "user_name": _truncate(user.get("Name", "Unknown")),
+        "device_name": _truncate(device_name),
+        "client_name": _truncate(client_name),
+        "video_quality": video_quality,
+        "is_transcoding": is_transcoding,
+        "is_direct_playing": is_direct_playing,
+        "transcoding_progress": 0,
+        "transcoding_speed": None,
+        "video_codec_source": _truncate(video_codec_source, 50),
+        "video_codec_target": _truncate(video_codec_target, 50),
+        "duration_seconds": duration_seconds,
+    }
+
+
+def parse_playback_event(payload: dict[str, Any]) -> dict[str, Any] | None:
+    """
+    Valider un payload webhook Jellyfin et en extraire l'événement à appliquer
+
+    Args:
+        payload: Payload JSON du webhook
+
+    Returns:
+        Événement sérialisable en JSON (event, media_id, user_id + données propres au type),
+        ou None si le type d'événement n'est pas supporté
+
+    Raises:
+        ValueError: IDs manquants ou invalides
+    """
+    event_type_raw = payload.get("Event")
+    item = payload.get("Item", {})
+    user = payload.get("User", {})
+    session_info = payload.get("Session", {})
+    play_state = session_info.get("PlayState", {})
+
+    event_type = EVENT_MAPPING.get(event_type_raw)
+    if not event_type:
+        return None
+
+    # Extraction et validation des IDs
+    media_id = item.get("Id")
+    user_id = user.get("Id")
+
+    if not media_id or not user_id:
+        raise ValueError("Item.Id et User.Id sont requis")
+
+    if not _JELLYFIN_ID_PATTERN.match(str(media_id)) or not _JELLYFIN_ID_PATTERN.match(str(user_id)):
+        raise ValueError("Format d'ID invalide")
+
+    event = {"event": event_type, "media_id": media_id, "user_id": user_id, "title": item.get("Name")}
+
+    if event_type == "playback.start":
+        event["session_data"] = _build_session_data(item, user, session_info, play_state)
+        # Critères de recherche du LibraryItem correspondant
+        event["series_name"] = item.get("SeriesName")
+    elif event_type == "playback.stop":
+        # Position de lecture en secondes
+        playback_position_ticks = play_state.get("PositionTicks", 0)
+        event["watched_seconds"] = playback_position_ticks // 10000000 if playback_position_ticks else 0
+
+    return event
+
+
+def _find_library_item_id(db: Session, event: dict[str, Any]) -> str | None:
+    """Recherche du LibraryItem correspondant au média lu"""
+    session_data = event["session_data"]
+
+    if session_data["media_type"] == "movie":
+        row = (
+            db.query(LibraryItem.id)
+            .filter(
+                LibraryItem.title == event["title"],
+                LibraryItem.media_type == MediaType.MOVIE,
+                LibraryItem.year == session_data["media_year"],
+            )
+            .first()
+        )
+    elif event.get("series_name"):
+        row = (
+            db.query(LibraryItem.id)
+            .filter(LibraryItem.title == event["series_name"], LibraryItem.media_type == MediaType.TV)
+            .first()
+        )
+    else:
+        row = None
+
+    return row.id if row else None
+
+
+def _change_status(
+    db: Session,
+    media_id: str,
+    user_id: str,
+    status: SessionStatus,
+    sessions: ActiveSessionChanges | None,
+) -> str | None:
+    """
+    Pause/Resume : session retrouvée dans l'index des sessions actives puis un UPDATE par clé
+    primaire, ou, sans index, recherche en base
+
+    Returns:
+        ID de la session modifiée, None si aucune session active
+    """
+    if sessions is None:
+        if status == SessionStatus.PAUSED:
+            playback_session = AnalyticsService.pause_session(db, media_id, user_id, commit=False)
+        else:
+            playback_session = AnalyticsService.resume_session(db, media_id, user_id, commit=False)
+        return playback_session.id if playback_session else None
+
+    active = sessions.get(user_id, media_id)
+    if active is None:
+        return None
+
+    if not AnalyticsService.set_session_status(db, active.id, status, commit=False):
+        # Plus active en base : l'index était en retard
+        sessions.remove(active)
+        return None
+
+    sessions.set_status(active, status)
+    return active.id
+
+
+def _apply(db: Session, event: dict[str, Any], sessions: ActiveSessionChanges | None) -> dict[str, Any]:
+    """
+    Appliquer un événement de lecture, sans commit (dans la transaction du lot, voir apply_playback_batch)
+
+    Args:
+        db: Session SQLAlchemy
+        event: Événement retourné par parse_playback_event
+        sessions: Modifications de l'index des sessions actives, à committer avec la transaction
+            (None : index non chargé, les sessions sont recherchées en base)
+
+    Returns:
+        Réponse du webhook (status, session_id, event)
+    """
+    event_type = event["event"]
+    media_id = event["media_id"]
+    user_id = event["user_id"]
+    # Heure de réception (posée par la route) : la file et le rejeu n'appliquent pas l'événement tout de suite
+    received_at = datetime.fromisoformat(event["received_at"]) if event.get("received_at") else None
+
+    if event_type == "playback.start":
+        session_data = dict(event["session_data"])
+
+        library_item_id = _find_library_item_id(db, event)
+        if library_item_id:
+            session_data["library_item_id"] = library_item_id
+
+        playback_session = AnalyticsService.start_session(db, session_data, commit=False, at=received_at)
+        if sessions is not None:
+            sessions.add(ActiveSession.from_model(playback_session))
+
+        logger.info(f"✅ Session créée : {playback_session.id} - {playback_session.media_title}")
+        return {"status": "success", "session_id": playback_session.id, "event": event_type}
+
+    elif event_type == "playback.stop":
+        watched_seconds = event["watched_seconds"]
+        active = sessions.get(user_id, media_id) if sessions is not None else None
+
+        if sessions is not None and active is None:
+            playback_session = None
+        else:
+            playback_session = AnalyticsService.stop_session(
+                db,
+                media_id,
+                user_id,
+                watched_seconds,
+                commit=False,
+                at=received_at,
+                session_id=active.id if active else None,
+            )
+            if active is not None:
+                sessions.remove(active)
+
+        if playback_session:
+            logger.info(
+                f"✅ Session arrêtée : {playback_session.id} - {playback_session.media_title} ({watched_seconds}s)"
+            )
+            return {"status": "success", "session_id": playback_session.id, "event": event_type}
+        else:
+            logger.warning(f"⚠️  Aucune session active trouvée pour media_id={media_id}, user_id={user_id}")
+            return {"status": "no_active_session", "event": event_type}
+
+    elif event_type == "playback.pause":
+        session_id = _change_status(db, media_id, user_id, SessionStatus.PAUSED, sessions)
+        if session_id:
+            logger.info(f"⏸️  Session mise en pause : {session_id}")
+            return {"status": "success", "session_id": session_id, "event": event_type}
+        return {"status": "no_active_session", "event": event_type}
+
+    elif event_type == "playback.unpause":
+        session_id = _change_status(db, media_id, user_id, SessionStatus.ACTIVE, sessions)
+        if session_id:
+            logger.info(f"▶️  Session reprise : {session_id}")
+            return {"status": "success", "session_id": session_id, "event": event_type}
+        return {"status": "no_active_session", "event": event_type}
+
+    logger.warning(f"⚠️  Événement non supporté : {event_type}")
+    return {"status": "ignored", "event": event_type}
+
+
+def apply_playback_batch(db: Session, events: list[dict[str, Any]]) -> list[dict[str, Any]]:
+    """
+    Appliquer un lot d'événements en une seule transaction (synchrone : à exécuter via run_db)
+
+    Chaque événement a son savepoint : un événement en erreur est annulé sans perdre le lot.
+    L'index des sessions actives n'est mis à jour qu'après le commit.
+
+    Args:
+        db: Session SQLAlchemy
+        events: Événements retournés par parse_playback_event, dans l'ordre de réception
+
+    Returns:
+        Résultat de chaque événement (status 'error' pour ceux annulés)
+    """
+    results = []
+    batch_sessions = active_session_index.transaction() if active_session_index.ready else None
+
+    for event in events:
+        sessions = batch_sessions.savepoint() if batch_sessions is not None else None
+        try:
+            with db.begin_nested():
+                response = _apply(db, event, sessions=sessions)
+        except Exception as e:
+            logger.error(f"❌ Événement {event['event']} ignoré (media_id={event['media_id']}) : {e}")
+            results.append({"status": "error", "event": event["event"], "error": str(e)})
+            continue
+
+        if sessions is not None:
+            sessions.commit()
+        results.append(response)
+
+    db.commit()
+    if batch_sessions is not None:
+        batch_sessions.commit()
+
+    return results
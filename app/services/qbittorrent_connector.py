@@ -2,20 +2,39 @@
 Connecteur pour qBittorrent
 """
 
+import asyncio
 import logging
+import time
 from typing import Any
 
 import aiohttp
+import httpx
 
+from app.core.metrics import CONNECTOR_ERRORS, CONNECTOR_REQUEST_DURATION, endpoint_label
 from app.services.base_connector import BaseConnector
+from app.services.torrent_state_tracker import TorrentStateTracker
 
 logger = logging.getLogger(__name__)
 
+# Nombre de hash par requête /api/v2/torrents/info (séparés par '|', limite la longueur de l'URL)
+TORRENT_INFO_BATCH_SIZE = 200
+
+# Âge max (secondes) du miroir maindata avant un nouveau delta lors d'une lecture
+TRACKER_MAX_AGE = 5
+
 
 class QBittorrentConnector(BaseConnector):
     """Connecteur pour interagir avec l'API qBittorrent"""
 
-    def __init__(self, base_url: str, username: str, password: str, port: int | None = None):
+    def __init__(
+        self,
+        base_url: str,
+        username: str,
+        password: str,
+        port: int | None = None,
+        timeout: int = 30,
+        limits: httpx.Limits | None = None,
+    ):
         """
         Initialise le connecteur qBittorrent
 
@@ -24,6 +43,8 @@ class QBittorrentConnector(BaseConnector):
             username: Nom d'utilisateur
             password: Mot de passe
             port: Port (optionnel, ex: 8090)
+            timeout: Timeout des requêtes en secondes
+            limits: Limites du pool de connexions (keep-alive)
         """
         # Construire l'URL complète
         if port:
@@ -31,25 +52,55 @@ class QBittorrentConnector(BaseConnector):
         else:
             full_url = base_url
 
-        super().__init__(base_url=full_url, api_key="")  # api_key vide car non utilisé
+        super().__init__(base_url=full_url, api_key="", timeout=timeout, limits=limits)  # api_key vide car non utilisé
 
         self.username = username
         self.password = password
+        self.limits = limits or httpx.Limits()
         self.session: aiohttp.ClientSession | None = None
         self._authenticated = False
+        # Un seul login en cours à la fois, partagé par les appelants concurrents
+        self._login_lock = asyncio.Lock()
+        # Incrémenté à chaque login réussi : permet de savoir si un 403 date d'avant un re-login
+        self._login_generation = 0
+        # Miroir de l'état des torrents (vit aussi longtemps que le connecteur partagé)
+        self.tracker = TorrentStateTracker(self.get_maindata)
 
     async def _ensure_session(self):
         """Crée une session HTTP si elle n'existe pas"""
         if self.session is None or self.session.closed:
             # Créer une session avec gestion automatique des cookies
             jar = aiohttp.CookieJar(unsafe=True)  # unsafe=True pour accepter les cookies de toutes les IPs
-            self.session = aiohttp.ClientSession(cookie_jar=jar)
+            # Pool keep-alive aligné sur les limites httpx du connecteur
+            connector = aiohttp.TCPConnector(
+                limit=self.limits.max_connections or 0, keepalive_timeout=self.limits.keepalive_expiry or 15
+            )
+            self.session = aiohttp.ClientSession(
+                cookie_jar=jar, connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
             self._authenticated = False
 
-    async def _ensure_authenticated(self):
-        """S'assure que la session est authentifiée"""
-        if not self._authenticated:
-            await self.login()
+    async def _ensure_authenticated(self, stale_generation: int | None = None) -> bool:
+        """
+        S'assure que la session est authentifiée
+
+        Les appelants concurrents attendent le même login au lieu d'en lancer chacun un.
+
+        Args:
+            stale_generation: Génération de login rejetée par un 403 (re-login forcé si
+                personne ne s'est reconnecté depuis)
+
+        Returns:
+            True si la session est authentifiée
+        """
+        if self._authenticated and stale_generation is None:
+            return True
+
+        async with self._login_lock:
+            # Un autre appelant s'est (re)connecté pendant l'attente du verrou
+            if self._authenticated and self._login_generation != stale_generation:
+                return True
+            return await self._login()
 
     async def login(self) -> bool:
         """
@@ -58,6 +109,13 @@ class QBittorrentConnector(BaseConnector):
         Returns:
             True si authentification réussie, False sinon
         """
+        async with self._login_lock:
+            return await self._login()
+
+    async def _login(self) -> bool:
+        """Authentification (appelant détenteur de _login_lock)"""
+        self._authenticated = False
+
         try:
             await self._ensure_session()
 
@@ -79,6 +137,7 @@ class QBittorrentConnector(BaseConnector):
                     logger.info(f"🍪 Cookies reçus : {cookies}")
 
                     self._authenticated = True
+                    self._login_generation += 1
                     logger.info("✅ Authentification qBittorrent réussie")
                     return True
                 else:
@@ -89,62 +148,184 @@ class QBittorrentConnector(BaseConnector):
             logger.error(f"❌ Erreur lors de l'authentification qBittorrent : {e}")
             return False
 
+    async def _request(
+        self, method: str, endpoint: str, params: dict[str, Any] | None = None, as_json: bool = True
+    ) -> tuple[int, Any]:
+        """
+        Requête authentifiée sur l'API qBittorrent
+
+        Sur un 403 (session expirée, SID invalidé par un redémarrage de qBittorrent...), la
+        session est ré-authentifiée une fois et la requête rejouée.
+
+        Args:
+            method: Méthode HTTP
+            endpoint: Chemin de l'endpoint (ex: '/api/v2/torrents/info')
+            params: Paramètres query string optionnels
+            as_json: Parser la réponse 200 en JSON (sinon texte)
+
+        Returns:
+            (status HTTP, corps de la réponse)
+        """
+        await self._ensure_session()
+        if not await self._ensure_authenticated():
+            return 403, None
+
+        url = f"{self.base_url}{endpoint}"
+        labels = {"connector": type(self).__name__, "method": method, "endpoint": endpoint_label(endpoint)}
+        started = time.perf_counter()
+
+        try:
+            for attempt in range(2):
+                generation = self._login_generation
+
+                async with self.session.request(method, url, params=params) as response:
+                    if response.status == 403 and attempt == 0:
+                        logger.warning("🔐 403 Forbidden - Session expirée, ré-authentification")
+                        if await self._ensure_authenticated(stale_generation=generation):
+                            continue
+
+                    if response.status >= 400:
+                        CONNECTOR_ERRORS.inc(reason=str(response.status), **labels)
+                    if response.status == 200 and as_json:
+                        return response.status, await response.json()
+                    return response.status, await response.text()
+        except Exception as e:
+            CONNECTOR_ERRORS.inc(reason=type(e).__name__, **labels)
+            raise
+        finally:
+            CONNECTOR_REQUEST_DURATION.observe(time.perf_counter() - started, **labels)
+
+        return 403, None
+
+    async def get_maindata(self, rid: int = 0) -> dict[str, Any] | None:
+        """
+        Récupère l'état des torrents depuis un response id (/api/v2/sync/maindata)
+
+        Args:
+            rid: Dernier response id reçu (0 = état complet)
+
+        Returns:
+            Réponse maindata (full_update, torrents, torrents_removed, rid) ou None en cas d'erreur
+        """
+        try:
+            status, data = await self._request("GET", "/api/v2/sync/maindata", params={"rid": rid})
+            if status == 200:
+                return data
+            logger.error(f"❌ Erreur HTTP {status} sur sync/maindata")
+        except Exception as e:
+            logger.error(f"❌ Erreur lors de la récupération de sync/maindata : {e}")
+        return None
+
     async def get_torrent_info(self, torrent_hash: str) -> dict[str, Any] | None:
         """
         Récupère les informations d'un torrent par son hash
 
+        Servi depuis le miroir maindata, avec repli sur /torrents/info si le torrent n'y est
+        pas encore (ajouté depuis le dernier delta) ou si le miroir est indisponible.
+
         Args:
             torrent_hash: Hash du torrent
 
         Returns:
             Dictionnaire avec les infos du torrent ou None
         """
-        try:
-            await self._ensure_authenticated()
+        if await self.tracker.refresh(max_age=TRACKER_MAX_AGE):
+            torrent = self.tracker.get(torrent_hash)
+            if torrent:
+                return self._format_torrent(torrent)
 
+        try:
             # Récupérer les infos du torrent
-            url = f"{self.base_url}/api/v2/torrents/info"
-            params = {"hashes": torrent_hash}
-
-            logger.info(f"🔍 Récupération infos torrent : {url}?hashes={torrent_hash}")
-
-            async with self.session.get(url, params=params) as response:
-                logger.info(f"📥 Réponse get_torrent_info : status={response.status}")
-
-                if response.status == 200:
-                    torrents = await response.json()
-
-                    if torrents and len(torrents) > 0:
-                        torrent = torrents[0]
-
-                        # Formater les données
-                        return {
-                            "hash": torrent.get("hash"),
-                            "name": torrent.get("name"),
-                            "status": self._map_status(torrent.get("state")),
-                            "ratio": round(torrent.get("ratio", 0), 2),
-                            "tags": torrent.get("tags", "").split(",") if torrent.get("tags") else [],
-                            "seeding_time": torrent.get("seeding_time", 0),  # en secondes
-                            "download_date": torrent.get("completion_on"),  # timestamp
-                            "size": torrent.get("size", 0),
-                            "progress": round(torrent.get("progress", 0) * 100, 1),
-                        }
-                    else:
-                        logger.warning(f"⚠️  Torrent {torrent_hash} non trouvé")
-                        return None
-                elif response.status == 403:
-                    logger.error("❌ 403 Forbidden - Session expirée ?")
-                    # Réessayer avec une nouvelle authentification
-                    self._authenticated = False
-                    return None
+            logger.info(f"🔍 Récupération infos torrent : hashes={torrent_hash}")
+
+            status, torrents = await self._request("GET", "/api/v2/torrents/info", params={"hashes": torrent_hash})
+            logger.info(f"📥 Réponse get_torrent_info : status={status}")
+
+            if status == 200:
+                if torrents and len(torrents) > 0:
+                    return self._format_torrent(torrents[0])
                 else:
-                    logger.error(f"❌ Erreur HTTP {response.status}")
+                    logger.warning(f"⚠️  Torrent {torrent_hash} non trouvé")
                     return None
+            elif status == 403:
+                logger.error("❌ 403 Forbidden - Ré-authentification qBittorrent impossible")
+                return None
+            else:
+                logger.error(f"❌ Erreur HTTP {status}")
+                return None
 
         except Exception as e:
             logger.error(f"❌ Erreur lors de la récupération du torrent : {e}")
             return None
 
+    async def get_torrents_info(
+        self, torrent_hashes: list[str], batch_size: int = TORRENT_INFO_BATCH_SIZE
+    ) -> dict[str, dict[str, Any]]:
+        """
+        Récupère les informations de plusieurs torrents
+
+        Servi depuis le miroir maindata ; si le miroir est indisponible, une requête
+        /torrents/info par lot de hash.
+
+        Args:
+            torrent_hashes: Hash des torrents
+            batch_size: Nombre de hash par requête
+
+        Returns:
+            Dictionnaire {hash en majuscules: infos du torrent} (les torrents introuvables sont absents)
+        """
+        # qBittorrent renvoie les hash en minuscules, la DB les stocke en majuscules
+        unique_hashes = list(dict.fromkeys(h.lower() for h in torrent_hashes if h))
+        results = {}
+
+        if await self.tracker.refresh(max_age=TRACKER_MAX_AGE):
+            for torrent_hash in unique_hashes:
+                torrent = self.tracker.get(torrent_hash)
+                if torrent:
+                    results[torrent_hash.upper()] = self._format_torrent(torrent)
+            return results
+
+        for start in range(0, len(unique_hashes), batch_size):
+            batch = unique_hashes[start : start + batch_size]
+
+            try:
+                status, torrents = await self._request(
+                    "GET", "/api/v2/torrents/info", params={"hashes": "|".join(batch)}
+                )
+            except Exception as e:
+                logger.error(f"❌ Erreur lors de la récupération d'un lot de {len(batch)} torrents : {e}")
+                continue
+
+            if status != 200:
+                logger.error(f"❌ Erreur HTTP {status} sur un lot de {len(batch)} torrents")
+                continue
+
+            for torrent in torrents or []:
+                if torrent.get("hash"):
+                    results[torrent["hash"].upper()] = self._format_torrent(torrent)
+
+        logger.info(f"📥 {len(results)}/{len(unique_hashes)} torrents trouvés")
+        return results
+
+    def get_tracked_torrent_info(self, torrent_hash: str) -> dict[str, Any] | None:
+        """Infos formatées d'un torrent depuis le miroir maindata, sans requête (None si absent)"""
+        torrent = self.tracker.get(torrent_hash)
+        return self._format_torrent(torrent) if torrent else None
+
+    def _format_torrent(self, torrent: dict[str, Any]) -> dict[str, Any]:
+        """Formater les données d'un torrent qBittorrent (stockées dans LibraryItem.torrent_info)"""
+        return {
+            "hash": torrent.get("hash"),
+            "name": torrent.get("name"),
+            "status": self._map_status(torrent.get("state")),
+            "ratio": round(torrent.get("ratio", 0), 2),
+            "tags": torrent.get("tags", "").split(",") if torrent.get("tags") else [],
+            "seeding_time": torrent.get("seeding_time", 0),  # en secondes
+            "download_date": torrent.get("completion_on"),  # timestamp
+            "size": torrent.get("size", 0),
+            "progress": round(torrent.get("progress", 0) * 100, 1),
+        }
+
     def _map_status(self, qbt_state: str) -> str:
         """
         Mappe les états qBittorrent vers des états simplifiés
@@ -187,25 +368,22 @@ class QBittorrentConnector(BaseConnector):
                 return False, "Échec de l'authentification. Vérifiez username/password."
 
             # Récupérer la version de qBittorrent
-            url = f"{self.base_url}/api/v2/app/version"
-
-            logger.info(f"🔍 Test connexion : {url}")
+            logger.info(f"🔍 Test connexion : {self.base_url}/api/v2/app/version")
 
-            async with self.session.get(url) as response:
-                logger.info(f"📥 Réponse version : status={response.status}")
+            status, body = await self._request("GET", "/api/v2/app/version", as_json=False)
+            logger.info(f"📥 Réponse version : status={status}")
 
-                if response.status == 200:
-                    version = await response.text()
-                    return True, f"Connecté à qBittorrent v{version}"
-                else:
-                    body = await response.text()
-                    return False, f"Erreur HTTP {response.status} : {body}"
+            if status == 200:
+                return True, f"Connecté à qBittorrent v{body}"
+            else:
+                return False, f"Erreur HTTP {status} : {body}"
 
         except Exception as e:
             return False, f"Erreur de connexion : {str(e)}"
 
-    async def close(self):
-        """Ferme la session HTTP"""
+    async def aclose(self):
+        """Ferme la session HTTP (close() ne ferme rien si le connecteur est partagé)"""
         if self.session and not self.session.closed:
             await self.session.close()
             logger.info("🔒 Session qBittorrent fermée")
+        await super().aclose()
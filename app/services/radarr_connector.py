@@ -1,6 +1,8 @@
 from datetime import UTC, datetime, timedelta
 from typing import Any
 
+import httpx
+
 from app.services.base_connector import BaseConnector
 
 
@@ -20,10 +22,14 @@ class RadarrConnector(BaseConnector):
         except Exception as e:
             return False, f"Erreur de connexion: {str(e)}"
 
-    async def get_movies(self) -> list[dict[str, Any]]:
+    async def get_movies(self, raise_errors: bool = False) -> list[dict[str, Any]]:
         """
         Récupérer tous les films
 
+        Args:
+            raise_errors: Propager l'erreur au lieu de retourner une liste vide (une
+                réconciliation ne doit pas prendre une panne pour une bibliothèque vide)
+
         Returns:
             Liste des films avec leurs détails
         """
@@ -32,8 +38,34 @@ class RadarrConnector(BaseConnector):
             return movies
         except Exception as e:
             print(f"❌ Erreur récupération films Radarr: {e}")
+            if raise_errors:
+                raise
             return []
 
+    async def get_movie(self, movie_id: int) -> dict[str, Any] | None:
+        """
+        Récupérer un film par son ID
+
+        Args:
+            movie_id: ID Radarr
+
+        Returns:
+            Détails du film, ou None s'il a été supprimé (404)
+
+        Raises:
+            httpx.HTTPError: Toute autre erreur (réseau, 5xx...) : le film n'est pas considéré supprimé
+        """
+        try:
+            return await self._get(f"/api/v3/movie/{movie_id}")
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return None
+            print(f"❌ Erreur récupération film Radarr {movie_id}: {e}")
+            raise
+        except httpx.HTTPError as e:
+            print(f"❌ Erreur récupération film Radarr {movie_id}: {e}")
+            raise
+
     async def get_calendar(self, days_ahead: int = 30) -> list[dict[str, Any]]:
         """
         Récupérer le calendrier des sorties
@@ -56,18 +88,22 @@ class RadarrConnector(BaseConnector):
             print(f"❌ Erreur récupération calendrier Radarr: {e}")
             return []
 
-    async def get_recent_additions(self, days: int = 7) -> list[dict[str, Any]]:
+    async def get_recent_additions(
+        self, days: int = 7, movies: list[dict[str, Any]] | None = None
+    ) -> list[dict[str, Any]]:
         """
         Récupérer les films récemment ajoutés
 
         Args:
             days: Nombre de jours en arrière
+            movies: Liste déjà téléchargée (ex: depuis le snapshot du run), sinon récupérée via l'API
 
         Returns:
             Liste des films récemment ajoutés
         """
         try:
-            movies = await self.get_movies()
+            if movies is None:
+                movies = await self.get_movies()
 
             # Filtrer par date d'ajout
             cutoff_date = datetime.now(UTC) - timedelta(days=days)
@@ -129,21 +165,82 @@ class RadarrConnector(BaseConnector):
             Dictionnaire associant les IDs de films aux hash de torrents
         """
         history = await self.get_history(page_size=200)
+        return self.build_hash_map(history)
+
+    def build_hash_map(self, records: list[dict[str, Any]]) -> dict[int, str]:
+        """
+        Créer une map {movieId: torrent_hash} depuis des enregistrements d'historique ou de queue
+
+        Args:
+            records: Enregistrements portant un movieId et un downloadId
+
+        Returns:
+            Dictionnaire associant les IDs de films aux hash de torrents
+        """
         movie_hash_map = {}
 
-        for record in history:
+        for record in records:
             movie_id = record.get("movieId")
             download_id = record.get("downloadId", "")
 
             if movie_id and download_id:
                 # Extraire le hash du downloadId
-                # Format possible: "qBittorrent-HASH" ou juste "HASH"
                 hash_value = self._extract_hash(download_id)
                 if hash_value:
                     movie_hash_map[movie_id] = hash_value
 
         return movie_hash_map
 
+    async def get_history_since(self, since: str) -> list[dict[str, Any]]:
+        """
+        Récupérer l'historique depuis une date (tous types d'événements)
+
+        Args:
+            since: Date ISO 8601 (high-water mark de la dernière synchro)
+
+        Returns:
+            Enregistrements d'historique, du plus ancien au plus récent
+        """
+        try:
+            records = await self._get("/api/v3/history/since", params={"date": since})
+            return sorted(records, key=lambda r: r.get("date", ""))
+        except Exception as e:
+            print(f"❌ Erreur récupération historique Radarr depuis {since}: {e}")
+            return []
+
+    async def get_latest_history_date(self) -> str | None:
+        """
+        Date du dernier événement d'historique (sert de high-water mark)
+
+        Returns:
+            Date ISO 8601 ou None si l'historique est vide
+        """
+        try:
+            params = {"pageSize": 1, "sortKey": "date", "sortDirection": "descending"}
+            response = await self._get("/api/v3/history", params=params)
+            records = response.get("records", [])
+            return records[0].get("date") if records else None
+        except Exception as e:
+            print(f"❌ Erreur récupération dernier événement Radarr: {e}")
+            return None
+
+    async def get_queue(self, page_size: int = 200) -> list[dict[str, Any]]:
+        """
+        Récupérer la file de téléchargement
+
+        Args:
+            page_size: Nombre d'enregistrements à récupérer
+
+        Returns:
+            Enregistrements de la queue (avec downloadId)
+        """
+        try:
+            response = await self._get("/api/v3/queue", params={"pageSize": page_size})
+            return response.get("records", [])
+        except Exception as e:
+            print(f"❌ Erreur récupération queue Radarr: {e}")
+            return []
+
     def _extract_hash(self, download_id: str) -> str | None:
         """
         Extraire le hash du torrent depuis le downloadId
@@ -169,15 +266,19 @@ class RadarrConnector(BaseConnector):
 
         return None
 
-    async def get_statistics(self) -> dict[str, Any]:
+    async def get_statistics(self, movies: list[dict[str, Any]] | None = None) -> dict[str, Any]:
         """
         Récupérer les statistiques Radarr
 
+        Args:
+            movies: Liste déjà téléchargée (ex: depuis le snapshot du run), sinon récupérée via l'API
+
         Returns:
             Statistiques (nombre de films monitorés, téléchargés, etc.)
         """
         try:
-            movies = await self.get_movies()
+            if movies is None:
+                movies = await self.get_movies()
 
             total = len(movies)
             monitored = sum(1 for m in movies if m.get("monitored"))
@@ -0,0 +1,228 @@
+"""
+Rétention des tables brutes : purge par lots, archivage optionnel
+"""
+
+import gzip
+import json
+import logging
+import os
+import time
+import zlib
+from dataclasses import dataclass
+from datetime import UTC, date, datetime, timedelta
+from enum import Enum
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy import delete
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.models import PlaybackSession, ServerMetric, ServerMetricHour, ServerMetricMinute
+from app.services.partition_service import PartitionService
+from app.services.rollup_service import ROLLUP_LOOKBACK_HOURS, rollup_service
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RetentionPolicy:
+    """Règle de rétention d'une table brute"""
+
+    model: type
+    # Colonne datée (indexée) qui décide de l'expiration d'une ligne
+    time_column: str
+    # 0 : pas de purge
+    keep_days: int
+    # Conditions supplémentaires pour qu'une ligne soit supprimable (ex: session terminée)
+    filters: tuple = ()
+    # Ne supprimer que des lignes déjà compactées dans les rollups
+    requires_rollups: bool = False
+
+
+def _json_default(value: Any) -> Any:
+    """Sérialisation des valeurs de colonnes non JSON"""
+    if isinstance(value, datetime | date):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+class RetentionService:
+    """
+    Purge des lignes expirées, par lots et avec un budget de temps par passage
+
+    Chaque lot sélectionne au plus chunk_size clés primaires parmi les lignes expirées (dans
+    l'ordre de la colonne datée, par son index), les archive si demandé, puis les supprime par
+    clé et commit : les verrous ne portent que sur le lot. Une pause sépare les lots, et le
+    passage s'arrête à max_seconds ; le reste est purgé au passage suivant. Sur une table
+    partitionnée, les mois entièrement expirés sont d'abord supprimés par DROP PARTITION
+    (voir PartitionService) : les lots ne traitent que le mois entamé.
+
+    L'archive (un fichier gzip JSONL par table et par passage) est écrite et synchronisée sur
+    disque avant la suppression du lot : un crash entre les deux peut dupliquer des lignes dans
+    l'archive, jamais en perdre.
+    """
+
+    def __init__(
+        self,
+        policies: list[RetentionPolicy],
+        chunk_size: int,
+        chunk_pause_ms: int,
+        max_seconds: int,
+        archive_dir: str | Path | None = None,
+    ):
+        self.policies = policies
+        self.chunk_size = chunk_size
+        self.chunk_pause = chunk_pause_ms / 1000
+        self.max_seconds = max_seconds
+        self.archive_dir = Path(archive_dir) if archive_dir else None
+
+    def run(self, db: Session) -> dict[str, int]:
+        """
+        Appliquer toutes les règles de rétention dans le budget de temps
+
+        Returns:
+            Nombre de lignes supprimées par table
+        """
+        deadline = time.monotonic() + self.max_seconds
+        return {policy.model.__tablename__: self.purge(db, policy, deadline) for policy in self.policies}
+
+    def purge(self, db: Session, policy: RetentionPolicy, deadline: float | None = None) -> int:
+        """
+        Supprimer par lots les lignes expirées d'une table
+
+        Args:
+            db: Session SQLAlchemy
+            policy: Règle de rétention
+            deadline: Instant (time.monotonic) après lequel aucun nouveau lot n'est lancé
+
+        Returns:
+            Nombre de lignes supprimées
+        """
+        table = policy.model.__tablename__
+        if policy.keep_days <= 0:
+            return 0
+
+        cutoff = self._cutoff(db, policy)
+        if cutoff is None:
+            logger.warning(f"⚠️  Rétention {table} ignorée : rollups pas encore compactés")
+            return 0
+
+        time_column = getattr(policy.model, policy.time_column)
+        primary_key = policy.model.__mapper__.primary_key[0]
+        archive = None
+        deleted = 0
+
+        try:
+            # Mois entièrement expirés : DROP PARTITION (après archivage par lots si demandé)
+            PartitionService.drop_expired(db, policy.model, cutoff, policy.filters, empty_only=bool(self.archive_dir))
+
+            while deadline is None or time.monotonic() < deadline:
+                query = db.query(policy.model if self.archive_dir else primary_key).filter(
+                    time_column < cutoff, *policy.filters
+                )
+                rows = query.order_by(time_column).limit(self.chunk_size).all()
+                if not rows:
+                    break
+
+                if self.archive_dir:
+                    archive = archive or self._open_archive(table)
+                    self._archive(archive, rows)
+                    ids = [getattr(row, primary_key.key) for row in rows]
+                else:
+                    ids = [row[0] for row in rows]
+
+                # Borne sur la colonne datée : élagage des partitions
+                db.execute(delete(policy.model).where(primary_key.in_(ids), time_column < cutoff))
+                db.commit()
+                # Les objets archivés ne sont plus en base : ne pas les garder dans la session
+                db.expunge_all()
+                deleted += len(ids)
+
+                if len(ids) < self.chunk_size:
+                    break
+                time.sleep(self.chunk_pause)
+            else:
+                logger.info(f"⏱️  Rétention {table} interrompue (budget de {self.max_seconds}s), reprise plus tard")
+
+            if self.archive_dir:
+                PartitionService.drop_expired(db, policy.model, cutoff, empty_only=True)
+
+        except Exception as e:
+            db.rollback()
+            logger.error(f"❌ Erreur lors de la rétention de {table} : {e}")
+
+        finally:
+            if archive is not None:
+                archive.close()
+
+        if deleted > 0:
+            logger.info(f"🧹 {deleted} ligne(s) de {table} antérieures au {cutoff:%Y-%m-%d %H:%M} supprimées")
+
+        return deleted
+
+    def _cutoff(self, db: Session, policy: RetentionPolicy) -> datetime | None:
+        """Date limite de la règle, ramenée avant la fenêtre encore recalculée par les rollups"""
+        cutoff = datetime.now(UTC).replace(tzinfo=None) - timedelta(days=policy.keep_days)
+        if not policy.requires_rollups:
+            return cutoff
+
+        if rollup_service.compacted_until is None:
+            rollup_service.compact(db)
+        if rollup_service.compacted_until is None:
+            return None
+
+        return min(cutoff, rollup_service.compacted_until - timedelta(hours=ROLLUP_LOOKBACK_HOURS))
+
+    def _open_archive(self, table: str) -> gzip.GzipFile:
+        """Nouveau fichier d'archive pour une table (jamais réécrit)"""
+        directory = self.archive_dir / table
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{table}-{datetime.now(UTC):%Y%m%dT%H%M%S}.jsonl.gz"
+        logger.info(f"📦 Archivage des lignes expirées dans {path}")
+        return gzip.GzipFile(path, mode="xb")
+
+    @staticmethod
+    def _archive(archive: gzip.GzipFile, rows: list[Any]):
+        """Écrire un lot dans l'archive et le pousser jusqu'au disque"""
+        for row in rows:
+            values = {attr.key: getattr(row, attr.key) for attr in row.__mapper__.column_attrs}
+            archive.write(json.dumps(values, default=_json_default, ensure_ascii=False).encode() + b"\n")
+
+        archive.flush(zlib.Z_SYNC_FLUSH)
+        os.fsync(archive.fileobj.fileno())
+
+
+# Instance globale du service de rétention
+retention_service = RetentionService(
+    policies=[
+        RetentionPolicy(
+            model=PlaybackSession,
+            time_column="start_time",
+            keep_days=settings.RETENTION_PLAYBACK_SESSIONS_DAYS,
+            filters=(PlaybackSession.is_active == False,),
+            requires_rollups=True,
+        ),
+        RetentionPolicy(
+            model=ServerMetric,
+            time_column="recorded_at",
+            keep_days=settings.RETENTION_SERVER_METRICS_DAYS,
+        ),
+        RetentionPolicy(
+            model=ServerMetricMinute,
+            time_column="period_start",
+            keep_days=settings.METRICS_MINUTE_RETENTION_DAYS,
+        ),
+        RetentionPolicy(
+            model=ServerMetricHour,
+            time_column="period_start",
+            keep_days=settings.METRICS_HOUR_RETENTION_DAYS,
+        ),
+    ],
+    chunk_size=settings.RETENTION_CHUNK_SIZE,
+    chunk_pause_ms=settings.RETENTION_CHUNK_PAUSE_MS,
+    max_seconds=settings.RETENTION_MAX_SECONDS,
+    archive_dir=settings.RETENTION_ARCHIVE_DIR if settings.RETENTION_ARCHIVE_ENABLED else None,
+)
@@ -0,0 +1,332 @@
+"""
+Rollups temporels des sessions de lecture : heure, jour, semaine, mois
+"""
+
+import logging
+import threading
+from collections import defaultdict
+from collections.abc import Callable
+from datetime import UTC, date, datetime, time, timedelta
+from typing import Any
+
+from sqlalchemy import and_, delete, func, insert, or_
+from sqlalchemy.orm import Session
+
+from app.models.models import (
+    DailyPlaybackRollup,
+    HourlyPlaybackRollup,
+    MonthlyPlaybackRollup,
+    PlaybackSession,
+    WeeklyPlaybackRollup,
+)
+from app.services.analytics_service import AnalyticsService
+from app.services.bulk_upsert import UPSERT_CHUNK_SIZE, iter_batches
+
+logger = logging.getLogger(__name__)
+
+# Fenêtre recalculée à chaque compaction. Une session compte dans l'heure de son début, mais son
+# watched_seconds n'est connu qu'au Stop, au plus tard au nettoyage des sessions orphelines (24h).
+ROLLUP_LOOKBACK_HOURS = 48
+
+# Dimensions communes à tous les niveaux
+DIMENSIONS = ("device_type", "media_type", "playback_method")
+
+
+def _day_start(day: date) -> datetime:
+    return datetime.combine(day, time.min)
+
+
+def _week_start(day: date) -> date:
+    return day - timedelta(days=day.weekday())
+
+
+def _next_month(day: date) -> date:
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+class RollupService:
+    """
+    Agrégats hiérarchiques des sessions de lecture, compactés par le scheduler analytics
+
+    compact() recalcule les heures récentes depuis playback_sessions, puis les jours touchés
+    depuis les heures, et les semaines et mois touchés depuis les jours. Chaque niveau est
+    remplacé (DELETE puis INSERT) sur la période recalculée : la compaction est idempotente.
+
+    Les lectures (totals_by, totals_by_hour) découpent la période demandée sur le niveau le plus
+    grossier qui la couvre exactement ; ce qui suit compacted_until est lu dans playback_sessions.
+    Suppose un seul process applicatif, comme l'index des sessions actives.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # Les rollups sont à jour pour toutes les sessions commencées avant cette heure (UTC)
+        self.compacted_until: datetime | None = None
+
+    def compact(self, db: Session, since: datetime | None = None, until: datetime | None = None) -> dict[str, int]:
+        """
+        Recalculer les rollups des sessions commencées entre since et until
+
+        Args:
+            db: Session SQLAlchemy
+            since: Début (par défaut : ROLLUP_LOOKBACK_HOURS avant until ; au premier passage sur
+                des rollups vides, la première session en base)
+            until: Fin exclue (par défaut : début de l'heure courante, UTC)
+
+        Returns:
+            Nombre de lignes écrites par niveau
+        """
+        with self._lock:
+            try:
+                until = until or datetime.now(UTC).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+                if since is None:
+                    since = self._default_since(db, until)
+                since = since.replace(minute=0, second=0, microsecond=0)
+
+                first_day = since.date()
+                last_day = (until - timedelta(microseconds=1)).date()
+
+                written = {
+                    "hourly": self._rollup_hours(db, since, until),
+                    "daily": self._rollup(
+                        db,
+                        HourlyPlaybackRollup,
+                        DailyPlaybackRollup,
+                        first_day,
+                        last_day + timedelta(days=1),
+                        lambda period: period.date(),
+                    ),
+                    "weekly": self._rollup(
+                        db,
+                        DailyPlaybackRollup,
+                        WeeklyPlaybackRollup,
+                        _week_start(first_day),
+                        _week_start(last_day) + timedelta(days=7),
+                        _week_start,
+                    ),
+                    "monthly": self._rollup(
+                        db,
+                        DailyPlaybackRollup,
+                        MonthlyPlaybackRollup,
+                        first_day.replace(day=1),
+                        _next_month(last_day),
+                        lambda period: period.replace(day=1),
+                    ),
+                }
+                db.commit()
+
+                if self.compacted_until is None or until > self.compacted_until:
+                    self.compacted_until = until
+
+                logger.info(f"📊 Rollups compactés ({since} → {until}) : {written}")
+                return written
+
+            except Exception as e:
+                db.rollback()
+                logger.error(f"❌ Erreur lors de la compaction des rollups : {e}")
+                return {}
+
+    def totals_by(self, db: Session, dimension: str, start: date, end: date) -> dict[Any, tuple[int, int]]:
+        """
+        Sessions et temps regardé par valeur d'une dimension, du jour start au jour end inclus
+
+        Args:
+            db: Session SQLAlchemy
+            dimension: 'device_type', 'media_type' ou 'playback_method'
+            start: Premier jour
+            end: Dernier jour (inclus)
+
+        Returns:
+            {valeur: (sessions, secondes regardées)}
+        """
+        totals: dict[Any, list[int]] = defaultdict(lambda: [0, 0])
+        end_exclusive = end + timedelta(days=1)
+        rollup_end = self._rollup_end(start, end_exclusive)
+
+        for model, ranges in self._cover(start, rollup_end).items():
+            column = getattr(model, dimension)
+            rows = (
+                db.query(column, func.sum(model.plays), func.sum(model.watched_seconds))
+                .filter(or_(*(and_(model.period_start >= lo, model.period_start < hi) for lo, hi in ranges)))
+                .group_by(column)
+            )
+            for value, plays, watched in rows:
+                totals[value][0] += int(plays)
+                totals[value][1] += int(watched)
+
+        # Jours pas encore compactés : lecture directe, sur quelques heures au plus
+        if rollup_end < end_exclusive:
+            column = getattr(PlaybackSession, dimension)
+            rows = (
+                db.query(
+                    column, func.count(PlaybackSession.id), func.coalesce(func.sum(PlaybackSession.watched_seconds), 0)
+                )
+                .filter(*AnalyticsService.day_range(rollup_end, end))
+                .group_by(column)
+            )
+            for value, plays, watched in rows:
+                totals[value][0] += int(plays)
+                totals[value][1] += int(watched)
+
+        return {value: (plays, watched) for value, (plays, watched) in totals.items()}
+
+    def totals_by_hour(self, db: Session, start: date, end: date) -> dict[int, tuple[int, int]]:
+        """
+        Sessions et temps regardé par heure de la journée (0-23, UTC), du jour start au jour end inclus
+
+        Returns:
+            {heure: (sessions, secondes regardées)}
+        """
+        totals: dict[int, list[int]] = defaultdict(lambda: [0, 0])
+        end_exclusive = end + timedelta(days=1)
+        rollup_end = self._rollup_end(start, end_exclusive)
+
+        sources = [
+            (
+                HourlyPlaybackRollup.period_start,
+                func.sum(HourlyPlaybackRollup.plays),
+                func.sum(HourlyPlaybackRollup.watched_seconds),
+                start,
+                rollup_end,
+            ),
+            (
+                PlaybackSession.start_time,
+                func.count(PlaybackSession.id),
+                func.coalesce(func.sum(PlaybackSession.watched_seconds), 0),
+                rollup_end,
+                end_exclusive,
+            ),
+        ]
+
+        for period, plays_expr, watched_expr, lo, hi in sources:
+            if lo >= hi:
+                continue
+            hour = func.hour(period)
+            rows = (
+                db.query(hour, plays_expr, watched_expr)
+                .filter(period >= _day_start(lo), period < _day_start(hi))
+                .group_by(hour)
+            )
+            for value, plays, watched in rows:
+                totals[int(value)][0] += int(plays)
+                totals[int(value)][1] += int(watched)
+
+        return {hour: (plays, watched) for hour, (plays, watched) in totals.items()}
+
+    def _default_since(self, db: Session, until: datetime) -> datetime:
+        """Début de la compaction automatique (rattrapage complet si les rollups sont vides)"""
+        since = until - timedelta(hours=ROLLUP_LOOKBACK_HOURS)
+
+        if self.compacted_until is None and db.query(HourlyPlaybackRollup.period_start).first() is None:
+            first_session = db.query(func.min(PlaybackSession.start_time)).scalar()
+            if first_session is not None and first_session.replace(tzinfo=None) < since:
+                logger.info(f"📊 Rollups vides : rattrapage depuis {first_session}")
+                since = first_session.replace(tzinfo=None)
+
+        return since
+
+    def _rollup_end(self, start: date, end_exclusive: date) -> date:
+        """Fin (exclue) de la partie d'une période lisible dans les rollups"""
+        if self.compacted_until is None:
+            return start
+        return max(start, min(end_exclusive, self.compacted_until.date()))
+
+    @staticmethod
+    def _cover(start: date, end: date) -> dict[type, list[tuple[date, date]]]:
+        """
+        Découper [start, end) en mois entiers, semaines entières puis jours
+
+        Returns:
+            {modèle de rollup: [(début, fin exclue), ...]} (plages contiguës fusionnées)
+        """
+        cover: dict[type, list[tuple[date, date]]] = defaultdict(list)
+
+        day = start
+        while day < end:
+            if day.day == 1 and _next_month(day) <= end:
+                model, next_day = MonthlyPlaybackRollup, _next_month(day)
+            elif day.weekday() == 0 and day + timedelta(days=7) <= end:
+                model, next_day = WeeklyPlaybackRollup, day + timedelta(days=7)
+            else:
+                model, next_day = DailyPlaybackRollup, day + timedelta(days=1)
+
+            ranges = cover[model]
+            if ranges and ranges[-1][1] == day:
+                ranges[-1] = (ranges[-1][0], next_day)
+            else:
+                ranges.append((day, next_day))
+            day = next_day
+
+        return cover
+
+    def _rollup_hours(self, db: Session, since: datetime, until: datetime) -> int:
+        """Niveau horaire, depuis playback_sessions (une requête GROUP BY)"""
+        hour = func.hour(PlaybackSession.start_time).label("hour")
+        dimensions = [getattr(PlaybackSession, dimension) for dimension in DIMENSIONS]
+
+        rows = (
+            db.query(
+                PlaybackSession.session_date,
+                hour,
+                *dimensions,
+                func.count(PlaybackSession.id).label("plays"),
+                func.coalesce(func.sum(PlaybackSession.watched_seconds), 0).label("watched_seconds"),
+            )
+            .filter(PlaybackSession.start_time >= since, PlaybackSession.start_time < until)
+            .group_by(PlaybackSession.session_date, hour, *dimensions)
+        )
+
+        values = [
+            {
+                "period_start": datetime.combine(row.session_date, time(int(row.hour))),
+                **{dimension: getattr(row, dimension) for dimension in DIMENSIONS},
+                "plays": row.plays,
+                "watched_seconds": int(row.watched_seconds),
+            }
+            for row in rows
+        ]
+        return self._replace(db, HourlyPlaybackRollup, since, until, values)
+
+    def _rollup(
+        self, db: Session, source: type, target: type, start: date, end: date, bucket: Callable[[Any], date]
+    ) -> int:
+        """Niveau target sur [start, end), par somme des lignes du niveau source"""
+        if source is HourlyPlaybackRollup:
+            source_start, source_end = _day_start(start), _day_start(end)
+        else:
+            source_start, source_end = start, end
+
+        rows = db.query(
+            source.period_start,
+            *(getattr(source, dimension) for dimension in DIMENSIONS),
+            source.plays,
+            source.watched_seconds,
+        ).filter(source.period_start >= source_start, source.period_start < source_end)
+
+        totals: dict[tuple, list[int]] = defaultdict(lambda: [0, 0])
+        for row in rows:
+            key = (bucket(row.period_start), *(getattr(row, dimension) for dimension in DIMENSIONS))
+            totals[key][0] += row.plays
+            totals[key][1] += row.watched_seconds
+
+        values = [
+            {
+                "period_start": key[0],
+                **dict(zip(DIMENSIONS, key[1:], strict=True)),
+                "plays": plays,
+                "watched_seconds": watched,
+            }
+            for key, (plays, watched) in totals.items()
+        ]
+        return self._replace(db, target, start, end, values)
+
+    @staticmethod
+    def _replace(db: Session, model: type, start: Any, end: Any, values: list[dict[str, Any]]) -> int:
+        """Remplacer les lignes d'un niveau sur [start, end) (ne commit pas)"""
+        db.execute(delete(model).where(model.period_start >= start, model.period_start < end))
+        for chunk in iter_batches(values, UPSERT_CHUNK_SIZE):
+            db.execute(insert(model), chunk)
+        return len(values)
+
+
+# Instance globale du service de rollups
+rollup_service = RollupService()
@@ -1,6 +1,8 @@
 from datetime import UTC, datetime, timedelta
 from typing import Any
 
+import httpx
+
 from app.services.base_connector import BaseConnector
 
 
@@ -20,10 +22,14 @@ class SonarrConnector(BaseConnector):
         except Exception as e:
             return False, f"Erreur de connexion: {str(e)}"
 
-    async def get_series(self) -> list[dict[str, Any]]:
+    async def get_series(self, raise_errors: bool = False) -> list[dict[str, Any]]:
         """
         Récupérer toutes les séries
 
+        Args:
+            raise_errors: Propager l'erreur au lieu de retourner une liste vide (une
+                réconciliation ne doit pas prendre une panne pour une bibliothèque vide)
+
         Returns:
             Liste des séries avec leurs détails
         """
@@ -32,8 +38,34 @@ class SonarrConnector(BaseConnector):
             return series
         except Exception as e:
             print(f"❌ Erreur récupération séries Sonarr: {e}")
+            if raise_errors:
+                raise
             return []
 
+    async def get_series_by_id(self, series_id: int) -> dict[str, Any] | None:
+        """
+        Récupérer une série par son ID
+
+        Args:
+            series_id: ID Sonarr
+
+        Returns:
+            Détails de la série, ou None si elle a été supprimée (404)
+
+        Raises:
+            httpx.HTTPError: Toute autre erreur (réseau, 5xx...) : la série n'est pas considérée supprimée
+        """
+        try:
+            return await self._get(f"/api/v3/series/{series_id}")
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 404:
+                return None
+            print(f"❌ Erreur récupération série Sonarr {series_id}: {e}")
+            raise
+        except httpx.HTTPError as e:
+            print(f"❌ Erreur récupération série Sonarr {series_id}: {e}")
+            raise
+
     async def get_calendar(self, days_ahead: int = 30) -> list[dict[str, Any]]:
         """
         Récupérer le calendrier des épisodes à venir
@@ -56,18 +88,22 @@ class SonarrConnector(BaseConnector):
             print(f"❌ Erreur récupération calendrier Sonarr: {e}")
             return []
 
-    async def get_recent_additions(self, days: int = 7) -> list[dict[str, Any]]:
+    async def get_recent_additions(
+        self, days: int = 7, series: list[dict[str, Any]] | None = None
+    ) -> list[dict[str, Any]]:
         """
         Récupérer les séries récemment ajoutées
 
         Args:
             days: Nombre de jours en arrière
+            series: Liste déjà téléchargée (ex: depuis le snapshot du run), sinon récupérée via l'API
 
         Returns:
             Liste des séries récemment ajoutées
         """
         try:
-            series = await self.get_series()
+            if series is None:
+                series = await self.get_series()
 
             # Filtrer par date d'ajout
             cutoff_date = datetime.now(UTC) - timedelta(days=days)
@@ -129,9 +165,21 @@ class SonarrConnector(BaseConnector):
             Dictionnaire associant les IDs de séries aux hash de torrents
         """
         history = await self.get_history(page_size=200)
+        return self.build_hash_map(history)
+
+    def build_hash_map(self, records: list[dict[str, Any]]) -> dict[int, str]:
+        """
+        Créer une map {seriesId: torrent_hash} depuis des enregistrements d'historique ou de queue
+
+        Args:
+            records: Enregistrements portant un seriesId et un downloadId
+
+        Returns:
+            Dictionnaire associant les IDs de séries aux hash de torrents
+        """
         series_hash_map = {}
 
-        for record in history:
+        for record in records:
             series_id = record.get("seriesId")
             download_id = record.get("downloadId", "")
 
@@ -143,6 +191,56 @@ class SonarrConnector(BaseConnector):
 
         return series_hash_map
 
+    async def get_history_since(self, since: str) -> list[dict[str, Any]]:
+        """
+        Récupérer l'historique depuis une date (tous types d'événements)
+
+        Args:
+            since: Date ISO 8601 (high-water mark de la dernière synchro)
+
+        Returns:
+            Enregistrements d'historique, du plus ancien au plus récent
+        """
+        try:
+            records = await self._get("/api/v3/history/since", params={"date": since})
+            return sorted(records, key=lambda r: r.get("date", ""))
+        except Exception as e:
+            print(f"❌ Erreur récupération historique Sonarr depuis {since}: {e}")
+            return []
+
+    async def get_latest_history_date(self) -> str | None:
+        """
+        Date du dernier événement d'historique (sert de high-water mark)
+
+        Returns:
+            Date ISO 8601 ou None si l'historique est vide
+        """
+        try:
+            params = {"pageSize": 1, "sortKey": "date", "sortDirection": "descending"}
+            response = await self._get("/api/v3/history", params=params)
+            records = response.get("records", [])
+            return records[0].get("date") if records else None
+        except Exception as e:
+            print(f"❌ Erreur récupération dernier événement Sonarr: {e}")
+            return None
+
+    async def get_queue(self, page_size: int = 200) -> list[dict[str, Any]]:
+        """
+        Récupérer la file de téléchargement
+
+        Args:
+            page_size: Nombre d'enregistrements à récupérer
+
+        Returns:
+            Enregistrements de la queue (avec downloadId)
+        """
+        try:
+            response = await self._get("/api/v3/queue", params={"pageSize": page_size})
+            return response.get("records", [])
+        except Exception as e:
+            print(f"❌ Erreur récupération queue Sonarr: {e}")
+            return []
+
     def _extract_hash(self, download_id: str) -> str | None:
         """
         Extraire le hash du torrent depuis le downloadId
@@ -168,15 +266,19 @@ class SonarrConnector(BaseConnector):
 
         return None
 
-    async def get_statistics(self) -> dict[str, Any]:
+    async def get_statistics(self, series: list[dict[str, Any]] | None = None) -> dict[str, Any]:
         """
         Récupérer les statistiques Sonarr
 
+        Args:
+            series: Liste déjà téléchargée (ex: depuis le snapshot du run), sinon récupérée via l'API
+
         Returns:
             Statistiques (séries, épisodes, etc.)
         """
         try:
-            series = await self.get_series()
+            if series is None:
+                series = await self.get_series()
 
             total_series = len(series)
             monitored_series = sum(1 for s in series if s.get("monitored"))
@@ -8,7 +8,8 @@ from datetime import datetime
 from sqlalchemy.orm import Session
 
 from app.models.models import LibraryItem, ServiceConfiguration
-from app.services.connector_factory import create_connector
+from app.services.bulk_upsert import UPSERT_CHUNK_SIZE, iter_batches
+from app.services.connector_registry import connector_registry
 
 logger = logging.getLogger(__name__)
 
@@ -33,7 +34,7 @@ class TorrentEnrichmentService:
                 logger.error("❌ Service qBittorrent non configuré")
                 return None
 
-            self.qbt_connector = create_connector(qbt_service)
+            self.qbt_connector = connector_registry.get(qbt_service)
 
         return self.qbt_connector
 
@@ -80,6 +81,112 @@ class TorrentEnrichmentService:
             self.db.rollback()
             return False
 
+    async def enrich_items(self, items: list[tuple[str, str]]) -> dict:
+        """
+        Enrichit un lot d'items en quelques requêtes qBittorrent et une seule écriture
+
+        Les hash sont résolus par lots via get_torrents_info, puis torrent_info est écrit
+        en un bulk update et un seul commit.
+
+        Args:
+            items: Couples (id, torrent_hash) des items à enrichir
+
+        Returns:
+            Statistiques de l'enrichissement
+        """
+        stats = {"total": len(items), "success": 0, "failed": 0, "skipped": 0}
+        if not items:
+            return stats
+
+        connector = await self._get_qbt_connector()
+        if not connector:
+            stats["skipped"] = len(items)
+            return stats
+
+        torrents = await connector.get_torrents_info([torrent_hash for _, torrent_hash in items])
+
+        now = datetime.utcnow()
+        mappings = []
+        for item_id, torrent_hash in items:
+            torrent_info = torrents.get(torrent_hash.upper())
+            if torrent_info:
+                mappings.append({"id": item_id, "torrent_info": torrent_info, "updated_at": now})
+            else:
+                stats["failed"] += 1
+
+        try:
+            self.db.bulk_update_mappings(LibraryItem, mappings)
+            self.db.commit()
+            stats["success"] = len(mappings)
+        except Exception as e:
+            logger.error(f"❌ Erreur lors de l'écriture des infos torrents : {e}")
+            self.db.rollback()
+            stats["failed"] += len(mappings)
+
+        return stats
+
+    async def enrich_changed_items(self) -> dict:
+        """
+        Enrichit uniquement les items dont le torrent a changé
+
+        Le miroir maindata du connecteur donne les hash dont le ratio, l'état ou la progression
+        ont changé depuis le dernier appel. Seuls ces items (et ceux jamais enrichis) sont relus,
+        et torrent_info n'est réécrit que si la valeur formatée diffère de celle en base.
+
+        Returns:
+            Statistiques de l'enrichissement
+        """
+        stats = {"total": 0, "success": 0, "unchanged": 0, "failed": 0}
+
+        connector = await self._get_qbt_connector()
+        if not connector or not await connector.tracker.refresh():
+            logger.error("❌ Miroir qBittorrent indisponible, enrichissement reporté")
+            return {**stats, "error": "qBittorrent indisponible"}
+
+        changed = connector.tracker.drain_changes()
+
+        try:
+            # Items jamais enrichis + items dont le torrent a changé
+            candidates = list(
+                self.db.query(LibraryItem.id, LibraryItem.torrent_hash, LibraryItem.torrent_info).filter(
+                    LibraryItem.torrent_hash.isnot(None),
+                    LibraryItem.torrent_hash != "",
+                    LibraryItem.torrent_info.is_(None),
+                )
+            )
+            for batch in iter_batches(sorted(changed), UPSERT_CHUNK_SIZE):
+                candidates += self.db.query(LibraryItem.id, LibraryItem.torrent_hash, LibraryItem.torrent_info).filter(
+                    LibraryItem.torrent_hash.in_(batch), LibraryItem.torrent_info.isnot(None)
+                )
+
+            now = datetime.utcnow()
+            mappings = []
+            for item_id, torrent_hash, current_info in candidates:
+                torrent_info = connector.get_tracked_torrent_info(torrent_hash)
+                if not torrent_info:
+                    stats["failed"] += 1
+                    continue
+
+                if torrent_info == current_info:
+                    stats["unchanged"] += 1
+                    continue
+
+                mappings.append({"id": item_id, "torrent_info": torrent_info, "updated_at": now})
+
+            self.db.bulk_update_mappings(LibraryItem, mappings)
+            self.db.commit()
+
+            stats["total"] = len(candidates)
+            stats["success"] = len(mappings)
+            logger.info(f"✅ Enrichissement incrémental : {stats} ({len(changed)} torrents modifiés)")
+            return stats
+
+        except Exception as e:
+            logger.error(f"❌ Erreur lors de l'enrichissement incrémental : {e}")
+            self.db.rollback()
+            connector.tracker.requeue_changes(changed)
+            return {**stats, "error": str(e)}
+
     async def enrich_all_items(self, limit: int | None = None) -> dict:
         """
         Enrichit tous les items qui ont un torrent_hash
@@ -91,26 +198,19 @@ class TorrentEnrichmentService:
             Statistiques de l'enrichissement
         """
         try:
-            # Récupérer les items avec un torrent_hash
-            query = self.db.query(LibraryItem).filter(
+            # Récupérer les items avec un torrent_hash (id + hash seulement)
+            query = self.db.query(LibraryItem.id, LibraryItem.torrent_hash).filter(
                 LibraryItem.torrent_hash.isnot(None), LibraryItem.torrent_hash != ""
             )
 
             if limit:
                 query = query.limit(limit)
 
-            items = query.all()
+            items = [tuple(row) for row in query.all()]
 
             logger.info(f"📊 {len(items)} items à enrichir")
 
-            stats = {"total": len(items), "success": 0, "failed": 0, "skipped": 0}
-
-            for item in items:
-                success = await self.enrich_item(item)
-                if success:
-                    stats["success"] += 1
-                else:
-                    stats["failed"] += 1
+            stats = await self.enrich_items(items)
 
             logger.info(f"✅ Enrichissement terminé : {stats}")
 
@@ -119,10 +219,6 @@ class TorrentEnrichmentService:
         except Exception as e:
             logger.error(f"❌ Erreur lors de l'enrichissement global : {e}")
             return {"total": 0, "success": 0, "failed": 0, "error": str(e)}
-        finally:
-            # Fermer le connector
-            if self.qbt_connector:
-                await self.qbt_connector.close()
 
     async def enrich_recent_items(self, days: int = 7) -> dict:
         """
@@ -139,8 +235,8 @@ class TorrentEnrichmentService:
 
             cutoff_date = datetime.utcnow() - timedelta(days=days)
 
-            items = (
-                self.db.query(LibraryItem)
+            rows = (
+                self.db.query(LibraryItem.id, LibraryItem.torrent_hash)
                 .filter(
                     LibraryItem.torrent_hash.isnot(None),
                     LibraryItem.torrent_hash != "",
@@ -148,17 +244,11 @@ class TorrentEnrichmentService:
                 )
                 .all()
             )
+            items = [tuple(row) for row in rows]
 
             logger.info(f"📊 {len(items)} items récents à enrichir")
 
-            stats = {"total": len(items), "success": 0, "failed": 0}
-
-            for item in items:
-                success = await self.enrich_item(item)
-                if success:
-                    stats["success"] += 1
-                else:
-                    stats["failed"] += 1
+            stats = await self.enrich_items(items)
 
             logger.info(f"✅ Enrichissement des items récents terminé : {stats}")
 
@@ -167,6 +257,3 @@ class TorrentEnrichmentService:
         except Exception as e:
             logger.error(f"❌ Erreur lors de l'enrichissement des items récents : {e}")
             return {"total": 0, "success": 0, "failed": 0, "error": str(e)}
-        finally:
-            if self.qbt_connector:
-                await self.qbt_connector.close()
@@ -0,0 +1,120 @@
+"""
+Miroir en mémoire de l'état des torrents qBittorrent, tenu à jour par /api/v2/sync/maindata
+"""
+
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# Champs dont le changement justifie une réécriture de LibraryItem.torrent_info
+TRACKED_FIELDS = ("ratio", "state", "progress")
+
+
+class TorrentStateTracker:
+    """
+    Miroir de tous les torrents qBittorrent
+
+    Le premier appel à sync/maindata (rid=0) renvoie l'état complet, les suivants seulement
+    les champs modifiés depuis le dernier rid : un tick sans changement ne coûte que quelques
+    octets au lieu de la liste complète des torrents.
+    """
+
+    def __init__(self, fetch_maindata: Callable[[int], Awaitable[dict[str, Any] | None]]):
+        """
+        Args:
+            fetch_maindata: Appel à /api/v2/sync/maindata pour un rid (None en cas d'erreur)
+        """
+        self._fetch_maindata = fetch_maindata
+        self.rid = 0
+        # hash en majuscules (format DB) -> données brutes qBittorrent
+        self.torrents: dict[str, dict[str, Any]] = {}
+        self.synced_at: float | None = None
+        # Hash dont un TRACKED_FIELDS a changé, en attente de consommation (voir drain_changes)
+        self._changed: set[str] = set()
+        self._lock = asyncio.Lock()
+
+    @property
+    def synced(self) -> bool:
+        """Le miroir a été synchronisé au moins une fois"""
+        return self.synced_at is not None
+
+    def get(self, torrent_hash: str) -> dict[str, Any] | None:
+        """Données brutes d'un torrent depuis le miroir"""
+        return self.torrents.get(torrent_hash.upper())
+
+    async def refresh(self, max_age: float = 0) -> bool:
+        """
+        Appliquer le delta maindata depuis le dernier rid
+
+        Les appelants concurrents partagent le même rafraîchissement.
+
+        Args:
+            max_age: Ne rien faire si le miroir a été rafraîchi il y a moins de max_age secondes
+
+        Returns:
+            True si le miroir est utilisable
+        """
+        async with self._lock:
+            if self.synced and time.monotonic() - self.synced_at < max_age:
+                return True
+
+            data = await self._fetch_maindata(self.rid)
+            if data is None:
+                # qBittorrent injoignable : le miroir existant reste servi s'il y en a un
+                return self.synced
+
+            self._apply(data)
+            return True
+
+    def drain_changes(self) -> set[str]:
+        """Récupérer (et vider) les hash modifiés depuis le dernier appel"""
+        changed, self._changed = self._changed, set()
+        return changed
+
+    def requeue_changes(self, hashes: set[str]):
+        """Remettre des changements en attente (écriture en DB échouée)"""
+        self._changed |= hashes
+
+    @staticmethod
+    def _tracked(torrent: dict[str, Any] | None) -> tuple | None:
+        """Valeurs des champs suivis d'un torrent"""
+        if torrent is None:
+            return None
+        return tuple(torrent.get(field) for field in TRACKED_FIELDS)
+
+    def _apply(self, data: dict[str, Any]):
+        """Appliquer une réponse maindata (état complet ou delta) au miroir"""
+        torrents = data.get("torrents", {})
+
+        if data.get("full_update"):
+            previous = self.torrents
+            self.torrents = {
+                torrent_hash.upper(): {**torrent, "hash": torrent_hash} for torrent_hash, torrent in torrents.items()
+            }
+            for key in previous.keys() | self.torrents.keys():
+                if self._tracked(previous.get(key)) != self._tracked(self.torrents.get(key)):
+                    self._changed.add(key)
+        else:
+            for torrent_hash, delta in torrents.items():
+                key = torrent_hash.upper()
+                current = self.torrents.setdefault(key, {"hash": torrent_hash})
+                before = self._tracked(current)
+                current.update(delta)
+                if self._tracked(current) != before:
+                    self._changed.add(key)
+
+            for torrent_hash in data.get("torrents_removed", []):
+                if self.torrents.pop(torrent_hash.upper(), None) is not None:
+                    self._changed.add(torrent_hash.upper())
+
+        self.rid = data.get("rid", self.rid)
+        self.synced_at = time.monotonic()
+
+        logger.info(
+            f"🔄 maindata rid={self.rid} ({'complet' if data.get('full_update') else 'delta'}) : "
+            f"{len(torrents)} torrents reçus, {len(self.torrents)} suivis"
+        )
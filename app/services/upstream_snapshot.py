@@ -0,0 +1,79 @@
+"""
+Snapshot des collections upstream partagé pendant un run de synchronisation
+"""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+
+class UpstreamSnapshot:
+    """
+    Cache des réponses upstream pour la durée d'un run de synchronisation
+
+    Chaque collection (ex: /api/v3/movie) est téléchargée et parsée une seule fois, puis
+    partagée entre tous les consommateurs du run. Les appels concurrents sur une même clé
+    attendent le même téléchargement en cours au lieu d'en lancer un second.
+    """
+
+    def __init__(self):
+        self._entries: dict[str, asyncio.Future] = {}
+        self._hits: dict[str, int] = {}
+
+    async def fetch(self, key: str, loader: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Récupérer une collection depuis le snapshot (ou la télécharger au premier accès)
+
+        Args:
+            key: Clé de la collection (ex: 'http://radarr:7878/api/v3/movie')
+            loader: Coroutine de téléchargement, appelée uniquement au premier accès
+
+        Returns:
+            Collection parsée, partagée entre les consommateurs (ne pas la modifier)
+        """
+        entry = self._entries.get(key)
+
+        if entry is None:
+            entry = asyncio.ensure_future(loader())
+            self._entries[key] = entry
+            self._hits[key] = 0
+        else:
+            self._hits[key] += 1
+
+        # shield : l'annulation d'un consommateur ne doit pas annuler le téléchargement partagé
+        return await asyncio.shield(entry)
+
+    def peek(self, key: str) -> Any | None:
+        """
+        Récupérer une collection uniquement si elle a déjà été téléchargée pendant le run
+
+        Returns:
+            Collection parsée, ou None si absente, en cours ou en erreur
+        """
+        entry = self._entries.get(key)
+        if entry is None or not entry.done() or entry.cancelled() or entry.exception() is not None:
+            return None
+
+        self._hits[key] += 1
+        return entry.result()
+
+    def report(self) -> dict[str, Any]:
+        """
+        Rapport hits/misses du run
+
+        Returns:
+            Totaux et détail par collection (1 miss = 1 téléchargement)
+        """
+        collections = {}
+        for key, entry in self._entries.items():
+            size = None
+            if entry.done() and not entry.cancelled() and entry.exception() is None:
+                result = entry.result()
+                size = len(result) if isinstance(result, list | dict) else None
+            collections[key] = {"hits": self._hits[key], "misses": 1, "items": size}
+
+        return {
+            "hits": sum(self._hits.values()),
+            "misses": len(self._entries),
+            "collections": collections,
+        }
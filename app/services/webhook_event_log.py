@@ -0,0 +1,271 @@
+"""
+Journal append-only des webhooks de lecture acceptés, et rejeu vers la base
+"""
+
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+import zlib
+from collections.abc import Iterator
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.models import (
+    DailyAnalytic,
+    DailyMedia,
+    DailyPlaybackRollup,
+    DailyViewer,
+    DeviceStatistic,
+    HourlyPlaybackRollup,
+    MediaStatistic,
+    MediaViewer,
+    MonthlyPlaybackRollup,
+    PlaybackSession,
+    WeeklyPlaybackRollup,
+)
+from app.services.analytics_service import AnalyticsService
+from app.services.playback_webhook import apply_playback_batch
+from app.services.rollup_service import rollup_service
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookEventLog:
+    """
+    Journal des événements webhook, en segments gzip écrits séquentiellement
+
+    Une ligne JSON par événement accepté (celui retourné par parse_playback_event, avec son
+    received_at). Chaque démarrage ouvre un nouveau segment (events-00000001.jsonl.gz, ...), qui
+    tourne dès segment_bytes octets non compressés. flush() pousse les données compressées
+    jusqu'au fichier puis, avec fsync, jusqu'au disque : la file webhooks l'appelle avant
+    d'appliquer chaque lot en base, le journal est donc toujours en avance sur les tables, même
+    après une coupure de courant. Un segment interrompu par un crash reste lisible jusqu'au
+    dernier flush.
+
+    Sans fsync, un crash du processus ne perd rien, mais un crash de l'OS peut perdre des
+    événements déjà appliqués en base (données encore dans le cache de pages).
+    """
+
+    PREFIX = "events-"
+    SUFFIX = ".jsonl.gz"
+
+    def __init__(self, directory: str | Path, segment_bytes: int, fsync: bool = True):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.fsync = fsync
+        self._file: gzip.GzipFile | None = None
+        self._segment: Path | None = None
+        self._segment_written = 0
+        self._pending = 0
+
+        # Compteurs exposés par stats()
+        self.appended = 0
+        self.rotations = 0
+
+    def segments(self) -> list[Path]:
+        """Segments du journal, du plus ancien au plus récent"""
+        if not self.directory.is_dir():
+            return []
+        return sorted(self.directory.glob(f"{self.PREFIX}*{self.SUFFIX}"))
+
+    def append(self, event: dict[str, Any]):
+        """Ajouter un événement en fin de journal (visible sur disque au prochain flush)"""
+        if self._file is None or self._segment_written >= self.segment_bytes:
+            self._rotate()
+
+        line = json.dumps(event, ensure_ascii=False, separators=(",", ":")).encode() + b"\n"
+        self._file.write(line)
+        self._segment_written += len(line)
+        self._pending += 1
+        self.appended += 1
+
+    def flush(self):
+        """Écrire dans le segment les événements ajoutés depuis le dernier flush (fsync bloquant)"""
+        self._fsync(self._flush_buffers())
+
+    async def flush_async(self):
+        """Comme flush(), avec le fsync dans un thread : l'event loop n'attend pas le disque"""
+        fd = self._flush_buffers()
+        if fd is not None:
+            await asyncio.to_thread(self._fsync, fd)
+
+    def close(self):
+        """Fermer le segment courant (le prochain append en ouvre un nouveau)"""
+        if self._file is None:
+            return
+        fd = os.dup(self._file.fileobj.fileno()) if self.fsync else None
+        self._file.close()
+        self._fsync(fd)
+        self._file = None
+        self._pending = 0
+
+    def _flush_buffers(self) -> int | None:
+        """
+        Pousser les données compressées jusqu'au fichier
+
+        Returns:
+            Copie du descripteur du segment à passer à _fsync (None si rien à écrire ou sans
+            fsync) : une rotation pendant le fsync ne ferme pas le descripteur synchronisé
+        """
+        if self._file is None or not self._pending:
+            return None
+        self._file.flush(zlib.Z_SYNC_FLUSH)
+        self._pending = 0
+        return os.dup(self._file.fileobj.fileno()) if self.fsync else None
+
+    @staticmethod
+    def _fsync(fd: int | None):
+        """Attendre que le segment soit sur disque, puis fermer la copie du descripteur"""
+        if fd is None:
+            return
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def stats(self) -> dict[str, Any]:
+        """Segment courant et nombre d'événements journalisés"""
+        return {
+            "directory": str(self.directory),
+            "segment": self._segment.name if self._segment else None,
+            "segment_bytes": self._segment_written,
+            "appended": self.appended,
+            "rotations": self.rotations,
+        }
+
+    def _rotate(self):
+        """Fermer le segment courant et ouvrir le suivant"""
+        if self._file is not None:
+            self.close()
+            self.rotations += 1
+
+        self.directory.mkdir(parents=True, exist_ok=True)
+        segments = self.segments()
+        last_number = int(segments[-1].name[len(self.PREFIX) : -len(self.SUFFIX)]) if segments else 0
+
+        self._segment = self.directory / f"{self.PREFIX}{last_number + 1:08d}{self.SUFFIX}"
+        # "xb" : un segment existant n'est jamais réécrit
+        self._file = gzip.GzipFile(self._segment, mode="xb")
+        self._segment_written = 0
+        logger.info(f"📝 Nouveau segment du journal webhooks : {self._segment.name}")
+
+    def read(self) -> Iterator[dict[str, Any]]:
+        """
+        Relire tous les événements du journal, dans l'ordre d'écriture
+
+        Une fin de segment tronquée (crash avant close) est ignorée avec un avertissement.
+        """
+        for segment in self.segments():
+            # Le segment ouvert n'a pas encore de marqueur de fin : sa "troncature" est normale
+            is_open = segment == self._segment and self._file is not None
+            if is_open:
+                self.flush()
+
+            try:
+                with gzip.open(segment, "rb") as f:
+                    for line in f:
+                        try:
+                            yield json.loads(line)
+                        except json.JSONDecodeError:
+                            logger.warning(f"⚠️  Ligne illisible ignorée dans {segment.name}")
+            except (EOFError, gzip.BadGzipFile, zlib.error) as e:
+                if not is_open:
+                    logger.warning(f"⚠️  Segment {segment.name} tronqué, relu jusqu'au dernier flush : {e}")
+
+
+def _received_date(event: dict[str, Any]) -> date | None:
+    """Jour de réception d'un événement journalisé"""
+    received_at = event.get("received_at")
+    return datetime.fromisoformat(received_at).date() if received_at else None
+
+
+def replay_event_log(db: Session, event_log: WebhookEventLog, batch_size: int = 1000) -> dict[str, Any]:
+    """
+    Reconstruire playback_sessions et les tables d'agrégats depuis le journal
+
+    Vide playback_sessions, les tables d'agrégats et leurs ensembles "déjà vu", puis rejoue les
+    événements par lots de batch_size avec apply_playback_batch (une transaction par lot), sans
+    passer par HTTP ni par la file. Les device_statistics et les rollups temporels sont ensuite
+    recalculés sur la période rejouée.
+
+    L'application doit être arrêtée pendant le rejeu, et le journal doit couvrir tout
+    l'historique : les sessions antérieures au premier segment sont perdues.
+
+    Args:
+        db: Session SQLAlchemy
+        event_log: Journal à rejouer
+        batch_size: Nombre d'événements par transaction
+
+    Returns:
+        Bilan du rejeu (events, errors, batches, days, seconds)
+    """
+    start_time = time.perf_counter()
+
+    for model in (
+        HourlyPlaybackRollup,
+        DailyPlaybackRollup,
+        WeeklyPlaybackRollup,
+        MonthlyPlaybackRollup,
+        DeviceStatistic,
+        DailyAnalytic,
+        DailyViewer,
+        DailyMedia,
+        MediaStatistic,
+        MediaViewer,
+        PlaybackSession,
+    ):
+        db.query(model).delete(synchronize_session=False)
+    db.commit()
+    logger.info("🗑️  Tables analytics vidées, rejeu du journal webhooks...")
+
+    events = 0
+    errors = 0
+    batches = 0
+    days: set[date] = set()
+    batch: list[dict[str, Any]] = []
+
+    def apply_batch():
+        nonlocal errors, batches
+        results = apply_playback_batch(db, batch)
+        errors += sum(1 for result in results if result.get("status") == "error")
+        batches += 1
+        # Libérer les objets du lot : le rejeu ne doit pas accumuler tout l'historique en mémoire
+        db.expunge_all()
+        batch.clear()
+
+    for event in event_log.read():
+        batch.append(event)
+        events += 1
+        if event["event"] == "playback.start" and (day := _received_date(event)):
+            days.add(day)
+
+        if len(batch) >= batch_size:
+            apply_batch()
+            logger.info(f"🔁 {events} événements rejoués")
+
+    if batch:
+        apply_batch()
+
+    if days:
+        AnalyticsService.update_device_statistics(db, min(days), max(days))
+        rollup_service.compact(db, since=datetime.combine(min(days), datetime.min.time()))
+
+    seconds = round(time.perf_counter() - start_time, 2)
+    logger.info(f"✅ Rejeu terminé : {events} événements ({errors} en erreur) en {seconds}s")
+
+    return {"events": events, "errors": errors, "batches": batches, "days": len(days), "seconds": seconds}
+
+
+# Instance globale du journal
+webhook_event_log = WebhookEventLog(
+    directory=settings.WEBHOOK_EVENT_LOG_DIR,
+    segment_bytes=settings.WEBHOOK_EVENT_LOG_SEGMENT_MB * 1024 * 1024,
+    fsync=settings.WEBHOOK_EVENT_LOG_FSYNC,
+)
@@ -0,0 +1,216 @@
+"""
+File d'ingestion des webhooks de lecture, appliqués en base par micro-lots
+"""
+
+import asyncio
+import logging
+import time
+from typing import Any
+
+from app.core.config import settings
+from app.db import run_db
+from app.services.playback_webhook import apply_playback_batch
+from app.services.webhook_event_log import WebhookEventLog, webhook_event_log
+
+logger = logging.getLogger(__name__)
+
+# Marqueur de fin déposé par stop() derrière les derniers événements acceptés
+_STOP: dict[str, Any] = {}
+
+# Nouvelle tentative d'un lot dont la transaction a échoué (connexion perdue...) : backoff exponentiel
+RETRY_BACKOFF_INITIAL = 0.5
+RETRY_BACKOFF_MAX = 30.0
+# Pendant l'arrêt, le lot n'est retenté que quelques fois (le journal permet de le rejouer)
+STOP_RETRY_ATTEMPTS = 3
+
+
+class WebhookIngestQueue:
+    """
+    File bornée entre la route webhook et la base
+
+    La route valide le payload, dépose l'événement et répond 202 immédiatement. Une tâche
+    consommatrice unique (l'ordre de réception est conservé) vide la file par lots de
+    batch_size événements ou batch_window_ms millisecondes, et applique chaque lot en une
+    transaction. File pleine : submit() refuse l'événement (la route répond 429).
+
+    Un lot dont la transaction échoue en entier (base injoignable) est retenté avec un backoff
+    exponentiel : la file se remplit pendant ce temps et la route répond 429. stop() dépose un
+    marqueur derrière les derniers événements acceptés et attend que le consommateur les ait
+    tous appliqués, dans l'ordre.
+
+    Avec un event_log, chaque événement est journalisé avant d'être accepté, et le journal est
+    flushé avant l'application de chaque lot.
+    """
+
+    def __init__(self, capacity: int, batch_size: int, batch_window_ms: int, event_log: WebhookEventLog | None = None):
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.batch_window = batch_window_ms / 1000
+        self.event_log = event_log
+        self._queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue(maxsize=capacity)
+        self._consumer: asyncio.Task | None = None
+        self._stopping = False
+
+        # Compteurs exposés par stats()
+        self.accepted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.retries = 0
+        self.batches = 0
+        self.last_batch_size = 0
+        self.last_batch_ms = 0
+
+    @property
+    def running(self) -> bool:
+        """La tâche consommatrice tourne"""
+        return self._consumer is not None and not self._consumer.done()
+
+    def submit(self, event: dict[str, Any]) -> bool:
+        """
+        Journaliser puis déposer un événement dans la file
+
+        Returns:
+            False si la file est pleine ou en cours d'arrêt (backpressure)
+
+        Raises:
+            OSError: Échec d'écriture dans le journal : l'événement n'est pas accepté
+        """
+        if self._stopping or self._queue.full():
+            self.rejected += 1
+            return False
+
+        # Journal d'abord : un événement accepté est toujours rejouable
+        if self.event_log is not None:
+            self.event_log.append(event)
+
+        # Ne peut pas échouer : un seul event loop, place vérifiée ci-dessus
+        self._queue.put_nowait(event)
+        self.accepted += 1
+        return True
+
+    def start(self):
+        """Démarrer la tâche consommatrice (dans l'event loop de l'application)"""
+        if self.running:
+            return
+        self._stopping = False
+        self._consumer = asyncio.get_running_loop().create_task(self._consume())
+        print(f"📨 File webhooks démarrée (capacité {self.capacity}, lots de {self.batch_size})")
+
+    async def stop(self):
+        """Arrêter la consommation après avoir appliqué, dans l'ordre, tous les événements acceptés"""
+        if not self.running:
+            return
+
+        # Plus aucun événement accepté, puis marqueur de fin derrière les derniers (put : attend une place)
+        self._stopping = True
+        await self._queue.put(_STOP)
+        await self._consumer
+        self._consumer = None
+
+        if self.event_log is not None:
+            self.event_log.close()
+
+        print("📨 File webhooks arrêtée")
+
+    def stats(self) -> dict[str, Any]:
+        """Profondeur de la file et taille des lots (exposés dans /health)"""
+        return {
+            "running": self.running,
+            "depth": self._queue.qsize(),
+            "capacity": self.capacity,
+            "accepted": self.accepted,
+            "rejected": self.rejected,
+            "processed": self.processed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "batches": self.batches,
+            "last_batch_size": self.last_batch_size,
+            "last_batch_ms": self.last_batch_ms,
+            "avg_batch_size": round(self.processed / self.batches, 1) if self.batches else 0,
+            "event_log": self.event_log.stats() if self.event_log is not None else None,
+        }
+
+    async def _next_batch(self) -> tuple[list[dict[str, Any]], bool]:
+        """
+        Attendre un événement, puis compléter le lot jusqu'à batch_size ou batch_window
+
+        Returns:
+            (lot, marqueur de fin atteint) ; le lot partiel précédant le marqueur est retourné
+        """
+        loop = asyncio.get_running_loop()
+        first = await self._queue.get()
+        if first is _STOP:
+            return [], True
+
+        batch = [first]
+        deadline = loop.time() + self.batch_window
+
+        while len(batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                event = await asyncio.wait_for(self._queue.get(), timeout)
+            except TimeoutError:
+                break
+            if event is _STOP:
+                return batch, True
+            batch.append(event)
+
+        return batch, False
+
+    async def _consume(self):
+        """Boucle de consommation, jusqu'au marqueur de fin déposé par stop()"""
+        while True:
+            batch, stopped = await self._next_batch()
+            if batch:
+                await self._apply(batch)
+            if stopped:
+                return
+
+    async def _apply(self, batch: list[dict[str, Any]]):
+        """Appliquer un lot en une transaction, retentée tant que la transaction échoue en entier"""
+        start_time = time.perf_counter()
+        backoff = RETRY_BACKOFF_INITIAL
+        attempts = 0
+
+        while True:
+            attempts += 1
+            try:
+                if self.event_log is not None:
+                    await self.event_log.flush_async()
+                results = await run_db(apply_playback_batch, batch)
+                # Erreurs propres à un événement (savepoint annulé) : définitives, pas de nouvelle tentative
+                errors = sum(1 for result in results if result.get("status") == "error")
+                break
+            except Exception as e:
+                if self._stopping and attempts >= STOP_RETRY_ATTEMPTS:
+                    logger.error(
+                        f"❌ Lot de {len(batch)} webhooks abandonné à l'arrêt après {attempts} tentatives : {e} "
+                        "(événements conservés dans le journal, voir replay_webhook_events.py)"
+                    )
+                    errors = len(batch)
+                    break
+
+                self.retries += 1
+                logger.warning(
+                    f"⚠️  Échec du lot de {len(batch)} webhooks, nouvelle tentative dans {backoff:.1f}s : {e}"
+                )
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, RETRY_BACKOFF_MAX)
+
+        self.batches += 1
+        self.processed += len(batch) - errors
+        self.failed += errors
+        self.last_batch_size = len(batch)
+        self.last_batch_ms = int((time.perf_counter() - start_time) * 1000)
+
+
+# Instance globale de la file
+webhook_queue = WebhookIngestQueue(
+    capacity=settings.WEBHOOK_QUEUE_CAPACITY,
+    batch_size=settings.WEBHOOK_BATCH_SIZE,
+    batch_window_ms=settings.WEBHOOK_BATCH_WINDOW_MS,
+    event_log=webhook_event_log if settings.WEBHOOK_EVENT_LOG_ENABLED else None,
+)
@@ -0,0 +1,4 @@
+"""
+Benchmarks locaux : faux services upstream (Radarr, Sonarr, Jellyfin, Jellyseerr, qBittorrent)
+et scénarios mesurés contre une base de test
+"""
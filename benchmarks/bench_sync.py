@@ -0,0 +1,311 @@
+"""
+Benchmark de la synchronisation et de l'enrichissement torrents contre de faux services upstream
+
+Usage (depuis la racine du projet, configuration DB du .env) :
+    python -m benchmarks.bench_sync --size 10k
+    python -m benchmarks.bench_sync --size 1k --latency-ms 20 --jitter-ms 5 --error-rate 0.01 --json out.json
+
+La base --db-name (servarr_bench par défaut) est créée si besoin puis vidée : toutes les tables
+sont supprimées et recréées. Chaque phase rapporte la durée, le pic de RSS du processus, les
+requêtes reçues par les faux services et les requêtes SQL exécutées (app.core.query_profiler).
+
+Phases : sync_all FULL sur base vide, enrichissement torrents, évolution de la bibliothèque
+(--mutate-fraction), sync_all INCREMENTAL, enrichissement incrémental.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+import httpx
+import psutil
+
+from benchmarks.fake_upstreams import PRESETS, SERVICES, FakeUpstreamConfig, start_fake_upstreams
+
+# Intervalle d'échantillonnage du RSS pendant une phase (secondes)
+RSS_SAMPLE_INTERVAL = 0.02
+
+
+class PeakRssSampler:
+    """Pic de mémoire résidente du processus pendant une phase (thread d'échantillonnage)"""
+
+    def __init__(self):
+        self._process = psutil.Process()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self.peak = 0
+
+    def _sample(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, self._process.memory_info().rss)
+            self._stop.wait(RSS_SAMPLE_INTERVAL)
+
+    def start(self):
+        self.peak = self._process.memory_info().rss
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._sample, daemon=True, name="rss-sampler")
+        self._thread.start()
+
+    def stop(self) -> int:
+        """Arrêter l'échantillonnage et renvoyer le pic (octets)"""
+        self._stop.set()
+        self._thread.join()
+        return max(self.peak, self._process.memory_info().rss)
+
+
+@dataclass
+class PhaseResult:
+    """Mesures d'une phase du benchmark"""
+
+    name: str
+    wall_seconds: float
+    peak_rss_mb: float
+    upstream_requests: int
+    upstream_errors: int
+    sql_statements: int
+    sql_seconds: float
+    sql_rows: int
+    outcome: str
+    upstream_by_endpoint: dict[str, dict[str, int]] = field(default_factory=dict)
+    top_statements: list[tuple[int, str]] = field(default_factory=list)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark sync_all et enrichissement contre de faux upstreams")
+    parser.add_argument("--size", choices=sorted(PRESETS), default="1k", help="Taille des bibliothèques synthétiques")
+    parser.add_argument("--movies", type=int, help="Nombre de films Radarr (remplace --size)")
+    parser.add_argument("--series", type=int, help="Nombre de séries Sonarr (remplace --size)")
+    parser.add_argument("--requests", type=int, help="Nombre de requêtes Jellyseerr (remplace --size)")
+    parser.add_argument("--torrents", type=int, help="Nombre de torrents qBittorrent (remplace --size)")
+    parser.add_argument("--episodes-per-series", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Latence ajoutée à chaque requête upstream")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Écart type de la latence")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Part des requêtes upstream en erreur 500")
+    parser.add_argument("--mutate-fraction", type=float, default=0.01, help="Part modifiée avant la sync incrémentale")
+    parser.add_argument("--sequential", action="store_true", help="sync_all sans concurrence entre services")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db-name", default="servarr_bench", help="Base de benchmark (vidée à chaque run)")
+    parser.add_argument("--show-queries", action="store_true", help="Logger les requêtes SQL les plus fréquentes")
+    parser.add_argument("--json", dest="json_path", help="Écrire les résultats détaillés dans ce fichier")
+    return parser.parse_args()
+
+
+def build_config(args: argparse.Namespace) -> FakeUpstreamConfig:
+    sizes = {name: getattr(args, name) or default for name, default in PRESETS[args.size].items()}
+    return FakeUpstreamConfig(
+        **sizes,
+        episodes_per_series=args.episodes_per_series,
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    )
+
+
+def configure_environment(db_name: str, show_queries: bool = False):
+    """
+    Base de benchmark et profilage SQL, à appeler avant tout import de app (settings lus à l'import)
+
+    Args:
+        db_name: Base vidée à chaque run : doit contenir "bench"
+        show_queries: Logger les requêtes SQL les plus fréquentes de chaque phase
+    """
+    if "bench" not in db_name:
+        print(f"❌ --db-name doit contenir 'bench' (base vidée à chaque run) : {db_name}")
+        sys.exit(1)
+
+    os.environ["DB_NAME"] = db_name
+    os.environ["QUERY_PROFILING_ENABLED"] = "true"
+    os.environ["QUERY_PROFILING_SLOW_MS"] = "0" if show_queries else str(24 * 3600 * 1000)
+
+
+def prepare_database(db_name: str):
+    """Créer la base de benchmark si besoin et repartir de tables vides"""
+    from sqlalchemy import create_engine, text
+
+    from app.core.config import settings
+
+    server_url = settings.DATABASE_URL.rsplit("/", 1)[0] + "/"
+    server = create_engine(server_url)
+    with server.begin() as connection:
+        connection.execute(text(f"CREATE DATABASE IF NOT EXISTS `{db_name}` CHARACTER SET utf8mb4"))
+    server.dispose()
+
+    import app.models  # noqa: F401 (tables enregistrées dans Base.metadata)
+    from app.db import Base, engine, init_db
+
+    Base.metadata.drop_all(bind=engine)
+    init_db()
+
+
+def register_services(ports: dict[str, int]):
+    """Configurer chaque service vers son faux upstream"""
+    from app.db import SessionLocal
+    from app.models import ServiceConfiguration
+
+    with SessionLocal() as db:
+        for service in SERVICES:
+            db.add(
+                ServiceConfiguration(
+                    service_name=service,
+                    url="http://127.0.0.1",
+                    port=ports[service],
+                    api_key="bench",
+                    username="bench" if service == "qbittorrent" else None,
+                    password="bench" if service == "qbittorrent" else None,
+                    is_active=True,
+                )
+            )
+        db.commit()
+
+
+async def upstream_stats(client: httpx.AsyncClient, ports: dict[str, int]) -> dict[str, dict[str, Counter]]:
+    """Compteurs de requêtes et d'erreurs de chaque faux service"""
+    stats = {}
+    for service, port in ports.items():
+        response = await client.get(f"http://127.0.0.1:{port}/__bench/stats")
+        data = response.json()
+        stats[service] = {"requests": Counter(data["requests"]), "errors": Counter(data["errors"])}
+    return stats
+
+
+def _outcome(result: dict[str, Any]) -> str:
+    """Résumé d'un résultat de sync_all ou d'enrichissement"""
+    if "upstream_snapshot" in result:
+        failed = [name for name, value in result.items() if isinstance(value, dict) and value.get("success") is False]
+        return f"échecs : {', '.join(failed)}" if failed else "ok"
+    if result.get("error"):
+        return f"erreur : {result['error']}"
+    return ", ".join(f"{key}={value}" for key, value in result.items())
+
+
+async def measure(name: str, run, client: httpx.AsyncClient, ports: dict[str, int]) -> PhaseResult:
+    """Exécuter une phase et relever durée, pic de RSS, requêtes upstream et SQL"""
+    from app.core.query_profiler import profile
+
+    before = await upstream_stats(client, ports)
+    sampler = PeakRssSampler()
+    sampler.start()
+    started = time.perf_counter()
+
+    with profile(f"bench {name}") as query_profile:
+        result = await run()
+
+    wall_seconds = time.perf_counter() - started
+    peak_rss = sampler.stop()
+    after = await upstream_stats(client, ports)
+
+    by_endpoint = {}
+    requests = errors = 0
+    for service in SERVICES:
+        delta = after[service]["requests"] - before[service]["requests"]
+        requests += sum(delta.values())
+        errors += sum((after[service]["errors"] - before[service]["errors"]).values())
+        if delta:
+            by_endpoint[service] = dict(delta.most_common())
+
+    return PhaseResult(
+        name=name,
+        wall_seconds=round(wall_seconds, 3),
+        peak_rss_mb=round(peak_rss / 1024**2, 1),
+        upstream_requests=requests,
+        upstream_errors=errors,
+        sql_statements=query_profile.statements,
+        sql_seconds=round(query_profile.db_time, 3),
+        sql_rows=query_profile.rows,
+        outcome=_outcome(result),
+        upstream_by_endpoint=by_endpoint,
+        top_statements=[(count, key) for key, count in query_profile.fingerprints.most_common(5)],
+    )
+
+
+async def run_benchmark(args: argparse.Namespace, ports: dict[str, int]) -> list[PhaseResult]:
+    from app.db import SessionLocal
+    from app.models import SyncMode
+    from app.schedulers.sync_service import SyncService
+    from app.services.connector_registry import connector_registry
+    from app.services.torrent_enrichment_service import TorrentEnrichmentService
+
+    async def sync(mode: SyncMode) -> dict[str, Any]:
+        with SessionLocal() as db:
+            return await SyncService(db).sync_all(concurrent=not args.sequential, mode=mode)
+
+    async def enrich() -> dict[str, Any]:
+        with SessionLocal() as db:
+            return await TorrentEnrichmentService(db).enrich_changed_items()
+
+    results = []
+    async with httpx.AsyncClient(timeout=60) as client:
+        try:
+            results.append(await measure("sync_full", lambda: sync(SyncMode.FULL), client, ports))
+            results.append(await measure("enrichment", enrich, client, ports))
+
+            # Bibliothèque partagée par les cinq faux services : une mutation suffit
+            await client.post(
+                f"http://127.0.0.1:{ports['radarr']}/__bench/mutate", params={"fraction": args.mutate_fraction}
+            )
+
+            results.append(await measure("sync_incremental", lambda: sync(SyncMode.INCREMENTAL), client, ports))
+            results.append(await measure("enrichment_incremental", enrich, client, ports))
+        finally:
+            await connector_registry.close_all()
+
+    return results
+
+
+def print_report(config: FakeUpstreamConfig, results: list[PhaseResult]):
+    print("\n" + "=" * 100)
+    print(
+        f"📊 Benchmark sync : {config.movies} films, {config.series} séries, {config.requests} requêtes, "
+        f"{config.torrents} torrents (latence {config.latency_ms}±{config.jitter_ms} ms, "
+        f"erreurs {config.error_rate:.1%})"
+    )
+    print("=" * 100)
+    print(
+        f"{'phase':<24}{'durée (s)':>11}{'RSS max (Mo)':>14}{'req. upstream':>15}{'erreurs':>9}{'req. SQL':>10}"
+        f"{'SQL (s)':>9}  résultat"
+    )
+    for result in results:
+        print(
+            f"{result.name:<24}{result.wall_seconds:>11.2f}{result.peak_rss_mb:>14.1f}{result.upstream_requests:>15}"
+            f"{result.upstream_errors:>9}{result.sql_statements:>10}{result.sql_seconds:>9.2f}  {result.outcome}"
+        )
+    print("=" * 100)
+
+
+def main():
+    args = parse_args()
+
+    configure_environment(args.db_name, show_queries=args.show_queries)
+
+    config = build_config(args)
+    print(f"🧪 Démarrage des faux services ({config.movies} films, {config.series} séries)...")
+    process, ports = start_fake_upstreams(config)
+
+    try:
+        print(f"🗄️  Préparation de la base {args.db_name}...")
+        prepare_database(args.db_name)
+        register_services(ports)
+
+        results = asyncio.run(run_benchmark(args, ports))
+    finally:
+        process.terminate()
+        process.join()
+
+    print_report(config, results)
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as output:
+            json.dump({"config": asdict(config), "phases": [asdict(r) for r in results]}, output, indent=2)
+        print(f"💾 Résultats détaillés écrits dans {args.json_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+"""
+Générateur de charge et benchmark d'ingestion des webhooks de lecture Jellyfin
+
+Usage (depuis la racine du projet, configuration DB du .env) :
+    python -m benchmarks.bench_webhooks --users 200 --sessions-per-user 5
+    python -m benchmarks.bench_webhooks --transport http --rate 500 --compare data/benchmarks/webhooks-abc1234.json
+
+Chaque utilisateur simulé rejoue ses sessions dans l'ordre (Play, Pause/Resume, Stop) ; les
+utilisateurs sont concurrents, leurs événements s'entrelacent. Les webhooks sont envoyés à
+l'application dans le processus (--transport asgi) ou via un serveur uvicorn local (--transport http),
+avec la vraie file d'ingestion (micro-lots) ; un 429 est rejoué après Retry-After, comme Jellyfin.
+Le générateur partage le processus et l'event loop de l'application : les chiffres servent à
+comparer des commits sur une même machine, pas à dimensionner un serveur.
+
+Rapport : événements/s ingérés (jusqu'à la file vidée), latence p50/p95/p99 de la réponse HTTP,
+requêtes SQL par événement (app.core.query_profiler). Les résultats sont écrits en JSON
+(data/benchmarks/ par défaut, avec le commit courant) pour comparer les commits entre eux.
+
+La base --db-name (servarr_bench par défaut) est vidée à chaque run.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import tempfile
+import time
+from collections import Counter
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import httpx
+
+from benchmarks.bench_sync import PeakRssSampler, configure_environment, prepare_database
+
+WEBHOOK_PATH = "/api/analytics/webhook/playback"
+
+# Ticks Jellyfin par seconde
+TICKS = 10_000_000
+
+DEVICES = (
+    ("Living Room TV", "Jellyfin Android TV"),
+    ("iPhone", "Jellyfin iOS"),
+    ("Firefox", "Jellyfin Web"),
+    ("Chrome", "Jellyfin Web"),
+    ("Shield", "Kodi"),
+)
+PLAY_METHODS = ("DirectPlay", "DirectPlay", "DirectStream", "Transcode")
+RESOLUTIONS = ((2160, "HDR"), (2160, "SDR"), (1080, "SDR"), (1080, "SDR"), (720, "SDR"), (480, "SDR"))
+
+# Indicateurs comparés par --compare (clé, libellé)
+COMPARED = (
+    ("events_per_second", "événements/s"),
+    ("latency_ms.p50", "latence p50 (ms)"),
+    ("latency_ms.p95", "latence p95 (ms)"),
+    ("latency_ms.p99", "latence p99 (ms)"),
+    ("sql_statements_per_event", "req. SQL / événement"),
+    ("sql_ms_per_event", "temps SQL / événement (ms)"),
+)
+
+
+# ============================================
+# FLUX D'ÉVÉNEMENTS
+# ============================================
+
+
+def _jellyfin_id(rng: random.Random) -> str:
+    return f"{rng.getrandbits(128):032x}"
+
+
+def _catalogue(rng: random.Random, size: int) -> list[dict[str, Any]]:
+    """Films et épisodes lus par les utilisateurs simulés (champs Item du plugin webhook)"""
+    items = []
+    for index in range(size):
+        height, video_range = rng.choice(RESOLUTIONS)
+        item = {
+            "Id": _jellyfin_id(rng),
+            "ProductionYear": rng.randint(1980, 2026),
+            "RunTimeTicks": rng.randint(20, 180) * 60 * TICKS,
+            "ImageTags": {"Primary": _jellyfin_id(rng)},
+            "MediaStreams": [
+                {
+                    "Type": "Video",
+                    "Codec": rng.choice(("hevc", "h264", "av1")),
+                    "Height": height,
+                    "VideoRange": video_range,
+                },
+                {"Type": "Audio", "Codec": "eac3"},
+            ],
+        }
+        if index % 3:
+            item |= {"Type": "Movie", "Name": f"Bench Movie {index}"}
+        else:
+            item |= {
+                "Type": "Episode",
+                "Name": f"Bench Episode {index}",
+                "SeriesName": f"Bench Series {index % 50}",
+                "ParentIndexNumber": rng.randint(1, 8),
+                "IndexNumber": rng.randint(1, 12),
+            }
+        items.append(item)
+    return items
+
+
+def _payload(event: str, item: dict, user: dict, session: dict, position: int) -> dict[str, Any]:
+    """Payload du plugin webhook Jellyfin"""
+    play_state = {**session["PlayState"], "PositionTicks": position}
+    return {"Event": event, "Item": item, "User": user, "Session": {**session, "PlayState": play_state}}
+
+
+def build_streams(users: int, sessions_per_user: int, max_pauses: int, seed: int) -> list[list[dict[str, Any]]]:
+    """
+    Flux de webhooks de chaque utilisateur simulé
+
+    Returns:
+        Une liste de payloads par utilisateur, dans l'ordre de lecture
+    """
+    rng = random.Random(seed)  # noqa: S311 (données synthétiques)
+    catalogue = _catalogue(rng, max(50, users * 2))
+    streams = []
+
+    for index in range(users):
+        user = {"Id": _jellyfin_id(rng), "Name": f"bench-user-{index:04d}"}
+        device_name, client = rng.choice(DEVICES)
+        events = []
+
+        for _ in range(sessions_per_user):
+            item = rng.choice(catalogue)
+            session = {
+                "DeviceName": device_name,
+                "Client": client,
+                "PlayState": {"PlayMethod": rng.choice(PLAY_METHODS)},
+            }
+            position = 0
+
+            events.append(_payload("Play", item, user, session, position))
+            for _ in range(rng.randint(0, max_pauses)):
+                position += rng.randint(60, 900) * TICKS
+                events.append(_payload("Pause", item, user, session, position))
+                events.append(_payload("Resume", item, user, session, position))
+            position += rng.randint(60, 1800) * TICKS
+            events.append(_payload("Stop", item, user, session, position))
+
+        streams.append(events)
+
+    return streams
+
+
+# ============================================
+# ENVOI
+# ============================================
+
+
+class Pacer:
+    """Débit global cible (événements/s), partagé par les utilisateurs ; 0 = sans limite"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.started = time.perf_counter()
+        self.sent = 0
+
+    async def wait(self):
+        if not self.rate:
+            return
+        target = self.started + self.sent / self.rate
+        self.sent += 1
+        delay = target - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+async def replay_user(
+    client: httpx.AsyncClient, events: list[dict[str, Any]], pacer: Pacer, latencies: list[float], statuses: Counter
+):
+    """Envoyer les webhooks d'un utilisateur dans l'ordre ; 429 rejoué après Retry-After"""
+    for payload in events:
+        await pacer.wait()
+        while True:
+            started = time.perf_counter()
+            response = await client.post(WEBHOOK_PATH, json=payload)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+            if response.status_code != 429:
+                break
+            await asyncio.sleep(float(response.headers.get("Retry-After", "1")))
+
+
+def _percentile(ordered: list[float], percent: float) -> float:
+    """Percentile par rang le plus proche (liste triée)"""
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered), math.ceil(percent / 100 * len(ordered))) - 1)
+    return ordered[rank]
+
+
+async def _start_http_server(app, port: int):
+    """Serveur uvicorn dans l'event loop courant (lifespan géré par le benchmark)"""
+    import uvicorn
+
+    server = uvicorn.Server(
+        uvicorn.Config(app, host="127.0.0.1", port=port, lifespan="off", log_level="warning", access_log=False)
+    )
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.01)
+    return server, task
+
+
+async def run_benchmark(args: argparse.Namespace, streams: list[list[dict[str, Any]]]) -> dict[str, Any]:
+    from app.core.query_profiler import profile
+    from app.db import SessionLocal
+    from app.main import app
+    from app.services.active_sessions import active_session_index
+    from app.services.webhook_queue import webhook_queue
+
+    with SessionLocal() as db:
+        active_session_index.warm(db)
+
+    server = server_task = None
+    if args.transport == "http":
+        server, server_task = await _start_http_server(app, args.port)
+        transport = None
+        base_url = f"http://127.0.0.1:{args.port}"
+    else:
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://bench"
+
+    limits = httpx.Limits(max_connections=len(streams), max_keepalive_connections=len(streams))
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+    sampler = PeakRssSampler()
+
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, limits=limits, timeout=60) as client:
+            # Consommateur démarré dans le profil : ses requêtes SQL (via run_db) y sont comptées
+            with profile("bench webhooks") as query_profile:
+                webhook_queue.start()
+                sampler.start()
+                started = time.perf_counter()
+
+                pacer = Pacer(args.rate)
+                await asyncio.gather(*(replay_user(client, events, pacer, latencies, statuses) for events in streams))
+                sent_at = time.perf_counter()
+
+                # Attendre que la file ait appliqué tous les événements acceptés
+                while webhook_queue.processed + webhook_queue.failed < webhook_queue.accepted:
+                    await asyncio.sleep(0.005)
+                drained_at = time.perf_counter()
+
+                peak_rss = sampler.stop()
+                queue_stats = webhook_queue.stats()
+                await webhook_queue.stop()
+    finally:
+        if server is not None:
+            server.should_exit = True
+            await server_task
+
+    events = sum(len(user_events) for user_events in streams)
+    ingest_seconds = drained_at - started
+    ordered = sorted(latencies)
+    open_sessions, _ = active_session_index.counts()
+
+    return {
+        "events": events,
+        "requests": len(latencies),
+        "status_codes": {str(code): count for code, count in sorted(statuses.items())},
+        "send_seconds": round(sent_at - started, 3),
+        "ingest_seconds": round(ingest_seconds, 3),
+        "events_per_second": round(events / ingest_seconds, 1),
+        "latency_ms": {
+            "p50": round(_percentile(ordered, 50) * 1000, 2),
+            "p95": round(_percentile(ordered, 95) * 1000, 2),
+            "p99": round(_percentile(ordered, 99) * 1000, 2),
+            "max": round(ordered[-1] * 1000, 2) if ordered else 0.0,
+        },
+        "sql_statements": query_profile.statements,
+        "sql_statements_per_event": round(query_profile.statements / events, 2),
+        "sql_ms_per_event": round(query_profile.db_time * 1000 / events, 3),
+        "peak_rss_mb": round(peak_rss / 1024**2, 1),
+        "queue": {key: queue_stats[key] for key in ("processed", "failed", "rejected", "batches", "avg_batch_size")},
+        # Toutes les sessions se terminent par un Stop : une session restée ouverte est une anomalie
+        "open_sessions": open_sessions,
+        "top_statements": [(count, key) for key, count in query_profile.fingerprints.most_common(8)],
+    }
+
+
+# ============================================
+# RAPPORT
+# ============================================
+
+
+def _git_commit() -> str | None:
+    try:
+        output = subprocess.run(  # noqa: S603
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return output.stdout.strip()
+
+
+def _lookup(results: dict[str, Any], key: str) -> float | None:
+    value: Any = results
+    for part in key.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def print_report(report: dict[str, Any], previous: dict[str, Any] | None):
+    config, results = report["config"], report["results"]
+    print("\n" + "=" * 80)
+    print(
+        f"📊 Benchmark webhooks ({config['transport']}) : {config['users']} utilisateurs, {results['events']} "
+        f"événements, débit cible {config['rate'] or 'illimité'} (commit {report['commit'] or '?'})"
+    )
+    print("=" * 80)
+    print(f"  Événements/s ingérés   : {results['events_per_second']:.1f} ({results['ingest_seconds']:.2f}s)")
+    latency = results["latency_ms"]
+    print(
+        f"  Latence HTTP (ms)      : p50 {latency['p50']:.2f}  p95 {latency['p95']:.2f}  p99 {latency['p99']:.2f}"
+        f"  max {latency['max']:.2f}"
+    )
+    print(f"  Codes HTTP             : {results['status_codes']}")
+    print(
+        f"  SQL                    : {results['sql_statements']} requêtes, "
+        f"{results['sql_statements_per_event']:.2f}/événement, {results['sql_ms_per_event']:.3f} ms/événement"
+    )
+    queue = results["queue"]
+    print(
+        f"  File                   : {queue['batches']} lots (moyenne {queue['avg_batch_size']}), "
+        f"{queue['failed']} en erreur, {queue['rejected']} refus (429)"
+    )
+    print(f"  RSS max                : {results['peak_rss_mb']:.1f} Mo")
+    if results["open_sessions"]:
+        print(f"  ⚠️  Sessions restées actives : {results['open_sessions']}")
+
+    if previous is not None:
+        print("-" * 80)
+        print(f"  Comparaison avec le commit {previous.get('commit') or '?'} :")
+        for key, label in COMPARED:
+            before, after = _lookup(previous["results"], key), _lookup(results, key)
+            if before is None or after is None:
+                continue
+            change = f"{(after - before) / before:+.1%}" if before else "n/a"
+            print(f"    {label:<28}{before:>12.2f} -> {after:>12.2f}  ({change})")
+    print("=" * 80)
+
+
+# ============================================
+# POINT D'ENTRÉE
+# ============================================
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark d'ingestion des webhooks de lecture")
+    parser.add_argument("--users", type=int, default=100, help="Utilisateurs simulés concurrents")
+    parser.add_argument("--sessions-per-user", type=int, default=5, help="Lectures par utilisateur")
+    parser.add_argument("--max-pauses", type=int, default=3, help="Pauses/reprises max par lecture")
+    parser.add_argument("--rate", type=float, default=0.0, help="Débit cible global en événements/s (0 : illimité)")
+    parser.add_argument("--transport", choices=("asgi", "http"), default="asgi", help="Dans le processus ou HTTP local")
+    parser.add_argument("--port", type=int, default=18080, help="Port du serveur uvicorn (--transport http)")
+    parser.add_argument("--queue-capacity", type=int, help="WEBHOOK_QUEUE_CAPACITY pour ce run")
+    parser.add_argument("--batch-size", type=int, help="WEBHOOK_BATCH_SIZE pour ce run")
+    parser.add_argument("--batch-window-ms", type=int, help="WEBHOOK_BATCH_WINDOW_MS pour ce run")
+    parser.add_argument("--no-event-log", action="store_true", help="Désactiver le journal des webhooks acceptés")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--db-name", default="servarr_bench", help="Base de benchmark (vidée à chaque run)")
+    parser.add_argument("--json", dest="json_path", help="Fichier de résultats (défaut : data/benchmarks/)")
+    parser.add_argument("--compare", help="Résultats JSON d'un run précédent à comparer")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    configure_environment(args.db_name)
+
+    # Réglages de la file pour ce run, journal dans un répertoire temporaire
+    overrides = {
+        "WEBHOOK_QUEUE_CAPACITY": args.queue_capacity,
+        "WEBHOOK_BATCH_SIZE": args.batch_size,
+        "WEBHOOK_BATCH_WINDOW_MS": args.batch_window_ms,
+    }
+    for name, value in overrides.items():
+        if value is not None:
+            os.environ[name] = str(value)
+    os.environ["WEBHOOK_SECRET"] = ""
+    os.environ["WEBHOOK_EVENT_LOG_ENABLED"] = "false" if args.no_event_log else "true"
+    event_log_dir = tempfile.TemporaryDirectory(prefix="servarr-bench-webhooks-")
+    os.environ["WEBHOOK_EVENT_LOG_DIR"] = event_log_dir.name
+
+    previous = None
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+
+    streams = build_streams(args.users, args.sessions_per_user, args.max_pauses, args.seed)
+    print(f"🧪 {sum(len(s) for s in streams)} webhooks générés pour {args.users} utilisateurs")
+
+    print(f"🗄️  Préparation de la base {args.db_name}...")
+    prepare_database(args.db_name)
+
+    try:
+        results = asyncio.run(run_benchmark(args, streams))
+    finally:
+        event_log_dir.cleanup()
+
+    from app.core.config import settings
+
+    report = {
+        "benchmark": "webhooks",
+        "commit": _git_commit(),
+        "timestamp": datetime.now(UTC).isoformat(timespec="seconds"),
+        "config": {
+            "transport": args.transport,
+            "users": args.users,
+            "sessions_per_user": args.sessions_per_user,
+            "max_pauses": args.max_pauses,
+            "rate": args.rate,
+            "seed": args.seed,
+            "queue_capacity": settings.WEBHOOK_QUEUE_CAPACITY,
+            "batch_size": settings.WEBHOOK_BATCH_SIZE,
+            "batch_window_ms": settings.WEBHOOK_BATCH_WINDOW_MS,
+            "event_log": settings.WEBHOOK_EVENT_LOG_ENABLED,
+        },
+        "results": results,
+    }
+    print_report(report, previous)
+
+    json_path = Path(args.json_path) if args.json_path else None
+    if json_path is None:
+        stamp = datetime.now(UTC).strftime("%Y%m%d-%H%M%S")
+        json_path = Path("data/benchmarks") / f"webhooks-{report['commit'] or 'unknown'}-{stamp}.json"
+    json_path.parent.mkdir(parents=True, exist_ok=True)
+    json_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"💾 Résultats écrits dans {json_path}")
+
+
+if __name__ == "__main__":
+    main()
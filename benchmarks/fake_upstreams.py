@@ -0,0 +1,516 @@
+"""
+Faux services upstream servis en local, avec bibliothèques synthétiques de taille configurable
+
+Chaque service écoute sur son port (127.0.0.1) et reproduit les endpoints et formats de réponse
+utilisés par les connecteurs. Les serveurs tournent dans un processus séparé (start_fake_upstreams)
+pour que le temps CPU et la mémoire mesurés restent ceux de l'application.
+
+Endpoints de contrôle, sur chaque service :
+- GET  /__bench/stats  : requêtes reçues par endpoint et erreurs injectées
+- POST /__bench/mutate : faire évoluer la bibliothèque (événements d'historique, torrents modifiés)
+"""
+
+import asyncio
+import json
+import multiprocessing
+import random
+import re
+from collections import Counter
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from aiohttp import web
+
+# Services simulés, dans l'ordre de démarrage
+SERVICES = ("radarr", "sonarr", "jellyfin", "jellyseerr", "qbittorrent")
+
+# Tailles prédéfinies (films, séries, requêtes Jellyseerr, torrents)
+PRESETS = {
+    "1k": {"movies": 1_000, "series": 1_000, "requests": 1_000, "torrents": 1_000},
+    "10k": {"movies": 10_000, "series": 10_000, "requests": 10_000, "torrents": 10_000},
+    "50k": {"movies": 50_000, "series": 50_000, "requests": 50_000, "torrents": 50_000},
+}
+
+# Segments variables des chemins, regroupés dans les statistiques (/api/v3/movie/42 -> /api/v3/movie/{id})
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+QBT_STATES = ("uploading", "stalledUP", "pausedUP", "downloading", "stalledDL", "queuedUP")
+
+
+@dataclass(frozen=True)
+class FakeUpstreamConfig:
+    """Taille des bibliothèques synthétiques et comportement réseau simulé"""
+
+    movies: int = 1_000
+    series: int = 1_000
+    requests: int = 1_000
+    torrents: int = 1_000
+    episodes_per_series: int = 10
+    users: int = 25
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    seed: int = 42
+
+
+def _iso(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _hash(index: int) -> str:
+    return f"{index:040X}"
+
+
+def _images(kind: str, item_id: int) -> list[dict[str, str]]:
+    return [{"coverType": "poster", "remoteUrl": f"https://images.example/{kind}/{item_id}.jpg"}]
+
+
+class FakeLibrary:
+    """
+    Données synthétiques partagées par les faux services
+
+    Les torrents sont attribués d'abord aux films puis aux séries : chaque torrent a un
+    événement d'historique Radarr/Sonarr dont le downloadId porte son hash.
+    """
+
+    def __init__(self, config: FakeUpstreamConfig):
+        self.config = config
+        self.random = random.Random(config.seed)  # noqa: S311 (données synthétiques)
+        self.now = datetime.now(UTC).replace(microsecond=0)
+        self.history_clock = self.now - timedelta(days=30)
+
+        self.movies = {i: self._movie(i) for i in range(1, config.movies + 1)}
+        self.series = {i: self._series(i) for i in range(1, config.series + 1)}
+        self.radarr_history: list[dict[str, Any]] = []
+        self.sonarr_history: list[dict[str, Any]] = []
+        self.torrents: dict[str, dict[str, Any]] = {}
+
+        for index in range(config.torrents):
+            torrent_hash = _hash(index + 1)
+            if index < config.movies:
+                self._history_event("radarr", index + 1, torrent_hash)
+            elif index - config.movies < config.series:
+                self._history_event("sonarr", index - config.movies + 1, torrent_hash)
+            self.torrents[torrent_hash] = self._torrent(index, torrent_hash)
+
+        # qBittorrent sync/maindata : rid courant et hash modifiés par rid
+        self.rid = 1
+        self.torrent_changes: dict[int, set[str]] = {}
+
+    def _added(self) -> str:
+        # Un quart de la bibliothèque ajouté dans les 30 derniers jours (mode RECENT)
+        days = self.random.randint(0, 29) if self.random.random() < 0.25 else self.random.randint(30, 3650)
+        return _iso(self.now - timedelta(days=days, seconds=self.random.randint(0, 86_399)))
+
+    def _movie(self, movie_id: int) -> dict[str, Any]:
+        has_file = self.random.random() < 0.8
+        return {
+            "id": movie_id,
+            "title": f"Bench Movie {movie_id}",
+            "year": 1950 + movie_id % 75,
+            "added": self._added(),
+            "monitored": self.random.random() < 0.9,
+            "hasFile": has_file,
+            "sizeOnDisk": self.random.randint(700, 60_000) * 1024**2 if has_file else 0,
+            "qualityProfileId": self.random.randint(1, 6),
+            "ratings": {"imdb": {"value": round(self.random.uniform(3, 9), 1)}},
+            "overview": f"Synthetic overview for movie {movie_id}. " * 4,
+            "images": _images("movie", movie_id),
+            "physicalRelease": _iso(self.now + timedelta(days=movie_id % 60)),
+        }
+
+    def _series(self, series_id: int) -> dict[str, Any]:
+        episodes = self.config.episodes_per_series
+        files = self.random.randint(0, episodes)
+        return {
+            "id": series_id,
+            "title": f"Bench Series {series_id}",
+            "year": 1980 + series_id % 45,
+            "added": self._added(),
+            "monitored": self.random.random() < 0.9,
+            "qualityProfileId": self.random.randint(1, 6),
+            "ratings": {"value": round(self.random.uniform(3, 9), 1)},
+            "overview": f"Synthetic overview for series {series_id}. " * 4,
+            "images": _images("series", series_id),
+            "statistics": {
+                "episodeCount": episodes,
+                "episodeFileCount": files,
+                "sizeOnDisk": files * self.random.randint(200, 4_000) * 1024**2,
+            },
+        }
+
+    def _torrent(self, index: int, torrent_hash: str) -> dict[str, Any]:
+        return {
+            "name": f"Bench.Torrent.{index + 1}.1080p",
+            "state": self.random.choice(QBT_STATES),
+            "ratio": round(self.random.uniform(0, 5), 3),
+            "progress": 1.0 if self.random.random() < 0.9 else round(self.random.random(), 3),
+            "size": self.random.randint(700, 60_000) * 1024**2,
+            "seeding_time": self.random.randint(0, 10_000_000),
+            "completion_on": int((self.now - timedelta(days=self.random.randint(0, 900))).timestamp()),
+            "tags": "bench",
+            "hash": torrent_hash.lower(),
+        }
+
+    def _history_event(self, service: str, item_id: int, torrent_hash: str | None = None):
+        self.history_clock += timedelta(seconds=1)
+        record = {
+            "date": _iso(self.history_clock),
+            "eventType": "downloadFolderImported",
+            "downloadId": f"qBittorrent-{torrent_hash}" if torrent_hash else "",
+        }
+        if service == "radarr":
+            self.radarr_history.append({**record, "movieId": item_id})
+        else:
+            self.sonarr_history.append({**record, "seriesId": item_id})
+
+    def mutate(self, fraction: float) -> dict[str, int]:
+        """
+        Faire évoluer la bibliothèque comme entre deux synchros
+
+        Une fraction des films et séries reçoit un événement d'historique (repris par le delta
+        incrémental) et une fraction des torrents change de ratio/état (delta maindata).
+        """
+        self.history_clock = max(self.history_clock, datetime.now(UTC).replace(microsecond=0))
+        touched = {"movies": 0, "series": 0, "torrents": 0}
+
+        for kind, items, service in (("movies", self.movies, "radarr"), ("series", self.series, "sonarr")):
+            for item_id in self.random.sample(sorted(items), int(len(items) * fraction)):
+                self._history_event(service, item_id)
+                touched[kind] += 1
+
+        changed = set()
+        for torrent_hash in self.random.sample(sorted(self.torrents), int(len(self.torrents) * fraction)):
+            torrent = self.torrents[torrent_hash]
+            torrent["ratio"] = round(torrent["ratio"] + self.random.uniform(0.01, 0.5), 3)
+            torrent["state"] = self.random.choice(QBT_STATES)
+            changed.add(torrent_hash)
+
+        self.rid += 1
+        self.torrent_changes[self.rid] = changed
+        touched["torrents"] = len(changed)
+        return touched
+
+
+class FakeUpstreams:
+    """Applications aiohttp des cinq services, sur une FakeLibrary commune"""
+
+    def __init__(self, config: FakeUpstreamConfig):
+        self.config = config
+        self.library = FakeLibrary(config)
+        self.random = random.Random(config.seed + 1)  # noqa: S311 (données synthétiques)
+        self.stats: dict[str, Counter] = {service: Counter() for service in SERVICES}
+        self.errors: dict[str, Counter] = {service: Counter() for service in SERVICES}
+        # Listes complètes sérialisées une fois (invalidées par mutate)
+        self._cache: dict[str, bytes] = {}
+
+    # ------------------------------------------------------------------ infrastructure
+
+    def _middleware(self, service: str):
+        @web.middleware
+        async def simulate(request: web.Request, handler):
+            if request.path.startswith("/__bench/"):
+                return await handler(request)
+
+            endpoint = f"{request.method} {_ID_SEGMENT.sub('/{id}', request.path)}"
+            self.stats[service][endpoint] += 1
+
+            delay = self.config.latency_ms
+            if self.config.jitter_ms:
+                delay = max(0.0, delay + self.random.gauss(0, self.config.jitter_ms))
+            if delay:
+                await asyncio.sleep(delay / 1000)
+
+            if self.config.error_rate and self.random.random() < self.config.error_rate:
+                self.errors[service][endpoint] += 1
+                return web.json_response({"message": "injected error"}, status=500)
+
+            return await handler(request)
+
+        return simulate
+
+    def _control_routes(self, app: web.Application, service: str):
+        async def stats(request: web.Request) -> web.Response:
+            return web.json_response({"requests": self.stats[service], "errors": self.errors[service]})
+
+        async def mutate(request: web.Request) -> web.Response:
+            touched = self.library.mutate(float(request.query.get("fraction", "0.01")))
+            self._cache.clear()
+            return web.json_response(touched)
+
+        app.router.add_get("/__bench/stats", stats)
+        app.router.add_post("/__bench/mutate", mutate)
+
+    def _cached(self, key: str, build) -> web.Response:
+        body = self._cache.get(key)
+        if body is None:
+            body = self._cache[key] = json.dumps(build()).encode()
+        return web.Response(body=body, content_type="application/json")
+
+    def build_apps(self) -> dict[str, web.Application]:
+        builders = {
+            "radarr": self._radarr,
+            "sonarr": self._sonarr,
+            "jellyfin": self._jellyfin,
+            "jellyseerr": self._jellyseerr,
+            "qbittorrent": self._qbittorrent,
+        }
+        apps = {}
+        for service in SERVICES:
+            app = web.Application(middlewares=[self._middleware(service)], client_max_size=8 * 1024**2)
+            self._control_routes(app, service)
+            builders[service](app)
+            apps[service] = app
+        return apps
+
+    # ------------------------------------------------------------------ Radarr / Sonarr
+
+    @staticmethod
+    def _history_page(records: list[dict[str, Any]], request: web.Request) -> dict[str, Any]:
+        page_size = int(request.query.get("pageSize", 10))
+        ordered = records[::-1] if request.query.get("sortDirection") == "descending" else records
+        return {"page": 1, "pageSize": page_size, "totalRecords": len(records), "records": ordered[:page_size]}
+
+    @staticmethod
+    def _history_since(records: list[dict[str, Any]], request: web.Request) -> list[dict[str, Any]]:
+        since = request.query.get("date", "")
+        since = since.replace("+00:00", "Z")[:19]
+        return [record for record in records if record["date"][:19] > since]
+
+    def _arr_routes(self, app: web.Application, service: str, collection: str, items: dict, history: list):
+        async def status(request: web.Request) -> web.Response:
+            return web.json_response({"version": "5.0.0.bench"})
+
+        async def list_items(request: web.Request) -> web.Response:
+            return self._cached(f"{service}:{collection}", lambda: list(items.values()))
+
+        async def get_item(request: web.Request) -> web.Response:
+            item = items.get(int(request.match_info["item_id"]))
+            if item is None:
+                return web.json_response({"message": "NotFound"}, status=404)
+            return web.json_response(item)
+
+        async def history_page(request: web.Request) -> web.Response:
+            return web.json_response(self._history_page(history, request))
+
+        async def history_since(request: web.Request) -> web.Response:
+            return web.json_response(self._history_since(history, request))
+
+        async def queue(request: web.Request) -> web.Response:
+            return web.json_response({"page": 1, "totalRecords": 0, "records": []})
+
+        app.router.add_get("/api/v3/system/status", status)
+        app.router.add_get(f"/api/v3/{collection}", list_items)
+        app.router.add_get(f"/api/v3/{collection}/{{item_id:\\d+}}", get_item)
+        app.router.add_get("/api/v3/history", history_page)
+        app.router.add_get("/api/v3/history/since", history_since)
+        app.router.add_get("/api/v3/queue", queue)
+
+    def _radarr(self, app: web.Application):
+        library = self.library
+        self._arr_routes(app, "radarr", "movie", library.movies, library.radarr_history)
+
+        async def calendar(request: web.Request) -> web.Response:
+            horizon = _iso(library.now + timedelta(days=30))
+            return self._cached(
+                "radarr:calendar",
+                lambda: [movie for movie in library.movies.values() if movie["physicalRelease"] <= horizon][:500],
+            )
+
+        app.router.add_get("/api/v3/calendar", calendar)
+
+    def _sonarr(self, app: web.Application):
+        library = self.library
+        self._arr_routes(app, "sonarr", "series", library.series, library.sonarr_history)
+
+        async def calendar(request: web.Request) -> web.Response:
+            def build():
+                events = []
+                for series_id, series in list(library.series.items())[:500]:
+                    air_date = (library.now + timedelta(days=series_id % 30)).date().isoformat()
+                    events.append(
+                        {
+                            "seriesId": series_id,
+                            "seasonNumber": 1 + series_id % 5,
+                            "episodeNumber": 1 + series_id % 12,
+                            "airDate": air_date,
+                            "title": f"Episode {series_id}",
+                            "series": {"title": series["title"], "images": series["images"]},
+                        }
+                    )
+                return events
+
+            return self._cached("sonarr:calendar", build)
+
+        app.router.add_get("/api/v3/calendar", calendar)
+
+    # ------------------------------------------------------------------ Jellyfin
+
+    def _jellyfin(self, app: web.Application):
+        config = self.config
+        episodes = config.series * config.episodes_per_series
+
+        async def info(request: web.Request) -> web.Response:
+            return web.json_response({"Version": "10.9.0-bench", "ServerName": "bench"})
+
+        async def users(request: web.Request) -> web.Response:
+            return web.json_response(
+                [
+                    {"Id": f"{i:032x}", "Name": f"user{i}", "Policy": {"IsDisabled": i % 10 == 0}}
+                    for i in range(1, config.users + 1)
+                ]
+            )
+
+        async def counts(request: web.Request) -> web.Response:
+            return web.json_response(
+                {"MovieCount": config.movies, "SeriesCount": config.series, "EpisodeCount": episodes}
+            )
+
+        async def items(request: web.Request) -> web.Response:
+            item_type = request.query.get("IncludeItemTypes", "")
+            if item_type == "Movie":
+                total, ticks = config.movies, 72_000_000_000
+            elif item_type == "Episode":
+                total, ticks = episodes, 27_000_000_000
+            elif item_type == "Series":
+                total, ticks = config.series, 0
+            else:
+                total, ticks = 0, 0
+
+            with_items = "RunTimeTicks" in request.query.get("Fields", "")
+            return self._cached(
+                f"jellyfin:items:{item_type}:{with_items}",
+                lambda: {
+                    "Items": [{"Id": f"{i:032x}", "RunTimeTicks": ticks} for i in range(total)] if with_items else [],
+                    "TotalRecordCount": total,
+                },
+            )
+
+        async def custom_query(request: web.Request) -> web.Response:
+            return web.json_response({"columns": ["TotalSeconds"], "results": [[config.users * 3_600 * 40]]})
+
+        app.router.add_get("/System/Info/Public", info)
+        app.router.add_get("/Users", users)
+        app.router.add_get("/Items/Counts", counts)
+        app.router.add_get("/Items", items)
+        app.router.add_post("/user_usage_stats/submit_custom_query", custom_query)
+
+    # ------------------------------------------------------------------ Jellyseerr
+
+    def _jellyseerr(self, app: web.Application):
+        config = self.config
+        library = self.library
+        requests = [
+            {
+                "id": i,
+                "type": "movie" if i % 3 else "tv",
+                "status": 1 + i % 3,
+                "is4k": i % 7 == 0,
+                "createdAt": _iso(library.now - timedelta(hours=i)),
+                "media": {"tmdbId": 100_000 + i},
+                "requestedBy": {"id": 1 + i % config.users, "displayName": f"user{1 + i % config.users}", "avatar": ""},
+            }
+            for i in range(1, config.requests + 1)
+        ]
+
+        async def status(request: web.Request) -> web.Response:
+            return web.json_response({"version": "1.9.0-bench"})
+
+        async def list_requests(request: web.Request) -> web.Response:
+            take = int(request.query.get("take", 20))
+            skip = int(request.query.get("skip", 0))
+            return web.json_response(
+                {
+                    "pageInfo": {"pages": -(-len(requests) // take), "pageSize": take, "results": len(requests)},
+                    "results": requests[skip : skip + take],
+                }
+            )
+
+        async def media(request: web.Request) -> web.Response:
+            tmdb_id = int(request.match_info["tmdb_id"])
+            kind = request.match_info["kind"]
+            date_field, title_field = ("releaseDate", "title") if kind == "movie" else ("firstAirDate", "name")
+            return web.json_response(
+                {
+                    "id": tmdb_id,
+                    title_field: f"Bench Request {tmdb_id}",
+                    date_field: f"{1980 + tmdb_id % 45}-06-01",
+                    "posterPath": f"/{tmdb_id}.jpg",
+                    "overview": f"Synthetic overview for request {tmdb_id}.",
+                }
+            )
+
+        app.router.add_get("/api/v1/status", status)
+        app.router.add_get("/api/v1/request", list_requests)
+        app.router.add_get("/api/v1/{kind:movie|tv}/{tmdb_id:\\d+}", media)
+
+    # ------------------------------------------------------------------ qBittorrent
+
+    def _qbittorrent(self, app: web.Application):
+        library = self.library
+
+        async def login(request: web.Request) -> web.Response:
+            response = web.Response(text="Ok.")
+            response.set_cookie("SID", "bench-session")
+            return response
+
+        async def version(request: web.Request) -> web.Response:
+            return web.Response(text="v4.6.0")
+
+        async def maindata(request: web.Request) -> web.Response:
+            rid = int(request.query.get("rid", 0))
+            # rid inconnu (0, ou d'une autre instance) : état complet, comme qBittorrent
+            if rid <= 0 or rid > library.rid:
+                torrents = {torrent["hash"]: torrent for torrent in library.torrents.values()}
+                return web.json_response({"rid": library.rid, "full_update": True, "torrents": torrents})
+
+            changed = set().union(*(hashes for r, hashes in library.torrent_changes.items() if r > rid))
+            torrents = {
+                library.torrents[h]["hash"]: {field: library.torrents[h][field] for field in ("ratio", "state")}
+                for h in changed
+            }
+            return web.json_response({"rid": library.rid, "torrents": torrents})
+
+        async def info(request: web.Request) -> web.Response:
+            hashes = request.query.get("hashes", "")
+            wanted = [h.upper() for h in hashes.split("|") if h] if hashes else list(library.torrents)
+            return web.json_response([library.torrents[h] for h in wanted if h in library.torrents])
+
+        app.router.add_post("/api/v2/auth/login", login)
+        app.router.add_get("/api/v2/app/version", version)
+        app.router.add_get("/api/v2/sync/maindata", maindata)
+        app.router.add_get("/api/v2/torrents/info", info)
+
+
+async def _serve(config: FakeUpstreamConfig, ports: "multiprocessing.Queue[dict[str, int]]"):
+    apps = FakeUpstreams(config).build_apps()
+    bound = {}
+    for service, app in apps.items():
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        bound[service] = site._server.sockets[0].getsockname()[1]
+
+    ports.put(bound)
+    await asyncio.Event().wait()
+
+
+def _run(config: FakeUpstreamConfig, ports: "multiprocessing.Queue[dict[str, int]]"):
+    asyncio.run(_serve(config, ports))
+
+
+def start_fake_upstreams(config: FakeUpstreamConfig) -> tuple[multiprocessing.Process, dict[str, int]]:
+    """
+    Démarrer les faux services dans un processus séparé
+
+    Returns:
+        (processus à terminer en fin de benchmark, port de chaque service)
+    """
+    context = multiprocessing.get_context("spawn")
+    ports = context.Queue()
+    process = context.Process(target=_run, args=(config, ports), daemon=True, name="fake-upstreams")
+    process.start()
+    # Génération des bibliothèques comprise (50k éléments : quelques secondes)
+    return process, ports.get(timeout=300)
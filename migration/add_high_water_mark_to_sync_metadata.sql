@@ -0,0 +1,16 @@
+-- Migration: High-water mark pour la synchronisation incrémentale (sync_metadata)
+-- Date: 2026-10-16
+
+-- Étape 1 : Date du dernier événement d'historique traité
+ALTER TABLE sync_metadata
+ADD COLUMN IF NOT EXISTS high_water_mark VARCHAR(64) NULL;
+
+-- Étape 2 : Date de la dernière réconciliation complète
+ALTER TABLE sync_metadata
+ADD COLUMN IF NOT EXISTS last_full_sync_time DATETIME NULL;
+
+-- Vérification
+SELECT COLUMN_NAME, DATA_TYPE, IS_NULLABLE
+FROM INFORMATION_SCHEMA.COLUMNS
+WHERE TABLE_NAME = 'sync_metadata'
+AND COLUMN_NAME IN ('high_water_mark', 'last_full_sync_time');
@@ -0,0 +1,44 @@
+-- Migration: Clés naturelles uniques sur library_items et calendar_events (upsert en masse)
+-- Date: 2026-10-16
+
+-- Étape 1 : Ajouter les colonnes natural_key
+ALTER TABLE library_items
+ADD COLUMN IF NOT EXISTS natural_key VARCHAR(40) NULL;
+
+ALTER TABLE calendar_events
+ADD COLUMN IF NOT EXISTS natural_key VARCHAR(40) NULL;
+
+-- Étape 2 : Backfill (doit rester identique à build_natural_key dans app/services/bulk_upsert.py)
+-- library_items : (type, titre, année)
+UPDATE library_items
+SET natural_key = SHA1(CONCAT_WS('|', media_type, title, year));
+
+-- calendar_events : films (type, titre, date), épisodes (type, '', date, épisode)
+UPDATE calendar_events
+SET natural_key = SHA1(CONCAT_WS('|', media_type, IF(media_type = 'TV', '', title), release_date, COALESCE(episode, '')));
+
+-- Étape 3 : Supprimer les doublons (on garde la ligne la plus ancienne)
+DELETE li FROM library_items li
+JOIN library_items keep_li
+  ON keep_li.natural_key = li.natural_key
+ AND (keep_li.created_at < li.created_at OR (keep_li.created_at = li.created_at AND keep_li.id < li.id));
+
+DELETE ce FROM calendar_events ce
+JOIN calendar_events keep_ce
+  ON keep_ce.natural_key = ce.natural_key
+ AND (keep_ce.created_at < ce.created_at OR (keep_ce.created_at = ce.created_at AND keep_ce.id < ce.id));
+
+-- Étape 4 : Contraintes d'unicité
+ALTER TABLE library_items
+MODIFY COLUMN natural_key VARCHAR(40) NOT NULL,
+ADD UNIQUE INDEX uq_library_natural_key (natural_key);
+
+ALTER TABLE calendar_events
+MODIFY COLUMN natural_key VARCHAR(40) NOT NULL,
+ADD UNIQUE INDEX uq_calendar_natural_key (natural_key);
+
+-- Vérification
+SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE
+FROM INFORMATION_SCHEMA.STATISTICS
+WHERE TABLE_NAME IN ('library_items', 'calendar_events')
+AND INDEX_NAME LIKE 'uq_%';
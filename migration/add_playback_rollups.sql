@@ -0,0 +1,50 @@
+-- Migration: Rollups temporels des sessions de lecture (heure, jour, semaine, mois)
+-- Date: 2026-10-16
+--
+-- Les tables sont remplies par la compaction du scheduler analytics : au premier passage sur
+-- des rollups vides, tout l'historique de playback_sessions est compacté.
+
+CREATE TABLE IF NOT EXISTS playback_rollups_hourly (
+    period_start DATETIME NOT NULL,
+    device_type ENUM('WEB_BROWSER','MOBILE_APP','SMART_TV','DESKTOP_APP','GAME_CONSOLE','STREAMING_DEVICE','OTHER') NOT NULL,
+    media_type ENUM('MOVIE','TV') NOT NULL,
+    playback_method ENUM('DIRECT_PLAY','DIRECT_STREAM','TRANSCODED') NOT NULL,
+    plays INTEGER NOT NULL,
+    watched_seconds BIGINT NOT NULL,
+    PRIMARY KEY (period_start, device_type, media_type, playback_method)
+);
+
+CREATE TABLE IF NOT EXISTS playback_rollups_daily (
+    period_start DATE NOT NULL,
+    device_type ENUM('WEB_BROWSER','MOBILE_APP','SMART_TV','DESKTOP_APP','GAME_CONSOLE','STREAMING_DEVICE','OTHER') NOT NULL,
+    media_type ENUM('MOVIE','TV') NOT NULL,
+    playback_method ENUM('DIRECT_PLAY','DIRECT_STREAM','TRANSCODED') NOT NULL,
+    plays INTEGER NOT NULL,
+    watched_seconds BIGINT NOT NULL,
+    PRIMARY KEY (period_start, device_type, media_type, playback_method)
+);
+
+-- period_start : lundi de la semaine
+CREATE TABLE IF NOT EXISTS playback_rollups_weekly (
+    period_start DATE NOT NULL,
+    device_type ENUM('WEB_BROWSER','MOBILE_APP','SMART_TV','DESKTOP_APP','GAME_CONSOLE','STREAMING_DEVICE','OTHER') NOT NULL,
+    media_type ENUM('MOVIE','TV') NOT NULL,
+    playback_method ENUM('DIRECT_PLAY','DIRECT_STREAM','TRANSCODED') NOT NULL,
+    plays INTEGER NOT NULL,
+    watched_seconds BIGINT NOT NULL,
+    PRIMARY KEY (period_start, device_type, media_type, playback_method)
+);
+
+-- period_start : premier jour du mois
+CREATE TABLE IF NOT EXISTS playback_rollups_monthly (
+    period_start DATE NOT NULL,
+    device_type ENUM('WEB_BROWSER','MOBILE_APP','SMART_TV','DESKTOP_APP','GAME_CONSOLE','STREAMING_DEVICE','OTHER') NOT NULL,
+    media_type ENUM('MOVIE','TV') NOT NULL,
+    playback_method ENUM('DIRECT_PLAY','DIRECT_STREAM','TRANSCODED') NOT NULL,
+    plays INTEGER NOT NULL,
+    watched_seconds BIGINT NOT NULL,
+    PRIMARY KEY (period_start, device_type, media_type, playback_method)
+);
+
+-- Vérification
+SHOW TABLES LIKE 'playback_rollups_%';
@@ -0,0 +1,61 @@
+-- Migration: Historique sous-échantillonné des métriques serveur (min/avg/max par minute et par heure)
+-- Date: 2026-10-16
+--
+-- Remplies par la capture des métriques (app/services/metrics_history.py), purgées par la rétention.
+
+CREATE TABLE IF NOT EXISTS server_metrics_minute (
+    period_start DATETIME NOT NULL,
+    samples INTEGER NOT NULL,
+    cpu_usage_percent_min FLOAT,
+    cpu_usage_percent_avg FLOAT,
+    cpu_usage_percent_max FLOAT,
+    memory_usage_gb_min FLOAT,
+    memory_usage_gb_avg FLOAT,
+    memory_usage_gb_max FLOAT,
+    bandwidth_mbps_min FLOAT,
+    bandwidth_mbps_avg FLOAT,
+    bandwidth_mbps_max FLOAT,
+    disk_read_mbps_min FLOAT,
+    disk_read_mbps_avg FLOAT,
+    disk_read_mbps_max FLOAT,
+    disk_write_mbps_min FLOAT,
+    disk_write_mbps_avg FLOAT,
+    disk_write_mbps_max FLOAT,
+    active_sessions_count_min FLOAT,
+    active_sessions_count_avg FLOAT,
+    active_sessions_count_max FLOAT,
+    active_transcoding_count_min FLOAT,
+    active_transcoding_count_avg FLOAT,
+    active_transcoding_count_max FLOAT,
+    PRIMARY KEY (period_start)
+);
+
+CREATE TABLE IF NOT EXISTS server_metrics_hour (
+    period_start DATETIME NOT NULL,
+    samples INTEGER NOT NULL,
+    cpu_usage_percent_min FLOAT,
+    cpu_usage_percent_avg FLOAT,
+    cpu_usage_percent_max FLOAT,
+    memory_usage_gb_min FLOAT,
+    memory_usage_gb_avg FLOAT,
+    memory_usage_gb_max FLOAT,
+    bandwidth_mbps_min FLOAT,
+    bandwidth_mbps_avg FLOAT,
+    bandwidth_mbps_max FLOAT,
+    disk_read_mbps_min FLOAT,
+    disk_read_mbps_avg FLOAT,
+    disk_read_mbps_max FLOAT,
+    disk_write_mbps_min FLOAT,
+    disk_write_mbps_avg FLOAT,
+    disk_write_mbps_max FLOAT,
+    active_sessions_count_min FLOAT,
+    active_sessions_count_avg FLOAT,
+    active_sessions_count_max FLOAT,
+    active_transcoding_count_min FLOAT,
+    active_transcoding_count_avg FLOAT,
+    active_transcoding_count_max FLOAT,
+    PRIMARY KEY (period_start)
+);
+
+-- Vérification
+SHOW TABLES LIKE 'server_metrics_%';
@@ -0,0 +1,17 @@
+-- Migration: Colonne session_date (jour de début) sur playback_sessions
+-- Date: 2026-10-16
+
+-- Étape 1 : Colonne générée stockée (le backfill des lignes existantes est fait par l'ALTER)
+ALTER TABLE playback_sessions
+ADD COLUMN IF NOT EXISTS session_date DATE AS (DATE(start_time)) STORED;
+
+-- Étape 2 : Index pour les regroupements par jour et type d'appareil
+CREATE INDEX IF NOT EXISTS idx_session_date_device ON playback_sessions (session_date, device_type);
+
+-- Vérification
+SELECT COLUMN_NAME, DATA_TYPE, IS_NULLABLE, GENERATION_EXPRESSION
+FROM INFORMATION_SCHEMA.COLUMNS
+WHERE TABLE_NAME = 'playback_sessions'
+AND COLUMN_NAME = 'session_date';
+
+SELECT COUNT(*) AS sessions_sans_date FROM playback_sessions WHERE session_date IS NULL;
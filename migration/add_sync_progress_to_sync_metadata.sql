@@ -0,0 +1,15 @@
+-- Migration: Progression par lot des synchronisations (sync_metadata)
+-- Date: 2026-10-16
+
+-- Étape 1 : Ajouter les compteurs de progression
+ALTER TABLE sync_metadata
+ADD COLUMN IF NOT EXISTS progress_processed INT DEFAULT 0;
+
+ALTER TABLE sync_metadata
+ADD COLUMN IF NOT EXISTS progress_total INT DEFAULT 0;
+
+-- Vérification
+SELECT COLUMN_NAME, DATA_TYPE, IS_NULLABLE
+FROM INFORMATION_SCHEMA.COLUMNS
+WHERE TABLE_NAME = 'sync_metadata'
+AND COLUMN_NAME IN ('progress_processed', 'progress_total');
@@ -0,0 +1,45 @@
+-- Migration: Ensembles "déjà vu" des compteurs uniques (media_statistics, daily_analytics)
+-- Date: 2026-10-16
+
+-- Étape 1 : Tables (une ligne par couple rencontré, clé primaire composite)
+CREATE TABLE IF NOT EXISTS media_viewers (
+    media_id VARCHAR(255) NOT NULL,
+    user_id VARCHAR(255) NOT NULL,
+    PRIMARY KEY (media_id, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS daily_viewers (
+    date DATE NOT NULL,
+    user_id VARCHAR(255) NOT NULL,
+    PRIMARY KEY (date, user_id)
+);
+
+CREATE TABLE IF NOT EXISTS daily_media (
+    date DATE NOT NULL,
+    media_id VARCHAR(255) NOT NULL,
+    PRIMARY KEY (date, media_id)
+);
+
+-- Étape 2 : Backfill depuis l'historique (mêmes ensembles que les anciens COUNT(DISTINCT))
+INSERT IGNORE INTO media_viewers (media_id, user_id)
+SELECT DISTINCT media_id, user_id FROM playback_sessions;
+
+INSERT IGNORE INTO daily_viewers (date, user_id)
+SELECT DISTINCT DATE(start_time), user_id FROM playback_sessions;
+
+INSERT IGNORE INTO daily_media (date, media_id)
+SELECT DISTINCT DATE(start_time), media_id FROM playback_sessions;
+
+-- Étape 3 : Réaligner les compteurs sur les ensembles
+UPDATE media_statistics ms
+SET unique_users = (SELECT COUNT(*) FROM media_viewers mv WHERE mv.media_id = ms.media_id);
+
+UPDATE daily_analytics da
+SET unique_users = (SELECT COUNT(*) FROM daily_viewers dv WHERE dv.date = da.date),
+    unique_media = (SELECT COUNT(*) FROM daily_media dm WHERE dm.date = da.date);
+
+-- Vérification
+SELECT
+    (SELECT COUNT(*) FROM media_viewers) AS media_viewers,
+    (SELECT COUNT(*) FROM daily_viewers) AS daily_viewers,
+    (SELECT COUNT(*) FROM daily_media) AS daily_media;
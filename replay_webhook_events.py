@@ -0,0 +1,62 @@
+"""
+Script pour reconstruire les sessions de lecture et les analytics depuis le journal des webhooks
+
+Usage : python replay_webhook_events.py [--dir data/webhook_events] [--batch-size 1000] --yes
+
+Arrêter l'application avant : le rejeu vide playback_sessions, media_statistics,
+daily_analytics et device_statistics avant de rejouer le journal.
+"""
+
+import argparse
+import sys
+
+from app.core.config import settings
+from app.db import SessionLocal, check_db_connection
+from app.services.webhook_event_log import WebhookEventLog, replay_event_log
+
+
+def replay(directory: str, batch_size: int, confirmed: bool):
+    """Rejoue le journal des webhooks"""
+    event_log = WebhookEventLog(directory, segment_bytes=settings.WEBHOOK_EVENT_LOG_SEGMENT_MB * 1024 * 1024)
+    segments = event_log.segments()
+
+    if not segments:
+        print(f"❌ Aucun segment trouvé dans {directory}")
+        sys.exit(1)
+
+    print(f"📂 {len(segments)} segment(s) : {segments[0].name} → {segments[-1].name}")
+
+    if not confirmed:
+        print("⚠️  Le rejeu vide les tables analytics avant de les reconstruire : relancer avec --yes")
+        return
+
+    if not check_db_connection():
+        print("❌ Impossible de se connecter à la base de données")
+        sys.exit(1)
+
+    db = SessionLocal()
+    try:
+        report = replay_event_log(db, event_log, batch_size=batch_size)
+    except Exception as e:
+        print(f"❌ Erreur lors du rejeu : {e}")
+        import traceback
+
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        db.close()
+
+    print(
+        f"✅ {report['events']} événements rejoués en {report['batches']} lots "
+        f"({report['errors']} en erreur, {report['days']} jours) en {report['seconds']}s"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Reconstruire les analytics depuis le journal des webhooks")
+    parser.add_argument("--dir", default=settings.WEBHOOK_EVENT_LOG_DIR, help="Répertoire du journal")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Événements par transaction")
+    parser.add_argument("--yes", action="store_true", help="Confirmer la suppression des tables analytics")
+    args = parser.parse_args()
+
+    replay(args.dir, args.batch_size, args.yes)
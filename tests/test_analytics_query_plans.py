@@ -0,0 +1,224 @@
+"""
+Plans d'exécution des requêtes analytics par jour (MariaDB)
+
+Régression visée : un filtre func.date(start_time) rend la requête non indexable et force un
+full scan de playback_sessions. Les fonctions sont appelées telles quelles sur une base de test
+peuplée d'un an de sessions (statistiques à jour via ANALYZE TABLE), leurs SELECT sont capturés
+puis passés à EXPLAIN, sans FORCE INDEX : chaque plan doit utiliser un des index attendus.
+
+Usage (depuis la racine du projet, configuration DB du .env) :
+    python -m pytest tests/test_analytics_query_plans.py
+
+La base <DB_NAME>_query_plans_test est créée puis supprimée. Sans serveur MariaDB joignable,
+les tests sont ignorés (skip).
+"""
+
+import random
+import re
+from collections.abc import Iterator
+from datetime import UTC, date, datetime, time, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, sessionmaker
+
+import app.models  # noqa: F401 (tables enregistrées dans Base.metadata)
+from app.core.config import settings
+from app.db import Base
+from app.models.enums import DeviceType, MediaType, PlaybackMethod, SessionStatus, VideoQuality
+from app.models.models import DailyAnalytic, PlaybackSession
+from app.services.analytics_service import AnalyticsService
+from app.services.rollup_service import RollupService
+
+# Volume de la base de test : assez pour que l'optimiseur préfère un index à un full scan
+SEED_DAYS = 365
+SEED_SESSIONS = 50_000
+SEED_CHUNK_SIZE = 5_000
+
+TEST_DB_NAME = f"{settings.DB_NAME}_query_plans_test"
+
+# Index attendus par table (EXPLAIN type == "range" sur l'un d'eux)
+SESSION_DAY_INDEXES = {"ix_playback_sessions_start_time", "idx_session_device_start"}
+ROLLUP_INDEXES = {"PRIMARY"}
+
+ROLLUP_TABLES = (
+    "playback_rollups_hourly",
+    "playback_rollups_daily",
+    "playback_rollups_weekly",
+    "playback_rollups_monthly",
+)
+
+
+@pytest.fixture(scope="module")
+def engine() -> Iterator[Engine]:
+    """Base de test dédiée, créée et supprimée autour du module"""
+    server = create_engine(settings.DATABASE_URL.rsplit("/", 1)[0] + "/")
+    try:
+        with server.begin() as connection:
+            connection.execute(text(f"DROP DATABASE IF EXISTS `{TEST_DB_NAME}`"))
+            connection.execute(text(f"CREATE DATABASE `{TEST_DB_NAME}` CHARACTER SET utf8mb4"))
+    except OperationalError as e:
+        server.dispose()
+        pytest.skip(f"Serveur MariaDB injoignable : {e}")
+
+    test_engine = create_engine(settings.DATABASE_URL.rsplit("/", 1)[0] + f"/{TEST_DB_NAME}")
+    Base.metadata.create_all(bind=test_engine)
+
+    yield test_engine
+
+    test_engine.dispose()
+    with server.begin() as connection:
+        connection.execute(text(f"DROP DATABASE IF EXISTS `{TEST_DB_NAME}`"))
+    server.dispose()
+
+
+@pytest.fixture(scope="module")
+def db(engine: Engine) -> Iterator[Session]:
+    """Session sur la base de test peuplée (sessions, analytics quotidiennes, rollups)"""
+    _seed(engine)
+
+    with sessionmaker(bind=engine)() as session:
+        yield session
+
+
+@pytest.fixture(scope="module")
+def rollups(engine: Engine, db: Session) -> RollupService:
+    """Rollups compactés sur toute la période, comme après un passage du scheduler"""
+    service = RollupService()
+    today = datetime.now(UTC).replace(tzinfo=None, minute=0, second=0, microsecond=0)
+    service.compact(db, since=today - timedelta(days=SEED_DAYS + 1))
+    _analyze(engine, *ROLLUP_TABLES)
+    return service
+
+
+def _seed(engine: Engine):
+    """Un an de sessions terminées et les analytics quotidiennes correspondantes"""
+    rng = random.Random(42)  # noqa: S311 (données de test reproductibles)
+    now = datetime.now(UTC).replace(tzinfo=None)
+    devices = list(DeviceType)
+    methods = [PlaybackMethod.DIRECT_PLAY, PlaybackMethod.TRANSCODED]
+
+    rows = []
+    for i in range(SEED_SESSIONS):
+        start_time = now - timedelta(seconds=rng.randrange(SEED_DAYS * 24 * 3600))
+        watched = rng.randrange(60, 7200)
+        rows.append(
+            {
+                "id": f"seed-{i:08d}",
+                "media_id": f"media-{rng.randrange(2000)}",
+                "media_title": "Seed",
+                "media_type": rng.choice([MediaType.MOVIE, MediaType.TV]),
+                "user_id": f"user-{rng.randrange(200)}",
+                "user_name": "seed",
+                "device_type": rng.choice(devices),
+                "video_quality": VideoQuality.UNKNOWN,
+                "playback_method": rng.choice(methods),
+                "start_time": start_time,
+                "end_time": start_time + timedelta(seconds=watched),
+                "watched_seconds": watched,
+                "status": SessionStatus.STOPPED,
+                "is_active": False,
+            }
+        )
+
+    with engine.begin() as connection:
+        for offset in range(0, len(rows), SEED_CHUNK_SIZE):
+            connection.execute(insert(PlaybackSession), rows[offset : offset + SEED_CHUNK_SIZE])
+        connection.execute(
+            insert(DailyAnalytic),
+            [{"date": now.date() - timedelta(days=day), "total_plays": 0} for day in range(1, SEED_DAYS + 1)],
+        )
+
+    _analyze(engine, "playback_sessions", "daily_analytics")
+
+
+def _analyze(engine: Engine, *tables: str):
+    """Statistiques de l'optimiseur à jour (sinon il estime sur une table vide)"""
+    with engine.begin() as connection:
+        connection.execute(text(f"ANALYZE TABLE {', '.join(tables)}"))
+
+
+def _capture_selects(engine: Engine, call) -> list[tuple[str, dict]]:
+    """Exécuter call() et renvoyer les SELECT émis (requête, paramètres)"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        call()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    return statements
+
+
+def _plans(engine: Engine, statements: list[tuple[str, dict]], table: str) -> list[dict]:
+    """Lignes EXPLAIN portant sur une table, pour chaque requête qui la lit"""
+    plans = []
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            if not re.search(rf"\bFROM {table}\b", statement):
+                continue
+            rows = connection.exec_driver_sql(f"EXPLAIN {statement}", parameters).mappings()
+            plans.extend(dict(row) for row in rows if row["table"] == table)
+    return plans
+
+
+def _assert_range(plans: list[dict], expected_keys: set[str]):
+    assert plans, "aucune requête capturée sur la table attendue"
+    for plan in plans:
+        assert plan["type"] == "range", f"pas de range scan : {plan}"
+        assert plan["key"] in expected_keys, f"index inattendu : {plan}"
+
+
+def test_update_device_statistics_uses_range_scan(engine: Engine, db: Session):
+    yesterday = (datetime.now(UTC) - timedelta(days=1)).date()
+
+    statements = _capture_selects(engine, lambda: AnalyticsService.update_device_statistics(db, yesterday))
+
+    _assert_range(_plans(engine, statements, "playback_sessions"), SESSION_DAY_INDEXES)
+
+
+def test_device_breakdown_uses_range_scans(engine: Engine, db: Session, rollups: RollupService):
+    # Même lecture que GET /analytics/devices (7 jours)
+    end_date = date.today()
+    start_date = end_date - timedelta(days=7)
+
+    statements = _capture_selects(engine, lambda: rollups.totals_by(db, "device_type", start_date, end_date))
+
+    rollup_plans = [plan for table in ROLLUP_TABLES for plan in _plans(engine, statements, table)]
+    _assert_range(rollup_plans, ROLLUP_INDEXES)
+    # Jour en cours, pas encore compacté : lu dans playback_sessions
+    _assert_range(_plans(engine, statements, "playback_sessions"), SESSION_DAY_INDEXES)
+
+
+def test_update_daily_analytics_uses_date_index(engine: Engine, db: Session):
+    """
+    update_daily_analytics ne relit plus playback_sessions par jour : seule reste la recherche de la
+    ligne du jour, un accès par clé unique (const / ref) sur l'index de date et non un range scan
+    """
+    start_time = datetime.combine(date.today() - timedelta(days=3), time(20, 0))
+    session = PlaybackSession(
+        media_id="media-1",
+        media_title="Seed",
+        media_type=MediaType.MOVIE,
+        user_id="user-1",
+        user_name="seed",
+        device_type=DeviceType.WEB_BROWSER,
+        playback_method=PlaybackMethod.DIRECT_PLAY,
+        start_time=start_time,
+        watched_seconds=600,
+    )
+
+    statements = _capture_selects(engine, lambda: AnalyticsService.update_daily_analytics(db, session))
+
+    plans = _plans(engine, statements, "daily_analytics")
+    assert plans, "aucune requête capturée sur daily_analytics"
+    for plan in plans:
+        assert plan["type"] in ("const", "eq_ref", "ref"), f"pas d'accès par index : {plan}"
+        assert plan["key"] == "ix_daily_analytics_date", f"index inattendu : {plan}"
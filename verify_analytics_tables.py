@@ -33,6 +33,7 @@ def verify_analytics_tables():
             "playback_method",
             "start_time",
             "end_time",
+            "session_date",
             "duration_seconds",
             "watched_seconds",
             "status",